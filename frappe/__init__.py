@@ -6,7 +6,7 @@ globals attached to frappe module
 """
 from __future__ import unicode_literals, print_function
 
-from six import iteritems, binary_type, text_type, string_types
+from six import binary_type, text_type, string_types
 from werkzeug.local import Local, release_local
 import os, sys, importlib, inspect, json
 from past.builtins import cmp
@@ -16,6 +16,7 @@ from faker import Faker
 # public
 from .exceptions import *
 from .utils.jinja import (get_jenv, get_template, render_template, get_email_from_template, get_jloader)
+from .utils.local_cache import LocalCache
 
 # Harmless for Python 3
 # For Python 2 set default encoding to utf-8
@@ -162,10 +163,12 @@ def init(site, sites_path=None, new_site=False):
 	local.valid_columns = {}
 	local.new_doc_templates = {}
 	local.link_count = {}
+	local.open_count_deltas = {}
+	local.search_index_writes = []
 
 	local.jenv = None
 	local.jloader =None
-	local.cache = {}
+	local.cache = LocalCache()
 	local.document_cache = {}
 	local.meta_cache = {}
 	local.form_dict = _dict()
@@ -205,20 +208,22 @@ def connect_replica():
 def get_site_config(sites_path=None, site_path=None):
 	"""Returns `site_config.json` combined with `sites/common_site_config.json`.
 	`site_config` is a set of site wide settings like database name, password, email etc."""
+	from frappe.utils.config_cache import get_config_json
 	config = {}
 
 	sites_path = sites_path or getattr(local, "sites_path", None)
 	site_path = site_path or getattr(local, "site_path", None)
 
+	# files are parsed again only if they changed
 	if sites_path:
-		common_site_config = os.path.join(sites_path, "common_site_config.json")
-		if os.path.exists(common_site_config):
-			config.update(get_file_json(common_site_config))
+		common_site_config = get_config_json(os.path.join(sites_path, "common_site_config.json"))
+		if common_site_config is not None:
+			config.update(common_site_config)
 
 	if site_path:
-		site_config = os.path.join(site_path, "site_config.json")
-		if os.path.exists(site_config):
-			config.update(get_file_json(site_config))
+		site_config = get_config_json(os.path.join(site_path, "site_config.json"))
+		if site_config is not None:
+			config.update(site_config)
 		elif local.site and not local.flags.new_site:
 			print("{0} does not exist".format(local.site))
 			sys.exit(1)
@@ -383,7 +388,7 @@ def set_user(username):
 	:param username: **User** name to set as current user."""
 	local.session.user = username
 	local.session.sid = username
-	local.cache = {}
+	local.cache.clear()
 	local.form_dict = _dict()
 	local.jenv = None
 	local.session.data = _dict()
@@ -561,10 +566,13 @@ def clear_cache(user=None, doctype=None):
 		frappe.cache_manager.clear_user_cache(user)
 	else: # everything
 		from frappe import translate
+		from frappe.utils.process_cache import publish_invalidation
 		frappe.cache_manager.clear_user_cache()
 		translate.clear_cache()
 		reset_metadata_version()
-		local.cache = {}
+		local.cache.clear()
+		local.hooks_registry = None
+		publish_invalidation(cache(), cache().make_key("*"))
 		local.new_doc_templates = {}
 
 		for fn in get_hooks("clear_cache"):
@@ -616,7 +624,7 @@ def has_website_permission(doc=None, ptype='read', user=None, verbose=False, doc
 		if hasattr(doc, 'has_website_permission'):
 			return doc.has_website_permission(ptype, user, verbose=verbose)
 
-	hooks = (get_hooks("has_website_permission") or {}).get(doctype, [])
+	hooks = get_hooks_registry().get_methods("has_website_permission", doctype)
 	if hooks:
 		for method in hooks:
 			result = call(method, doc=doc, ptype=ptype, user=user, verbose=verbose)
@@ -851,13 +859,20 @@ def get_module_list(app_name):
 
 def get_all_apps(with_internal_apps=True, sites_path=None):
 	"""Get list of all apps via `sites/apps.txt`."""
+	from frappe.utils.config_cache import get_config_items
 	if not sites_path:
 		sites_path = local.sites_path
 
-	apps = get_file_items(os.path.join(sites_path, "apps.txt"), raise_not_found=True)
+	apps_txt = os.path.join(sites_path, "apps.txt")
+	apps = get_config_items(apps_txt)
+	if apps is None:
+		raise IOError("{} Not Found".format(apps_txt))
+
+	# copy, the cached list is shared
+	apps = list(apps)
 
 	if with_internal_apps:
-		for app in get_file_items(os.path.join(local.site_path, "apps.txt")):
+		for app in get_config_items(os.path.join(local.site_path, "apps.txt")) or []:
 			if app not in apps:
 				apps.append(app)
 
@@ -889,19 +904,12 @@ def get_installed_apps(sort=False, frappe_last=False):
 
 def get_doc_hooks():
 	'''Returns hooked methods for given doc. It will expand the dict tuple if required.'''
-	if not hasattr(local, 'doc_events_hooks'):
-		hooks = get_hooks('doc_events', {})
-		out = {}
-		for key, value in iteritems(hooks):
-			if isinstance(key, tuple):
-				for doctype in key:
-					append_hook(out, doctype, value)
-			else:
-				append_hook(out, key, value)
+	return get_hooks_registry().doc_events_hooks
 
-		local.doc_events_hooks = out
-
-	return local.doc_events_hooks
+def get_hooks_registry():
+	'''Returns the hooks registry of the site, with resolved `doc_events` and other hooks.'''
+	from frappe.utils.hooks_registry import get_hooks_registry
+	return get_hooks_registry()
 
 def get_hooks(hook=None, default=None, app_name=None):
 	"""Get hooks via `app/hooks.py`
@@ -909,26 +917,6 @@ def get_hooks(hook=None, default=None, app_name=None):
 	:param hook: Name of the hook. Will gather all hooks for this name and return as a list.
 	:param default: Default if no hook found.
 	:param app_name: Filter by app."""
-	def load_app_hooks(app_name=None):
-		hooks = {}
-		for app in [app_name] if app_name else get_installed_apps(sort=True):
-			app = "frappe" if app=="webnotes" else app
-			try:
-				app_hooks = get_module(app + ".hooks")
-			except ImportError:
-				if local.flags.in_install_app:
-					# if app is not installed while restoring
-					# ignore it
-					pass
-				print('Could not find app "{0}"'.format(app_name))
-				if not request:
-					sys.exit(1)
-				raise
-			for key in dir(app_hooks):
-				if not key.startswith("_"):
-					append_hook(hooks, key, getattr(app_hooks, key))
-		return hooks
-
 	no_cache = conf.developer_mode or False
 
 	if app_name:
@@ -937,13 +925,46 @@ def get_hooks(hook=None, default=None, app_name=None):
 		if no_cache:
 			hooks = _dict(load_app_hooks())
 		else:
-			hooks = _dict(cache().get_value("app_hooks", load_app_hooks))
+			# merged once per process and site, see `frappe.utils.hooks_registry`
+			hooks = get_hooks_registry().hooks
 
 	if hook:
 		return hooks.get(hook) or (default if default is not None else [])
 	else:
+		return _dict(hooks)
+
+def get_cached_hooks():
+	"""Returns the hooks of all installed apps from the `app_hooks` cache"""
+	def load_and_version_app_hooks():
+		hooks = load_app_hooks()
+
+		# hooks registries are rebuilt for the new version
+		cache().delete_value("app_hooks_version")
+		local.hooks_registry = None
 		return hooks
 
+	return _dict(cache().get_value("app_hooks", load_and_version_app_hooks))
+
+def load_app_hooks(app_name=None):
+	hooks = {}
+	for app in [app_name] if app_name else get_installed_apps(sort=True):
+		app = "frappe" if app=="webnotes" else app
+		try:
+			app_hooks = get_module(app + ".hooks")
+		except ImportError:
+			if local.flags.in_install_app:
+				# if app is not installed while restoring
+				# ignore it
+				pass
+			print('Could not find app "{0}"'.format(app_name))
+			if not request:
+				sys.exit(1)
+			raise
+		for key in dir(app_hooks):
+			if not key.startswith("_"):
+				append_hook(hooks, key, getattr(app_hooks, key))
+	return hooks
+
 def append_hook(target, key, value):
 	'''appends a hook to the the target dict.
 
@@ -969,8 +990,9 @@ def setup_module_map():
 	_cache = cache()
 
 	if conf.db_name:
-		local.app_modules = _cache.get_value("app_modules")
-		local.module_app = _cache.get_value("module_app")
+		module_map = _cache.get_values(["app_modules", "module_app"])
+		local.app_modules = module_map["app_modules"]
+		local.module_app = module_map["module_app"]
 
 	if not (local.app_modules and local.module_app):
 		local.module_app, local.app_modules = {}, {}
@@ -983,8 +1005,7 @@ def setup_module_map():
 				local.app_modules[app].append(module)
 
 		if conf.db_name:
-			_cache.set_value("app_modules", local.app_modules)
-			_cache.set_value("module_app", local.module_app)
+			_cache.set_values({"app_modules": local.app_modules, "module_app": local.module_app})
 
 def get_file_items(path, raise_not_found=False, ignore_empty_lines=True):
 	"""Returns items from text file as a list. Ignores empty lines."""
@@ -1454,14 +1475,17 @@ def local_cache(namespace, key, generator, regenerate_if_none=False):
 	if namespace not in local.cache:
 		local.cache[namespace] = {}
 
-	if key not in local.cache[namespace]:
-		local.cache[namespace][key] = generator()
+	# keep a reference, the generator may fill the cache and evict the namespace
+	store = local.cache[namespace]
+
+	if key not in store:
+		store[key] = generator()
 
-	elif local.cache[namespace][key]==None and regenerate_if_none:
+	elif store[key]==None and regenerate_if_none:
 		# if key exists but the previous result was None
-		local.cache[namespace][key] = generator()
+		store[key] = generator()
 
-	return local.cache[namespace][key]
+	return store[key]
 
 def enqueue(*args, **kwargs):
 	'''
@@ -10,21 +10,14 @@ import logging
 from werkzeug.local import LocalManager
 from werkzeug.wrappers import Request, Response
 from werkzeug.exceptions import HTTPException, NotFound
-from werkzeug.contrib.profiler import ProfilerMiddleware
-from werkzeug.wsgi import SharedDataMiddleware
 
 import frappe
-import frappe.handler
-import frappe.auth
-import frappe.api
-import frappe.utils.response
-import frappe.website.render
 from frappe.utils import get_site_name
-from frappe.middlewares import StaticDataMiddleware
-from frappe.utils.error import make_error_snapshot
-from frappe.core.doctype.comment.comment import update_comments_in_parent_after_request
+from frappe.utils.local_cache import log_stats as log_local_cache_stats
 from frappe import _
-import frappe.recorder
+
+# subsystems like the request handler, the api, website rendering and the recorder are
+# imported when they are first used, to keep the start of workers and of the cli fast
 
 local_manager = LocalManager([frappe.local])
 
@@ -44,6 +37,9 @@ class RequestContext(object):
 
 @Request.application
 def application(request):
+	import frappe.recorder
+	import frappe.utils.response
+
 	response = None
 
 	try:
@@ -57,9 +53,11 @@ def application(request):
 			response = Response()
    
 		elif frappe.form_dict.cmd:
+			import frappe.handler
 			response = frappe.handler.handle()
 
 		elif request.path.startswith("/api/"):
+			import frappe.api
 			response = frappe.api.handle()
 
 		elif request.path.startswith('/backups'):
@@ -69,6 +67,7 @@ def application(request):
 			response = frappe.utils.response.download_private_file(request.path)
 
 		elif request.method in ('GET', 'HEAD', 'POST'):
+			import frappe.website.render
 			response = frappe.website.render.render()
 
 		else:
@@ -91,6 +90,7 @@ def application(request):
 			frappe.db.rollback()
 
 		frappe.recorder.dump()
+		log_local_cache_stats("request " + request.path)
 
 		if hasattr(frappe.local, 'conf') and frappe.local.conf.enable_frappe_logger:
 			frappe.logger("frappe.web", allow_site=frappe.local.site).info({
@@ -110,6 +110,8 @@ def application(request):
 	return response
 
 def init_request(request):
+	import frappe.auth
+
 	frappe.local.request = request
 	frappe.local.is_ajax = frappe.get_request_header("X-Requested-With")=="XMLHttpRequest"
 
@@ -182,6 +184,10 @@ def make_form_dict(request):
 		frappe.local.form_dict.pop("_")
 
 def handle_exception(e):
+	import frappe.utils.response
+	import frappe.website.render
+	from frappe.utils.error import make_error_snapshot
+
 	response = None
 	http_status_code = getattr(e, "http_status_code", 500)
 	return_as_message = False
@@ -239,6 +245,8 @@ def handle_exception(e):
 	return response
 
 def after_request(rollback):
+	from frappe.core.doctype.comment.comment import update_comments_in_parent_after_request
+
 	if (frappe.local.request.method in ("POST", "PUT") or frappe.local.flags.commit) and frappe.db:
 		if frappe.db.transaction_writes:
 			frappe.db.commit()
@@ -263,6 +271,9 @@ def serve(port=8000, profile=False, no_reload=False, no_threading=False, site=No
 	_sites_path = sites_path
 
 	from werkzeug.serving import run_simple
+	from werkzeug.contrib.profiler import ProfilerMiddleware
+	from werkzeug.wsgi import SharedDataMiddleware
+	from frappe.middlewares import StaticDataMiddleware
 
 	if profile:
 		application = ProfilerMiddleware(application, sort_by=('cumtime', 'calls'))
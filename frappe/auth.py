@@ -268,8 +268,8 @@ class LoginManager:
 		frappe.cache().hset('login_failed_count', user, failed_count + 1)
 
 	def run_trigger(self, event='on_login'):
-		for method in frappe.get_hooks().get(event, []):
-			frappe.call(frappe.get_attr(method), login_manager=self)
+		for method in frappe.get_hooks_registry().get_methods(event):
+			frappe.call(method, login_manager=self)
 
 	def validate_hour(self):
 		"""check if user is logging in during restricted hours"""
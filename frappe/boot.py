@@ -3,6 +3,9 @@
 
 from __future__ import unicode_literals
 
+import hashlib
+from collections import OrderedDict
+
 from six import iteritems, text_type
 
 """
@@ -21,7 +24,7 @@ from frappe.social.doctype.energy_point_log.energy_point_log import get_energy_p
 from frappe.social.doctype.post.post import frequently_visited_links
 
 def get_bootinfo():
-	"""build and return boot info"""
+	"""build and return boot info, without the segments in `boot_segments`"""
 	frappe.set_user_lang(frappe.session.user)
 	bootinfo = frappe._dict()
 	hooks = frappe.get_hooks()
@@ -36,12 +39,10 @@ def get_bootinfo():
 	bootinfo.server_date = frappe.utils.nowdate()
 
 	if frappe.session['user'] != 'Guest':
-		bootinfo.user_info = get_fullnames()
 		bootinfo.sid = frappe.session['sid']
 
 	bootinfo.modules = {}
 	bootinfo.module_list = []
-	load_desktop_icons(bootinfo)
 	bootinfo.letter_heads = get_letter_heads()
 	bootinfo.active_domains = frappe.get_active_domains()
 	bootinfo.all_domains = [d.get("name") for d in frappe.get_all("Domain")]
@@ -50,12 +51,9 @@ def get_bootinfo():
 	bootinfo.single_types = [d.name for d in frappe.get_all('DocType', {'issingle': 1})]
 	bootinfo.nested_set_doctypes = [d.parent for d in frappe.get_all('DocField', {'fieldname': 'lft'}, ['parent'])]
 	add_home_page(bootinfo, doclist)
-	bootinfo.page_info = get_allowed_pages()
-	load_translations(bootinfo)
+	bootinfo.lang = frappe.lang
 	add_timezone_info(bootinfo)
 	load_conf_settings(bootinfo)
-	load_print(bootinfo, doclist)
-	doclist.extend(get_meta_bundle("Page"))
 	bootinfo.home_folder = frappe.db.get_value("File", {"is_home_folder": 1})
 
 	# ipinfo
@@ -75,16 +73,114 @@ def get_bootinfo():
 	bootinfo.error_report_email = frappe.conf.error_report_email
 	bootinfo.calendars = sorted(frappe.get_hooks("calendars"))
 	bootinfo.treeviews = frappe.get_hooks("treeviews") or []
-	bootinfo.lang_dict = get_lang_dict()
 	bootinfo.success_action = get_success_action()
-	bootinfo.update(get_email_accounts(user=frappe.session.user))
 	bootinfo.energy_points_enabled = is_energy_point_enabled()
-	bootinfo.points = get_energy_points(frappe.session.user)
-	bootinfo.frequently_visited_links = frequently_visited_links()
 	bootinfo.link_preview_doctypes = get_link_preview_doctypes()
 
 	return bootinfo
 
+def load_boot_segments(bootinfo):
+	"""Add the data of segments that are not lazy and the versions of all segments
+	to `bootinfo`"""
+	bootinfo.boot_segments = {}
+	bootinfo.lazy_boot_segments = []
+	for name, segment in iteritems(get_boot_segments(list(boot_segments))):
+		bootinfo.boot_segments[name] = segment.version
+		if boot_segments[name].lazy:
+			bootinfo.lazy_boot_segments.append(name)
+		else:
+			add_segment_data(bootinfo, segment.data)
+
+def add_segment_data(bootinfo, data):
+	for key, value in iteritems(data):
+		if key == "docs":
+			# the cached docs of bootinfo are not extended in place
+			bootinfo.docs = (bootinfo.docs or []) + value
+		else:
+			bootinfo[key] = value
+
+@frappe.whitelist()
+def get_changed_boot_segments(versions):
+	"""Returns the segments of `versions` ({segment: version known to the client}) whose
+	version changed, as {segment: {"version": .., "data": ..}}"""
+	versions = frappe.parse_json(versions)
+	segments = get_boot_segments([name for name in versions if name in boot_segments])
+
+	return {name: segment for name, segment in iteritems(segments)
+		if segment.version != versions[name]}
+
+def get_boot_segments(names):
+	"""Returns {segment: {"version": .., "data": ..}} of the session user. Segments are
+	cached per user in the `bootinfo:[segment]` hashes"""
+	out = {}
+	for name in names:
+		if getattr(frappe.conf, 'disable_session_cache', None):
+			out[name] = build_boot_segment(name)
+		else:
+			out[name] = frappe.cache().hget(get_segment_cache_key(name), frappe.session.user,
+				lambda: build_boot_segment(name))
+
+	return out
+
+def build_boot_segment(name):
+	data = frappe._dict()
+	frappe.get_attr(boot_segments[name].method)(data)
+
+	version = hashlib.md5(frappe.as_json(data).encode("utf-8")).hexdigest()
+	return frappe._dict(version=version, data=data)
+
+def get_segment_cache_key(name):
+	return "bootinfo:" + name
+
+def clear_boot_segment_cache(name, user=None):
+	"""Clear a cached segment of `user`, or of all users"""
+	if user:
+		frappe.cache().hdel(get_segment_cache_key(name), user)
+	else:
+		frappe.cache().delete_key(get_segment_cache_key(name))
+
+def load_desktop_segment(data):
+	load_desktop_icons(data)
+	data.page_info = get_allowed_pages()
+
+def load_user_info_segment(data):
+	if frappe.session.user != "Guest":
+		data.user_info = get_fullnames()
+
+def load_translations_segment(data):
+	load_translations(data)
+	data.lang_dict = get_lang_dict()
+
+def load_page_meta_segment(data):
+	data.docs = get_meta_bundle("Page")
+
+def load_email_segment(data):
+	data.update(get_email_accounts(user=frappe.session.user))
+
+def load_frequently_visited_links_segment(data):
+	data.frequently_visited_links = frequently_visited_links()
+
+def load_print_segment(data):
+	data.docs = []
+	load_print(data, data.docs)
+
+def load_energy_points_segment(data):
+	data.points = get_energy_points(frappe.session.user)
+
+# parts of bootinfo that are built, cached and versioned independently, lazy segments
+# are not sent with the desk, it loads them from local storage or when they change
+boot_segments = OrderedDict([
+	("desktop", frappe._dict(method="frappe.boot.load_desktop_segment")),
+	("user_info", frappe._dict(method="frappe.boot.load_user_info_segment")),
+	("translations", frappe._dict(method="frappe.boot.load_translations_segment")),
+	("page_meta", frappe._dict(method="frappe.boot.load_page_meta_segment")),
+	("email", frappe._dict(method="frappe.boot.load_email_segment")),
+	("frequently_visited_links", frappe._dict(method="frappe.boot.load_frequently_visited_links_segment",
+		lazy=True)),
+	("print", frappe._dict(method="frappe.boot.load_print_segment", lazy=True)),
+	("energy_points", frappe._dict(method="frappe.boot.load_energy_points_segment", lazy=True)),
+])
+
 def get_letter_heads():
 	letter_heads = {}
 	for letter_head in frappe.get_all("Letter Head", fields = ["name", "content", "footer"]):
@@ -187,10 +283,8 @@ def get_column(doctype):
 def load_translations(bootinfo):
 	messages = frappe.get_lang_dict("boot")
 
-	bootinfo["lang"] = frappe.lang
-
 	# load translated report names
-	for name in bootinfo.user.all_reports:
+	for name in frappe.get_user().get_all_reports():
 		messages[name] = frappe._(name)
 
 	# only untranslated
@@ -10,14 +10,16 @@ from frappe.desk.notifications import (delete_notification_count_for,
 
 common_default_keys = ["__default", "__global"]
 
-global_cache_keys = ("app_hooks", "installed_apps",
+global_cache_keys = ("app_hooks", "app_hooks_version", "installed_apps",
 		"app_modules", "module_app", "notification_config", 'system_settings',
 		'scheduler_events', 'time_zone', 'webhooks', 'active_domains',
 		'active_modules', 'assignment_rule')
 
 user_cache_keys = ("bootinfo", "user_recent", "roles", "user_doc", "lang",
 		"defaults", "user_permissions", "home_page", "linked_with",
-		"desktop_icons", 'portal_menu_items')
+		"desktop_icons", 'portal_menu_items', "bootinfo:desktop", "bootinfo:user_info",
+		"bootinfo:translations", "bootinfo:page_meta", "bootinfo:email",
+		"bootinfo:frequently_visited_links", "bootinfo:print", "bootinfo:energy_points")
 
 doctype_cache_keys = ("meta", "form_meta", "table_columns", "last_modified",
 		"linked_doctypes", 'notifications', 'workflow' ,'energy_point_rule_map')
@@ -4,13 +4,10 @@
 from __future__ import unicode_literals, absolute_import, print_function
 import sys
 import click
-import cProfile
-import pstats
 import frappe
 import frappe.utils
 import subprocess # nosec
 from functools import wraps
-from six import StringIO
 
 click.disable_unicode_literals_warning = True
 
@@ -19,12 +16,16 @@ def pass_context(f):
 	def _func(ctx, *args, **kwargs):
 		profile = ctx.obj['profile']
 		if profile:
+			import cProfile
 			pr = cProfile.Profile()
 			pr.enable()
 
 		ret = f(frappe._dict(ctx.obj), *args, **kwargs)
 
 		if profile:
+			import pstats
+			from six import StringIO
+
 			pr.disable()
 			s = StringIO()
 			ps = pstats.Stats(pr, stream=s)\
@@ -5,7 +5,6 @@ import frappe
 from frappe import _
 from frappe.commands import pass_context, get_site
 from frappe.commands.scheduler import _is_scheduler_enabled
-from frappe.installer import update_site_config
 from frappe.utils import touch_file, get_site_path
 from six import text_type
 
@@ -511,6 +510,8 @@ def browse(context, site):
 @click.command('start-recording')
 @pass_context
 def start_recording(context):
+	import frappe.recorder
+
 	for site in context.sites:
 		frappe.init(site=site)
 		frappe.recorder.start()
@@ -519,6 +520,8 @@ def start_recording(context):
 @click.command('stop-recording')
 @pass_context
 def stop_recording(context):
+	import frappe.recorder
+
 	for site in context.sites:
 		frappe.init(site=site)
 		frappe.recorder.stop()
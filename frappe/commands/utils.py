@@ -3,14 +3,9 @@
 from __future__ import unicode_literals, absolute_import, print_function
 import click
 import json, os, sys, subprocess
-from distutils.spawn import find_executable
 import frappe
 from frappe.commands import pass_context, get_site
 from frappe.utils import update_progress_bar, get_bench_path
-from frappe.utils.response import json_handler
-from coverage import Coverage
-import cProfile, pstats
-from six import StringIO
 
 @click.command('build')
 @click.option('--app', help='Build assets for app')
@@ -89,6 +84,53 @@ def show_config(context):
 	configuration = frappe.get_site_config(sites_path=sites_path, site_path=site_path)
 	print_config(configuration)
 
+@click.command('show-import-times')
+@click.option('--module', default='frappe.app', help='Module to import, frappe.app by default')
+@click.option('--limit', default=30, type=int, help='Number of modules to show')
+@pass_context
+def show_import_times(context, module='frappe.app', limit=30):
+	"Show the slowest imports of a new process that imports a module and connects to the site"
+	if sys.version_info < (3, 7):
+		print('show-import-times needs Python 3.7 or later (python -X importtime)')
+		sys.exit(1)
+
+	site = get_site(context)
+	script = ("import frappe, {module}; frappe.init(site={site!r}, sites_path={sites_path!r}); "
+		"frappe.connect(); frappe.destroy()").format(module=module, site=site,
+			sites_path=os.getcwd())
+
+	proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', script],
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+	stderr = frappe.safe_decode(proc.communicate()[1])
+
+	if proc.returncode:
+		print(stderr)
+		sys.exit(proc.returncode)
+
+	times = get_import_times(stderr)
+	print("{0:<60} {1:>12} {2:>12}".format('Module', 'Self (ms)', 'Total (ms)'))
+	for name, self_time, cumulative in sorted(times, key=lambda t: t[2], reverse=True)[:limit]:
+		print("{0:<60} {1:>12.1f} {2:>12.1f}".format(name, self_time / 1000.0, cumulative / 1000.0))
+
+	print("{0} modules, {1:.1f} ms".format(len(times), sum(t[1] for t in times) / 1000.0))
+
+def get_import_times(output):
+	"""Returns (module, self, cumulative) times in microseconds from the output of
+	`python -X importtime`"""
+	times = []
+	for line in output.splitlines():
+		if not line.startswith('import time:'):
+			continue
+
+		parts = line[len('import time:'):].split('|')
+		if len(parts) != 3 or not parts[0].strip().isdigit():
+			# header
+			continue
+
+		times.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+
+	return times
+
 def print_config(config):
 	for conf, value in config.items():
 		if isinstance(value, dict):
@@ -120,6 +162,10 @@ def reset_perms(context):
 @pass_context
 def execute(context, method, args=None, kwargs=None, profile=False):
 	"Execute a function"
+	from frappe.utils.response import json_handler
+	import cProfile, pstats
+	from six import StringIO
+
 	for site in context.sites:
 		try:
 			frappe.init(site=site)
@@ -358,6 +404,7 @@ def mariadb(context):
 		Enter into mariadb console for a given site.
 	"""
 	import os
+	from distutils.spawn import find_executable
 
 	site  = get_site(context)
 	frappe.init(site=site)
@@ -380,6 +427,8 @@ def postgres(context):
 	"""
 		Enter into postgres console for a given site.
 	"""
+	from distutils.spawn import find_executable
+
 	site  = get_site(context)
 	frappe.init(site=site)
 	# This is assuming you're within the bench instance.
@@ -467,6 +516,8 @@ def run_tests(context, app=None, module=None, doctype=None, test=(),
 
 	if coverage:
 		# Generate coverage report only for app that is being tested
+		from coverage import Coverage
+
 		source_path = os.path.join(get_bench_path(), 'apps', app or 'frappe')
 		cov = Coverage(source=[source_path], omit=['*.html', '*.js', '*.xml', '*.css', '*/doctype/*/*_dashboard.py', '*/patches/*'])
 		cov.start()
@@ -653,32 +704,65 @@ def setup_help(context):
 
 @click.command('rebuild-global-search')
 @click.option('--static-pages', is_flag=True, default=False, help='Rebuild global search for static pages')
+@click.option('--resume', is_flag=True, default=False, help='Continue an interrupted rebuild from its last checkpoint')
+@click.option('--jobs', type=int, default=1, help='Number of doctypes to rebuild in parallel')
 @pass_context
-def rebuild_global_search(context, static_pages=False):
+def rebuild_global_search(context, static_pages=False, resume=False, jobs=1):
 	'''Setup help table in the current site (called after migrate)'''
-	from frappe.utils.global_search import (get_doctypes_with_global_search, rebuild_for_doctype,
-		get_routes_to_index, add_route_to_global_search, sync_global_search)
+	from frappe.utils.global_search import (get_doctypes_with_global_search, get_doctypes_to_rebuild,
+		rebuild_for_doctype, get_routes_to_index, add_route_to_global_search, sync_global_search)
 
-	for site in context.sites:
-		try:
-			frappe.init(site)
-			frappe.connect()
+	# fork the workers before connecting, each worker opens its own db connection
+	pool = None
+	if jobs > 1 and not static_pages:
+		from multiprocessing import Pool
+		pool = Pool(jobs)
 
-			if static_pages:
-				routes = get_routes_to_index()
-				for i, route in enumerate(routes):
-					add_route_to_global_search(route)
-					frappe.local.request = None
-					update_progress_bar('Rebuilding Global Search', i, len(routes))
-				sync_global_search()
-			else:
-				doctypes = get_doctypes_with_global_search()
-				for i, doctype in enumerate(doctypes):
-					rebuild_for_doctype(doctype)
-					update_progress_bar('Rebuilding Global Search', i, len(doctypes))
+	try:
+		for site in context.sites:
+			try:
+				frappe.init(site)
+				frappe.connect()
+
+				if static_pages:
+					routes = get_routes_to_index()
+					for i, route in enumerate(routes):
+						add_route_to_global_search(route)
+						frappe.local.request = None
+						update_progress_bar('Rebuilding Global Search', i, len(routes))
+					sync_global_search()
+				else:
+					# workers must not rebuild the same parent of several child tables at once
+					doctypes = get_doctypes_to_rebuild(get_doctypes_with_global_search())
+					if pool:
+						tasks = [(site, doctype, resume) for doctype in doctypes]
+						for i, doctype in enumerate(pool.imap_unordered(_rebuild_global_search_for_doctype, tasks)):
+							update_progress_bar('Rebuilding Global Search', i, len(doctypes))
+					else:
+						for i, doctype in enumerate(doctypes):
+							rebuild_for_doctype(doctype, resume=resume)
+							update_progress_bar('Rebuilding Global Search', i, len(doctypes))
+
+			finally:
+				frappe.destroy()
+	finally:
+		if pool:
+			pool.close()
+			pool.join()
 
-		finally:
-			frappe.destroy()
+def _rebuild_global_search_for_doctype(args):
+	"""Rebuild global search for one doctype in a worker process with its own db connection"""
+	from frappe.utils.global_search import rebuild_for_doctype
+
+	site, doctype, resume = args
+	frappe.init(site)
+	frappe.connect()
+	try:
+		rebuild_for_doctype(doctype, resume=resume)
+	finally:
+		frappe.destroy()
+
+	return doctype
 
 @click.command('auto-deploy')
 @click.argument('app')
@@ -756,6 +840,7 @@ commands = [
 	serve,
 	set_config,
 	show_config,
+	show_import_times,
 	watch,
 	_bulk_rename,
 	add_to_email_queue,
@@ -1144,4 +1144,5 @@ def check_if_fieldname_conflicts_with_methods(doctype, fieldname):
 
 
 def clear_linked_doctype_cache():
-	frappe.cache().delete_value('linked_doctypes_without_ignore_user_permissions_enabled')
+	frappe.cache().delete_value(['link_graph', 'linked_doctypes',
+		'linked_doctypes_without_ignore_user_permissions_enabled'])
@@ -277,4 +277,23 @@ class TestFile(unittest.TestCase):
 		folder = frappe.get_doc("File", "Home/Test Folder 1/Test Folder 3")
 		self.assertRaises(frappe.ValidationError, folder.delete)
 
+	def test_nested_set(self):
+		from frappe.utils.nestedset import get_ancestors_of, get_descendants_of, rebuild_tree
 
+		folder = self.get_folder("Test Folder 2", "Home")
+		subfolder = self.get_folder("Test Folder 3", folder.name)
+		home = _("Home")
+
+		self.assertEqual(get_ancestors_of("File", subfolder.name), [folder.name, home])
+		self.assertEqual(get_ancestors_of("File", subfolder.name, order_by="lft asc", limit=1), [home])
+
+		# cached ancestors are cleared when the tree changes
+		move_file([{"name": folder.name}], self.saved_folder, home)
+		folder = frappe.get_doc("File", {"file_name": _("Test Folder 2")})
+		subfolder = frappe.get_doc("File", {"file_name": _("Test Folder 3")})
+		self.assertEqual(get_ancestors_of("File", subfolder.name), [folder.name, self.saved_folder, home])
+
+		rebuild_tree("File", "folder")
+		self.assertFalse(frappe.db.sql("select name from tabFile where rgt <= lft"))
+		self.assertEqual(set(get_descendants_of("File", self.saved_folder, ignore_permissions=True)),
+			set([folder.name, subfolder.name, self.saved_name]))
@@ -6,14 +6,20 @@
 from __future__ import unicode_literals
 
 import json
+from decimal import Decimal
 
 import frappe
+from frappe import _
 from frappe.desk.form.load import get_attachments
-from frappe.desk.query_report import generate_report_result
+from frappe.desk.query_report import generate_report_result, get_column_type
 from frappe.model.document import Document
-from frappe.utils import gzip_compress, gzip_decompress
+from frappe.utils import cint, cstr, flt, gzip_compress, gzip_decompress
 from frappe.utils.background_jobs import enqueue
 from frappe.core.doctype.file.file import remove_all
+from six import string_types
+
+# rows per page of a paged result file
+PAGE_LENGTH = 5000
 
 
 class PreparedReport(Document):
@@ -46,10 +52,12 @@ def run_background(prepared_report):
 			filters=instance.filters,
 			user=instance.owner
 		)
-		create_json_gz_file(result["result"], "Prepared Report", instance.name)
+		result_index = create_paged_result_file(result["result"], "Prepared Report", instance.name,
+			columns=result["columns"], has_total_row=cint(report.add_total_row))
 
 		instance.status = "Completed"
 		instance.columns = json.dumps(result["columns"])
+		instance.result_index = json.dumps(result_index)
 		instance.report_end_time = frappe.utils.now()
 		instance.save(ignore_permissions=True)
 
@@ -90,10 +98,241 @@ def create_json_gz_file(data, dt, dn):
 	_file.save(ignore_permissions=True)
 
 
+def create_paged_result_file(data, dt, dn, columns=None, has_total_row=False):
+	"""Store report rows in a paged, columnar file and return its index.
+
+	Rows are split into pages of `PAGE_LENGTH` rows and every column of a page is
+	written as a separate gzipped JSON block, so that a page, a single column or
+	the totals can be read without loading the whole result. The index holds the
+	byte offset and length of every block, the row count and the totals of the numeric
+	`columns`. If `has_total_row`, the last row is the total row added by the report
+	and is left out of the totals.
+
+	Blocks of dict rows that do not all have the key also hold the positions of the
+	rows without it, so that they are read back without the key (and `None` values
+	are kept)."""
+	row_format = "dict" if data and isinstance(data[0], dict) else "list"
+	keys = get_column_keys(data, row_format)
+	totals = get_totals(data[:-1] if has_total_row else data, columns, row_format)
+
+	content = bytearray()
+	blocks = []
+	for start in range(0, len(data), PAGE_LENGTH):
+		page = data[start:start + PAGE_LENGTH]
+		page_blocks = []
+		for i, key in enumerate(keys):
+			values = [get_cell(row, key if row_format == "dict" else i) for row in page]
+
+			missing = [j for j, row in enumerate(page) if row_format == "dict" and key not in row]
+			block = {"values": values, "missing": missing} if missing else values
+			block = gzip_compress(frappe.safe_encode(frappe.as_json(block, indent=None)))
+			page_blocks.append([len(content), len(block)])
+			content.extend(block)
+
+		blocks.append(page_blocks)
+
+	file_name = "{0}.report-pages".format(
+		frappe.utils.data.format_datetime(frappe.utils.now(), "Y-m-d-H:M")
+	)
+	_file = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"attached_to_doctype": dt,
+		"attached_to_name": dn,
+		"is_private": 1,
+		"content": bytes(content)
+	})
+	_file.save(ignore_permissions=True)
+
+	return {
+		"version": 1,
+		"file": _file.name,
+		"row_format": row_format,
+		"row_count": len(data),
+		"page_length": PAGE_LENGTH,
+		"keys": keys,
+		"blocks": blocks,
+		"totals": totals
+	}
+
+def get_column_keys(data, row_format):
+	if row_format == "list":
+		return list(range(max(len(row) for row in data))) if data else []
+
+	keys = []
+	seen = set()
+	for row in data:
+		for key in row:
+			if key not in seen:
+				seen.add(key)
+				keys.append(key)
+	return keys
+
+def get_cell(row, key):
+	if isinstance(row, dict):
+		return row.get(key)
+	return row[key] if key < len(row) else None
+
+def get_totals(data, columns, row_format):
+	"""Returns the totals of the columns totalled by `add_total_row`, the sum of currency,
+	int and float columns and the average of percent columns"""
+	totals = {}
+	for i, col in enumerate(columns or []):
+		fieldtype, options, fieldname = get_column_type(col)
+		key = fieldname if row_format == "dict" else i
+		if fieldtype not in ("Currency", "Int", "Float", "Percent") or key is None:
+			continue
+
+		total = sum(flt(get_cell(row, key)) for row in data)
+		if fieldtype == "Percent" and data:
+			total = total / len(data)
+		totals[cstr(key)] = total
+	return totals
+
+class PagedResult(object):
+	"""Reader for results written by `create_paged_result_file`"""
+	def __init__(self, result_index):
+		if isinstance(result_index, string_types):
+			result_index = json.loads(result_index)
+
+		self.index = frappe._dict(result_index)
+		self.path = frappe.get_doc("File", self.index.file).get_full_path()
+
+	def read_block(self, page, column):
+		"""Returns the values of a column in a page and the positions of the rows
+		that do not have the column"""
+		offset, length = self.index.blocks[page][column]
+		with open(self.path, "rb") as f:
+			f.seek(offset)
+			block = json.loads(gzip_decompress(f.read(length)).decode("utf-8"))
+
+		if isinstance(block, dict):
+			return block["values"], set(block["missing"])
+		return block, set()
+
+	def get_column(self, key):
+		"""Returns all values of one column"""
+		column = self.get_column_idx(key)
+		values = []
+		for page in range(len(self.index.blocks)):
+			values.extend(self.read_block(page, column)[0])
+		return values
+
+	def get_column_idx(self, key):
+		for i, k in enumerate(self.index.keys):
+			if cstr(k) == cstr(key):
+				return i
+		frappe.throw(_("Column {0} not found in the report result").format(key))
+
+	def get_page(self, page):
+		"""Returns rows of the given page, as stored"""
+		blocks = [self.read_block(page, i) for i in range(len(self.index.keys))]
+		if not blocks:
+			return []
+
+		columns = [values for values, missing in blocks]
+		if self.index.row_format == "list":
+			return [list(values) for values in zip(*columns)]
+
+		rows = []
+		for j, values in enumerate(zip(*columns)):
+			rows.append({key: value for key, value, (values_, missing) in zip(self.index.keys, values, blocks)
+				if j not in missing})
+		return rows
+
+	def get_rows(self, row_indexes):
+		"""Returns rows at the given positions, loading only the pages that contain them"""
+		pages = {}
+		rows = []
+		for idx in row_indexes:
+			page = idx // self.index.page_length
+			if page not in pages:
+				pages[page] = self.get_page(page)
+			rows.append(pages[page][idx % self.index.page_length])
+		return rows
+
+	def get_all(self):
+		rows = []
+		for page in range(len(self.index.blocks)):
+			rows.extend(self.get_page(page))
+		return rows
+
+	def get_row_indexes(self, sort_by=None, sort_order="asc", filter_column=None, filter_value=None):
+		"""Returns row positions after applying an optional `like` filter and sort on one column each"""
+		row_indexes = list(range(self.index.row_count))
+
+		if filter_column and filter_value not in (None, ""):
+			filter_value = cstr(filter_value).lower()
+			values = self.get_column(filter_column)
+			row_indexes = [i for i in row_indexes if filter_value in cstr(values[i]).lower()]
+
+		if sort_by:
+			values = self.get_column(sort_by)
+			row_indexes.sort(key=lambda i: get_sort_key(values[i]), reverse=(sort_order == "desc"))
+
+		return row_indexes
+
+def get_sort_key(value):
+	if value is None:
+		return (0, 0, "")
+	if isinstance(value, (int, float, Decimal)):
+		return (1, value, "")
+	return (2, 0, cstr(value))
+
+def get_paged_result(doc):
+	"""Returns `PagedResult` for a Prepared Report, None if it was stored in the old single file format"""
+	if doc.get("result_index"):
+		return PagedResult(doc.result_index)
+
+@frappe.whitelist()
+def get_result_page(dn, start=0, page_length=100, sort_by=None, sort_order="asc",
+	filter_column=None, filter_value=None):
+	"""Returns one page of a prepared report result, optionally sorted and filtered by a column"""
+	from frappe.desk.query_report import get_filtered_data
+
+	doc = get_prepared_report_for_read(dn)
+	paged_result = get_paged_result(doc)
+	if not paged_result:
+		frappe.throw(_("Prepared Report {0} does not support paging, please rebuild it").format(dn))
+
+	start, page_length = cint(start), cint(page_length)
+	row_indexes = paged_result.get_row_indexes(sort_by, sort_order, filter_column, filter_value)
+	columns = json.loads(doc.columns) if doc.columns else []
+	rows = paged_result.get_rows(row_indexes[start:start + page_length])
+	ref_doctype = frappe.get_cached_value("Report", doc.ref_report_doctype, "ref_doctype")
+
+	return {
+		"columns": columns,
+		"result": get_filtered_data(ref_doctype, columns, rows, doc.owner) if rows else [],
+		"total_count": len(row_indexes),
+		# offset of the next page, rows filtered out by permissions are counted
+		"next_start": start + len(rows),
+		"totals": paged_result.index.totals
+	}
+
+@frappe.whitelist()
+def get_result_totals(dn):
+	"""Returns the totals of the numeric columns of a prepared report result"""
+	doc = get_prepared_report_for_read(dn)
+	paged_result = get_paged_result(doc)
+	return paged_result.index.totals if paged_result else {}
+
+def get_prepared_report_for_read(dn):
+	doc = frappe.get_doc("Prepared Report", dn)
+	if doc.owner != frappe.session.user:
+		doc.check_permission("read")
+	return doc
+
 @frappe.whitelist()
 def download_attachment(dn):
 	attachment = get_attachments("Prepared Report", dn)[0]
-	frappe.local.response.filename = attachment.file_name[:-2]
-	attached_file = frappe.get_doc("File", attachment.name)
-	frappe.local.response.filecontent = gzip_decompress(attached_file.get_content())
+	doc = frappe.get_doc("Prepared Report", dn)
+	paged_result = get_paged_result(doc)
+	if paged_result:
+		frappe.local.response.filename = attachment.file_name.rsplit(".", 1)[0] + ".json"
+		frappe.local.response.filecontent = frappe.as_json(paged_result.get_all())
+	else:
+		frappe.local.response.filename = attachment.file_name[:-2]
+		attached_file = frappe.get_doc("File", attachment.name)
+		frappe.local.response.filecontent = gzip_decompress(attached_file.get_content())
 	frappe.local.response.type = "binary"
@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 import frappe
 import unittest
 import json
+from frappe.core.doctype.prepared_report import prepared_report
 
 
 class TestPreparedReport(unittest.TestCase):
@@ -32,3 +33,33 @@ class TestPreparedReport(unittest.TestCase):
 	def test_for_creation(self):
 		self.assertTrue('QUEUED' == self.prepared_report_doc.status.upper())
 		self.assertTrue(self.prepared_report_doc.report_start_time)
+
+	def test_paged_result(self):
+		columns = [{"fieldname": "name", "fieldtype": "Data"}, {"fieldname": "qty", "fieldtype": "Int"},
+			{"fieldname": "rate", "fieldtype": "Currency"}, {"fieldname": "discount", "fieldtype": "Percent"}]
+		data = [{"name": "Row {0}".format(i), "qty": i, "rate": 1.5, "discount": 10} for i in range(11)]
+		data[3]["indent"] = 1
+		data[4]["rate"] = None
+		data.append({"name": "Total", "qty": 55, "rate": 15.0, "discount": 10})
+
+		page_length = prepared_report.PAGE_LENGTH
+		prepared_report.PAGE_LENGTH = 5
+		try:
+			result_index = prepared_report.create_paged_result_file(data,
+				"Prepared Report", self.prepared_report_doc.name, columns=columns, has_total_row=True)
+		finally:
+			prepared_report.PAGE_LENGTH = page_length
+
+		self.assertEqual(len(result_index["blocks"]), 3)
+
+		# the total row of the report is not counted again
+		self.assertEqual(result_index["totals"], {"qty": 55, "rate": 15.0, "discount": 10})
+
+		paged_result = prepared_report.PagedResult(json.dumps(result_index))
+		self.assertEqual(paged_result.get_all(), data)
+		self.assertEqual(paged_result.get_page(2), data[10:])
+		self.assertEqual(paged_result.get_column("qty"), list(range(11)) + [55])
+
+		row_indexes = paged_result.get_row_indexes(sort_by="qty", sort_order="desc",
+			filter_column="name", filter_value="row 1")
+		self.assertEqual(paged_result.get_rows(row_indexes), [data[10], data[1]])
@@ -55,6 +55,8 @@ class CustomField(Document):
 
 	def on_update(self):
 		frappe.clear_cache(doctype=self.dt)
+		from frappe.core.doctype.doctype.doctype import clear_linked_doctype_cache
+		clear_linked_doctype_cache()
 		if not self.flags.ignore_validate:
 			# validate field
 			from frappe.core.doctype.doctype.doctype import validate_fields_for_doctype
@@ -73,6 +75,8 @@ class CustomField(Document):
 				(self.dt, self.fieldname))
 
 		frappe.clear_cache(doctype=self.dt)
+		from frappe.core.doctype.doctype.doctype import clear_linked_doctype_cache
+		clear_linked_doctype_cache()
 
 	def validate_insert_after(self, meta):
 		if not meta.get_field(self.insert_after):
@@ -18,6 +18,8 @@ from time import time
 from frappe.utils import now, getdate, cast_fieldtype
 from frappe.utils.background_jobs import execute_job, get_queue
 from frappe.model.utils.link_count import flush_local_link_count
+from frappe.desk.notifications import flush_open_count_deltas
+from frappe.utils.search_backends import flush_search_index_writes
 from frappe.utils import cint
 
 # imports - compatibility imports
@@ -66,6 +68,9 @@ class Database(object):
 		self.password = password or frappe.conf.db_password
 		self.value_cache = {}
 
+		# changes queued until commit, as they were when each savepoint was set
+		self.savepoint_queues = {}
+
 	def setup_type_map(self):
 		pass
 
@@ -735,10 +740,13 @@ class Database(object):
 		"""Commit current transaction. Calls SQL `COMMIT`."""
 		self.sql("commit")
 
+		self.savepoint_queues = {}
 		frappe.local.rollback_observers = []
 		self.flush_realtime_log()
 		enqueue_jobs_after_commit()
 		flush_local_link_count()
+		flush_open_count_deltas()
+		flush_search_index_writes()
 
 	@staticmethod
 	def flush_realtime_log():
@@ -747,15 +755,49 @@ class Database(object):
 
 		frappe.local.realtime_log = []
 
-	def rollback(self):
-		"""`ROLLBACK` current transaction."""
+	def savepoint(self, save_point):
+		"""Set a savepoint in the current transaction, see `rollback(save_point=...)`"""
+		self.sql("savepoint {0}".format(save_point))
+		self.savepoint_queues[save_point] = (dict(getattr(frappe.local, "open_count_deltas", None) or {}),
+			list(getattr(frappe.local, "search_index_writes", None) or []))
+
+	def rollback(self, save_point=None):
+		"""`ROLLBACK` current transaction, or only the changes after the given savepoint."""
+		if save_point:
+			self.sql("rollback to savepoint {0}".format(save_point))
+
+			# drop the changes queued after the savepoint
+			if save_point in self.savepoint_queues:
+				open_count_deltas, search_index_writes = self.savepoint_queues[save_point]
+				frappe.local.open_count_deltas = dict(open_count_deltas)
+				frappe.local.search_index_writes = list(search_index_writes)
+			return
+
 		self.sql("rollback")
 		self.begin()
+		self.savepoint_queues = {}
+		frappe.local.open_count_deltas = {}
+		frappe.local.search_index_writes = []
 		for obj in frappe.local.rollback_observers:
 			if hasattr(obj, "on_rollback"):
 				obj.on_rollback()
 		frappe.local.rollback_observers = []
 
+	def bulk_insert(self, doctype, fields, values, chunk_size=100):
+		"""Insert rows with multi-row `insert` queries. No hooks or validations are run.
+
+		:param doctype: DocType of the rows.
+		:param fields: List of column names.
+		:param values: List of rows, each a list of values in the order of `fields`."""
+		columns = ", ".join("`{0}`".format(f) for f in fields)
+		row_placeholder = "({0})".format(", ".join(["%s"] * len(fields)))
+
+		values = list(values)
+		for i in range(0, len(values), chunk_size):
+			chunk = values[i:i + chunk_size]
+			self.sql("""insert into `tab{0}` ({1}) values {2}""".format(doctype, columns,
+				", ".join([row_placeholder] * len(chunk))), [v for row in chunk for v in row])
+
 	def field_exists(self, dt, fn):
 		"""Return true of field exists."""
 		return self.exists('DocField', {
@@ -213,6 +213,34 @@ class MariaDBDatabase(Database):
 			UNIQUE(user, doctype)
 			) ENGINE=InnoDB DEFAULT CHARSET=utf8""")
 
+	def create_dashboard_chart_rollup_table(self):
+		self.sql_ddl("""create table if not exists __dashboard_chart_rollup (
+			`chart` VARCHAR(140) NOT NULL,
+			`timegrain` VARCHAR(20) NOT NULL,
+			`period` DATE NOT NULL,
+			`value` DECIMAL(21,9) NOT NULL DEFAULT 0,
+			`count` INT(11) NOT NULL DEFAULT 0,
+			PRIMARY KEY (`chart`, `timegrain`, `period`)
+			) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""")
+
+	def create_link_search_index_table(self):
+		self.sql_ddl("""create table if not exists __link_search_index (
+			`doctype` VARCHAR(140) NOT NULL,
+			`gram` VARCHAR(3) NOT NULL,
+			`name` VARCHAR(140) NOT NULL,
+			PRIMARY KEY (`doctype`, `gram`, `name`),
+			KEY `doctype_name` (`doctype`, `name`)
+			) ENGINE=InnoDB CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci""")
+
+	def create_tag_link_table(self):
+		self.sql_ddl("""create table if not exists __tag_link (
+			`document_type` VARCHAR(140) NOT NULL,
+			`document_name` VARCHAR(140) NOT NULL,
+			`tag` VARCHAR(140) NOT NULL,
+			PRIMARY KEY (`document_type`, `document_name`, `tag`),
+			KEY `document_type_tag` (`document_type`, `tag`)
+			) ENGINE=InnoDB CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci""")
+
 	def create_help_table(self):
 		self.sql('''create table help(
 				path varchar(255),
@@ -202,6 +202,36 @@ class PostgresDatabase(Database):
 			UNIQUE ("user", "doctype")
 			)""")
 
+	def create_dashboard_chart_rollup_table(self):
+		self.sql_ddl("""create table if not exists "__dashboard_chart_rollup" (
+			"chart" VARCHAR(140) NOT NULL,
+			"timegrain" VARCHAR(20) NOT NULL,
+			"period" DATE NOT NULL,
+			"value" DECIMAL(21,9) NOT NULL DEFAULT 0,
+			"count" INT NOT NULL DEFAULT 0,
+			PRIMARY KEY ("chart", "timegrain", "period")
+			)""")
+
+	def create_link_search_index_table(self):
+		self.sql_ddl("""create table if not exists "__link_search_index" (
+			"doctype" VARCHAR(140) NOT NULL,
+			"gram" VARCHAR(3) NOT NULL,
+			"name" VARCHAR(140) NOT NULL,
+			PRIMARY KEY ("doctype", "gram", "name")
+			)""")
+		self.sql_ddl("""create index if not exists "__link_search_index_doctype_name"
+			on "__link_search_index" ("doctype", "name")""")
+
+	def create_tag_link_table(self):
+		self.sql_ddl("""create table if not exists "__tag_link" (
+			"document_type" VARCHAR(140) NOT NULL,
+			"document_name" VARCHAR(140) NOT NULL,
+			"tag" VARCHAR(140) NOT NULL,
+			PRIMARY KEY ("document_type", "document_name", "tag")
+			)""")
+		self.sql_ddl("""create index if not exists "__tag_link_document_type_tag"
+			on "__tag_link" ("document_type", "tag")""")
+
 	def create_help_table(self):
 		self.sql('''CREATE TABLE "help"(
 				"path" varchar(255),
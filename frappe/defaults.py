@@ -74,11 +74,15 @@ def get_user_permissions(user=None):
 	return _get_user_permissions(user)
 
 def get_defaults(user=None):
-	globald = get_defaults_for()
-
 	if not user:
 		user = frappe.session.user if frappe.session else "Guest"
 
+	if user:
+		# fetch global and user defaults from redis in one round trip
+		frappe.cache().hget_many("defaults", ["__default", user])
+
+	globald = get_defaults_for()
+
 	if user:
 		userd = {}
 		userd.update(get_defaults_for(user))
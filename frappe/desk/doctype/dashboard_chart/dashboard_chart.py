@@ -7,8 +7,9 @@ import frappe
 from frappe import _
 import datetime
 from frappe.core.page.dashboard.dashboard import cache_source, get_from_date_from_timespan
-from frappe.utils import nowdate, add_to_date, getdate, get_last_day, formatdate
+from frappe.utils import nowdate, add_to_date, getdate, get_last_day, formatdate, flt, cint, now
 from frappe.model.document import Document
+from six import string_types
 
 @frappe.whitelist()
 @cache_source
@@ -20,16 +21,18 @@ def get(chart_name = None, chart = None, no_cache = None, from_date=None, to_dat
 
 	timespan = chart.timespan
 	timegrain = chart.time_interval
-	filters = frappe.parse_json(chart.filters_json)
-
-	# don't include cancelled documents
-	filters['docstatus'] = ('<', 2)
+	filters = get_chart_filters(chart)
 
 	if not from_date:
 		from_date = get_from_date_from_timespan(to_date, timespan)
 	if not to_date:
 		to_date = datetime.datetime.now()
 
+	if chart_name and chart.use_rollup and chart.rollup_synced_upto:
+		result = get_rollup_values(chart, timegrain, from_date, to_date)
+		result = add_missing_values(result, timegrain, from_date, to_date)
+		return get_chart_data(chart, result)
+
 	# get conditions from filters
 	conditions, values = frappe.db.build_conditions(filters)
 
@@ -63,6 +66,9 @@ def get(chart_name = None, chart = None, no_cache = None, from_date=None, to_dat
 	# add missing data points for periods where there was no result
 	result = add_missing_values(result, timegrain, from_date, to_date)
 
+	return get_chart_data(chart, result)
+
+def get_chart_data(chart, result):
 	return {
 		"labels": [formatdate(r[0].strftime('%Y-%m-%d')) for r in result],
 		"datasets": [{
@@ -71,6 +77,14 @@ def get(chart_name = None, chart = None, no_cache = None, from_date=None, to_dat
 		}]
 	}
 
+def get_chart_filters(chart):
+	filters = frappe.parse_json(chart.filters_json) or {}
+
+	# don't include cancelled documents
+	filters['docstatus'] = ('<', 2)
+
+	return filters
+
 def get_aggregate_function(chart_type):
 	return {
 		"Sum": "SUM",
@@ -201,9 +215,222 @@ def get_quarter_ending(date):
 	return date
 
 
+def get_period_range(date, timegrain):
+	"""Returns the first and last date of the period (as grouped by `get`) that contains `date`"""
+	date = getdate(date)
+	if timegrain == 'Daily':
+		return date, date
+	elif timegrain == 'Weekly':
+		# weeks start on Sunday and do not span across years
+		start = getdate(add_to_date(date, days = -((date.weekday() + 1) % 7)))
+		end = getdate(add_to_date(start, days = 6))
+		return (max(start, getdate('{}-01-01'.format(date.year))),
+			min(end, getdate('{}-12-31'.format(date.year))))
+	elif timegrain == 'Monthly':
+		return getdate('{}-{}-01'.format(date.year, date.month)), getdate(get_month_ending(date))
+	elif timegrain == 'Quarterly':
+		end = get_quarter_ending(date)
+		return getdate('{}-{}-01'.format(end.year, end.month - 2)), end
+
+def get_rollup_values(chart, timegrain, from_date, to_date):
+	"""Returns [period ending, value] from the pre-aggregated values of the chart.
+	The first and last periods are queried from the source doctype if `from_date` or
+	`to_date` fall within them"""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	data = frappe.db.sql('''
+		select `period`, `value`, `count`
+		from `__dashboard_chart_rollup`
+		where `chart`=%s and `timegrain`=%s and `period` >= %s and `period` <= %s
+		order by `period` asc
+	''', (chart.name, timegrain, get_period_ending(from_date, timegrain),
+		get_period_ending(to_date, timegrain)))
+	data = [[getdate(period), value, count] for period, value, count in data]
+
+	first_period_start, first_period_end = get_period_range(from_date, timegrain)
+	last_period_start, last_period_end = get_period_range(to_date, timegrain)
+	partial_periods = {}
+	if from_date > first_period_start:
+		partial_periods[get_period_ending(from_date, timegrain)] = (from_date, min(first_period_end, to_date))
+	if to_date < last_period_end:
+		partial_periods[get_period_ending(to_date, timegrain)] = (max(last_period_start, from_date), to_date)
+
+	if partial_periods:
+		data = [d for d in data if d[0] not in partial_periods]
+		for period, (start, end) in partial_periods.items():
+			value, count = get_period_value(chart, start, end)
+			if count:
+				data.append([period, value, count])
+		data.sort(key=lambda d: d[0])
+
+	result = []
+	for period, value, count in data:
+		if chart.chart_type == 'Count':
+			value = count
+		elif chart.chart_type == 'Average':
+			value = flt(value) / count if count else 0
+		result.append([period, flt(value)])
+
+	return result
+
+def get_period_value(chart, start, end):
+	"""Returns sum and count of the chart's value over documents between the given dates"""
+	conditions, values = frappe.db.build_conditions(get_chart_filters(chart))
+	values.update({'_from_date': getdate(start), '_to_date': getdate(add_to_date(end, days = 1))})
+
+	return frappe.db.sql('''
+		select sum({value_field}), count(*)
+		from `tab{doctype}`
+		where
+			{conditions}
+			and {datefield} >= %(_from_date)s
+			and {datefield} < %(_to_date)s
+	'''.format(
+		value_field = chart.value_based_on or '1',
+		doctype = chart.document_type,
+		datefield = chart.based_on,
+		conditions = conditions
+	), values)[0]
+
+def rebuild_rollup(chart):
+	"""Rebuild all pre-aggregated values of the chart with one `group by` over the source doctype"""
+	if isinstance(chart, string_types):
+		chart = frappe.get_doc('Dashboard Chart', chart)
+
+	frappe.db.create_dashboard_chart_rollup_table()
+	frappe.db.sql('delete from `__dashboard_chart_rollup` where `chart`=%s', chart.name)
+
+	conditions, values = frappe.db.build_conditions(get_chart_filters(chart))
+	synced_upto = get_modified_watermark(chart.document_type)
+
+	data = frappe.db.sql('''
+		select
+			extract(year from {datefield}) as _year,
+			{unit_function} as _unit,
+			sum({value_field}),
+			count(*)
+		from `tab{doctype}`
+		where
+			{conditions}
+			and {datefield} is not null
+		group by _year, _unit
+	'''.format(
+		unit_function = get_unit_function(chart.based_on, chart.time_interval),
+		datefield = chart.based_on,
+		value_field = chart.value_based_on or '1',
+		doctype = chart.document_type,
+		conditions = conditions
+	), values)
+
+	for period, (value, count) in convert_to_dates([(d[0], d[1], (d[2], d[3])) for d in data],
+		chart.time_interval):
+		insert_rollup_value(chart, period, value, count)
+
+	chart.db_set('rollup_synced_upto', synced_upto or now(), update_modified = False)
+
+def update_rollup_periods(chart, dates):
+	"""Recompute the pre-aggregated values of the periods that contain the given dates"""
+	periods = {}
+	for date in dates:
+		if date:
+			periods[get_period_ending(date, chart.time_interval)] = get_period_range(date, chart.time_interval)
+
+	if not periods:
+		return
+
+	for period, (start, end) in periods.items():
+		value, count = get_period_value(chart, start, end)
+
+		frappe.db.sql('''delete from `__dashboard_chart_rollup`
+			where `chart`=%s and `timegrain`=%s and `period`=%s''', (chart.name, chart.time_interval, period))
+		if count:
+			insert_rollup_value(chart, period, value, count)
+
+def insert_rollup_value(chart, period, value, count):
+	frappe.db.sql('''insert into `__dashboard_chart_rollup`
+		(`chart`, `timegrain`, `period`, `value`, `count`)
+		values (%s, %s, %s, %s, %s)''', (chart.name, chart.time_interval, period, flt(value), cint(count)))
+
+def get_modified_watermark(doctype):
+	return frappe.db.sql('select max(modified) from `tab{doctype}`'.format(doctype = doctype))[0][0]
+
+def get_rollup_charts(doctype):
+	"""Returns names of charts with pre-aggregated values over the given doctype"""
+	return frappe.cache().hget('dashboard_chart_rollups', doctype,
+		lambda: frappe.db.sql_list('''select name from `tabDashboard Chart`
+			where document_type=%s and use_rollup=1''', doctype))
+
+def update_rollups(doc, method=None):
+	"""Update pre-aggregated chart values of the periods affected by a document change.
+	Called on update, cancel and delete of all documents"""
+	if frappe.flags.in_install or frappe.flags.in_migrate or frappe.flags.in_patch \
+		or doc.meta.istable or doc.meta.issingle:
+		return
+
+	chart_names = get_rollup_charts(doc.doctype)
+	if not chart_names:
+		return
+
+	doc_before_save = doc.get_doc_before_save()
+	for chart_name in chart_names:
+		chart = frappe.get_cached_doc('Dashboard Chart', chart_name)
+		if not chart.rollup_synced_upto:
+			# not built yet, the rebuild will include this change
+			continue
+
+		dates = [doc.get(chart.based_on)]
+		if doc_before_save:
+			dates.append(doc_before_save.get(chart.based_on))
+
+		update_rollup_periods(chart, dates)
+
+def sync_rollups():
+	"""Catch up with changes made without document events (e.g. `db.set_value` or bulk updates)
+	by recomputing the periods of documents modified after the last sync"""
+	for name in frappe.db.sql_list('select name from `tabDashboard Chart` where use_rollup=1'):
+		chart = frappe.get_doc('Dashboard Chart', name)
+		if chart.chart_type == 'Custom':
+			continue
+
+		if not chart.rollup_synced_upto:
+			rebuild_rollup(chart)
+			frappe.db.commit()
+			continue
+
+		synced_upto = get_modified_watermark(chart.document_type)
+		if not synced_upto or synced_upto <= frappe.utils.get_datetime(chart.rollup_synced_upto):
+			continue
+
+		dates = frappe.db.sql_list('''select distinct {datefield} from `tab{doctype}`
+			where modified > %s and modified <= %s'''.format(datefield = chart.based_on,
+			doctype = chart.document_type), (chart.rollup_synced_upto, synced_upto))
+
+		update_rollup_periods(chart, dates)
+		chart.db_set('rollup_synced_upto', synced_upto, update_modified = False)
+		frappe.db.commit()
+
+
 class DashboardChart(Document):
 	def on_update(self):
 		frappe.cache().delete_key('chart-data:{}'.format(self.name))
+		frappe.cache().delete_value('dashboard_chart_rollups')
+
+		if self.use_rollup and self.chart_type != 'Custom' and self.rollup_needs_rebuild():
+			self.db_set('rollup_synced_upto', None, update_modified = False)
+			frappe.enqueue('frappe.desk.doctype.dashboard_chart.dashboard_chart.rebuild_rollup',
+				chart = self.name, enqueue_after_commit = True)
+
+	def on_trash(self):
+		frappe.cache().delete_value('dashboard_chart_rollups')
+		if '__dashboard_chart_rollup' in frappe.db.get_tables():
+			frappe.db.sql('delete from `__dashboard_chart_rollup` where `chart`=%s', self.name)
+
+	def rollup_needs_rebuild(self):
+		doc_before_save = self.get_doc_before_save()
+		if not doc_before_save or not doc_before_save.use_rollup:
+			return True
+
+		return any(self.get(fieldname) != doc_before_save.get(fieldname) for fieldname in
+			('document_type', 'based_on', 'value_based_on', 'time_interval', 'filters_json', 'chart_type'))
 
 	def validate(self):
 		if self.chart_type != 'Custom':
@@ -6,7 +6,7 @@ from __future__ import unicode_literals
 import unittest, frappe
 from frappe.utils import getdate, formatdate
 from frappe.desk.doctype.dashboard_chart.dashboard_chart import (get,
-	get_period_ending)
+	get_period_ending, get_period_range, rebuild_rollup)
 
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
@@ -36,6 +36,21 @@ class TestDashboardChart(unittest.TestCase):
 		self.assertEqual(get_period_ending('2019-10-01', 'Quarterly'),
 			getdate('2019-12-31'))
 
+	def test_period_range(self):
+		self.assertEqual(get_period_range('2019-04-10', 'Daily'),
+			(getdate('2019-04-10'), getdate('2019-04-10')))
+
+		# weeks start on Sunday and are cut at the start and end of the year
+		self.assertEqual(get_period_range('2019-04-10', 'Weekly'),
+			(getdate('2019-04-07'), getdate('2019-04-13')))
+		self.assertEqual(get_period_range('2019-01-02', 'Weekly'),
+			(getdate('2019-01-01'), getdate('2019-01-05')))
+
+		self.assertEqual(get_period_range('2019-02-10', 'Monthly'),
+			(getdate('2019-02-01'), getdate('2019-02-28')))
+		self.assertEqual(get_period_range('2019-11-30', 'Quarterly'),
+			(getdate('2019-10-01'), getdate('2019-12-31')))
+
 	def test_dashboard_chart(self):
 		if frappe.db.exists('Dashboard Chart', 'Test Dashboard Chart'):
 			frappe.delete_doc('Dashboard Chart', 'Test Dashboard Chart')
@@ -129,3 +144,36 @@ class TestDashboardChart(unittest.TestCase):
 		self.assertEqual(result.get('datasets')[0].get('values')[2], 0)
 
 		frappe.db.rollback()
+
+	def test_dashboard_chart_rollup(self):
+		if frappe.db.exists('Dashboard Chart', 'Test Rollup Dashboard Chart'):
+			frappe.delete_doc('Dashboard Chart', 'Test Rollup Dashboard Chart')
+
+		chart = frappe.get_doc(dict(
+			doctype = 'Dashboard Chart',
+			chart_name = 'Test Rollup Dashboard Chart',
+			chart_type = 'Count',
+			document_type = 'ToDo',
+			based_on = 'creation',
+			timespan = 'Last Year',
+			time_interval = 'Monthly',
+			filters_json = '{}',
+			timeseries = 1
+		)).insert()
+
+		expected = get(chart_name = 'Test Rollup Dashboard Chart', refresh = 1)
+
+		chart.use_rollup = 1
+		chart.save()
+		rebuild_rollup(chart.name)
+
+		result = get(chart_name = 'Test Rollup Dashboard Chart', refresh = 1)
+		self.assertEqual(result, expected)
+
+		# new documents are added to the pre-aggregated values
+		frappe.get_doc(dict(doctype = 'ToDo', description = 'Test Rollup')).insert()
+		result = get(chart_name = 'Test Rollup Dashboard Chart', refresh = 1)
+		self.assertEqual(result.get('datasets')[0].get('values')[-1],
+			expected.get('datasets')[0].get('values')[-1] + 1)
+
+		frappe.db.rollback()
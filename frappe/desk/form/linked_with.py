@@ -3,7 +3,7 @@
 from __future__ import unicode_literals
 
 import frappe, json
-from frappe.model.meta import is_single
+from frappe.utils import cint
 from frappe.modules import load_doctype_module
 import frappe.desk.form.meta
 import frappe.desk.form.load
@@ -13,14 +13,52 @@ from collections import defaultdict
 
 @frappe.whitelist()
 def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
+	"""Returns documents linked with the given document, by linking doctype.
+
+	Names of the linked documents of all doctypes are fetched in one `union all`
+	query, with the permission conditions of each doctype. List view fields are
+	then fetched only for doctypes that have links."""
+	queries, fields_by_doctype = get_linked_doc_queries(doctype, name, linkinfo, for_doctype)
+
+	linked_names = {}
+	for dt, linked_name in run_union_query(["select {0} as `doctype`, `name` from ({1}) `t{2}`".format(
+		frappe.db.escape(dt, percent=False), query, i) for i, (dt, query) in enumerate(queries)]):
+		linked_names.setdefault(dt, []).append(linked_name)
+
+	results = {}
+	for dt, names in linked_names.items():
+		# names are already filtered by permissions
+		results[dt] = frappe.get_all(dt, fields=fields_by_doctype[dt],
+			filters=[[dt, "name", "in", names]])
+
+	return results
+
+@frappe.whitelist()
+def get_linked_docs_count(doctype, name, linkinfo=None, for_doctype=None):
+	"""Returns the number of documents linked with the given document, by linking doctype"""
+	queries = get_linked_doc_queries(doctype, name, linkinfo, for_doctype)[0]
+
+	return dict(run_union_query(["select {0} as `doctype`, count(*) from ({1}) `t{2}`".format(
+		frappe.db.escape(dt, percent=False), query, i) for i, (dt, query) in enumerate(queries)]))
+
+def run_union_query(queries):
+	if not queries:
+		return []
+
+	# no query values, the subqueries are already escaped
+	return frappe.db.sql(" union all ".join(queries))
+
+def get_linked_doc_queries(doctype, name, linkinfo=None, for_doctype=None):
+	"""Returns a list of (doctype, query of the names of linked documents the user can read)
+	and the list view fields of each doctype"""
 	if isinstance(linkinfo, string_types):
 		# additional fields are added in linkinfo
 		linkinfo = json.loads(linkinfo)
 
-	results = {}
+	queries, fields_by_doctype = [], {}
 
 	if not linkinfo:
-		return results
+		return queries, fields_by_doctype
 
 	if for_doctype:
 		links = frappe.get_doc(doctype, name).get_link_filters(for_doctype)
@@ -32,7 +70,7 @@ def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
 			# only get linked with for this particular doctype
 			linkinfo = { for_doctype: linkinfo.get(for_doctype) }
 		else:
-			return results
+			return queries, fields_by_doctype
 
 	me = frappe.db.get_value(doctype, name, ["parenttype", "parent"], as_dict=True)
 
@@ -53,16 +91,19 @@ def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
 			fields = ["`tab{dt}`.`{fn}`".format(dt=dt, fn=sf.strip()) for sf in fields if sf
 				and "`tab" not in sf]
 
+			name_field = ["`tab{dt}`.`name`".format(dt=dt)]
+
 			try:
 				if link.get("filters"):
-					ret = frappe.get_list(doctype=dt, fields=fields, filters=link.get("filters"))
+					query = frappe.get_list(doctype=dt, fields=name_field, filters=link.get("filters"),
+						return_query=True)
 
 				elif link.get("get_parent"):
 					if me and me.parent and me.parenttype == dt:
-						ret = frappe.get_list(doctype=dt, fields=fields,
-							filters=[[dt, "name", '=', me.parent]])
+						query = frappe.get_list(doctype=dt, fields=name_field,
+							filters=[[dt, "name", '=', me.parent]], return_query=True)
 					else:
-						ret = None
+						query = None
 
 				elif link.get("child_doctype"):
 					or_filters = [[link.get('child_doctype'), link_fieldnames, '=', name] for link_fieldnames in link.get("fieldname")]
@@ -71,7 +112,8 @@ def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
 					if link.get("doctype_fieldname"):
 						filters.append([link.get('child_doctype'), link.get("doctype_fieldname"), "=", doctype])
 
-					ret = frappe.get_list(doctype=dt, fields=fields, filters=filters, or_filters=or_filters, distinct=True)
+					query = frappe.get_list(doctype=dt, fields=name_field, filters=filters, or_filters=or_filters,
+						distinct=True, return_query=True)
 
 				else:
 					link_fieldnames = link.get("fieldname")
@@ -81,10 +123,11 @@ def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
 						# dynamic link
 						if link.get("doctype_fieldname"):
 							filters.append([dt, link.get("doctype_fieldname"), "=", doctype])
-						ret = frappe.get_list(doctype=dt, fields=fields, filters=filters, or_filters=or_filters)
+						query = frappe.get_list(doctype=dt, fields=name_field, filters=filters, or_filters=or_filters,
+							return_query=True)
 
 					else:
-						ret = None
+						query = None
 
 			except frappe.PermissionError:
 				if frappe.local.message_log:
@@ -92,10 +135,11 @@ def get_linked_docs(doctype, name, linkinfo=None, for_doctype=None):
 
 				continue
 
-			if ret:
-				results[dt] = ret
+			if query:
+				queries.append((dt, query))
+				fields_by_doctype[dt] = fields
 
-	return results
+	return queries, fields_by_doctype
 
 @frappe.whitelist()
 def get_linked_doctypes(doctype, without_ignore_user_permissions_enabled=False):
@@ -111,19 +155,44 @@ def get_linked_doctypes(doctype, without_ignore_user_permissions_enabled=False):
 	else:
 		return frappe.cache().hget("linked_doctypes", doctype, lambda: _get_linked_doctypes(doctype))
 
+def get_link_graph():
+	"""Returns the site-wide reverse link index of Link, Dynamic Link and Table fields
+	of all doctypes, including custom fields. Cleared on changes of DocTypes and
+	Custom Fields, see `clear_linked_doctype_cache`"""
+	return frappe.cache().get_value("link_graph", _get_link_graph)
+
+def _get_link_graph():
+	graph = frappe._dict(links={}, tables={}, dynamic_links=[])
+
+	fields = frappe.get_all("DocField", fields=["parent", "fieldname", "fieldtype", "options",
+		"ignore_user_permissions"], filters={"fieldtype": ["in", ("Link", "Dynamic Link") + frappe.model.table_fields]},
+		as_list=1)
+	fields += frappe.get_all("Custom Field", fields=["dt as parent", "fieldname", "fieldtype", "options",
+		"ignore_user_permissions"], filters={"fieldtype": ["in", ("Link", "Dynamic Link") + frappe.model.table_fields]},
+		as_list=1)
+
+	for parent, fieldname, fieldtype, options, ignore_user_permissions in fields:
+		if fieldtype == "Link":
+			graph.links.setdefault(options, []).append([parent, fieldname, cint(ignore_user_permissions)])
+		elif fieldtype == "Dynamic Link":
+			graph.dynamic_links.append([parent, fieldname, options, cint(ignore_user_permissions)])
+		else:
+			graph.tables.setdefault(options, []).append([parent, fieldname, cint(ignore_user_permissions)])
+
+	graph.child_tables = frappe.db.sql_list("select name from `tabDocType` where istable=1")
+	graph.singles = frappe.db.sql_list("select name from `tabDocType` where issingle=1")
+
+	return graph
+
 def _get_linked_doctypes(doctype, without_ignore_user_permissions_enabled=False):
 	ret = {}
 	# find fields where this doctype is linked
 	ret.update(get_linked_fields(doctype, without_ignore_user_permissions_enabled))
 	ret.update(get_dynamic_linked_fields(doctype, without_ignore_user_permissions_enabled))
 
-	filters=[['fieldtype', 'in', frappe.model.table_fields], ['options', '=', doctype]]
-	if without_ignore_user_permissions_enabled: filters.append(['ignore_user_permissions', '!=', 1])
 	# find links of parents
-	links = frappe.get_all("DocField", fields=["parent as dt"], filters=filters)
-	links+= frappe.get_all("Custom Field", fields=["dt"], filters=filters)
-
-	for dt, in links:
+	for dt, fieldname, ignore_user_permissions in get_link_graph().tables.get(doctype, []):
+		if without_ignore_user_permissions_enabled and ignore_user_permissions: continue
 		if dt in ret: continue
 		ret[dt] = {"get_parent": True}
 
@@ -141,47 +210,40 @@ def _get_linked_doctypes(doctype, without_ignore_user_permissions_enabled=False)
 	return ret
 
 def get_linked_fields(doctype, without_ignore_user_permissions_enabled=False):
-
-	filters=[['fieldtype','=', 'Link'], ['options', '=', doctype]]
-	if without_ignore_user_permissions_enabled: filters.append(['ignore_user_permissions', '!=', 1])
+	graph = get_link_graph()
 
 	# find links of parents
-	links = frappe.get_all("DocField", fields=["parent", "fieldname"], filters=filters, as_list=1)
-	links+= frappe.get_all("Custom Field", fields=["dt as parent", "fieldname"], filters=filters, as_list=1)
+	links_dict = defaultdict(list)
+	for parent, fieldname, ignore_user_permissions in graph.links.get(doctype, []):
+		if without_ignore_user_permissions_enabled and ignore_user_permissions: continue
+		links_dict[parent].append(fieldname)
 
 	ret = {}
 
-	if not links: return ret
-
-	links_dict = defaultdict(list)
-	for doctype, fieldname in links:
-		links_dict[doctype].append(fieldname)
+	if not links_dict: return ret
 
 	for doctype_name in links_dict:
 		ret[doctype_name] = { "fieldname": links_dict.get(doctype_name) }
-	table_doctypes = frappe.get_all("DocType", filters=[["istable", "=", "1"], ["name", "in", tuple(links_dict)]])
-	child_filters = [['fieldtype','in', frappe.model.table_fields], ['options', 'in', tuple(doctype.name for doctype in table_doctypes)]]
-	if without_ignore_user_permissions_enabled: child_filters.append(['ignore_user_permissions', '!=', 1])
 
 	# find out if linked in a child table
-	for parent, options in frappe.get_all("DocField", fields=["parent", "options"], filters=child_filters, as_list=1):
-		ret[parent] = { "child_doctype": options, "fieldname": links_dict[options]}
-		if options in ret: del ret[options]
+	for options in set(links_dict).intersection(graph.child_tables):
+		for parent, fieldname, ignore_user_permissions in graph.tables.get(options, []):
+			if without_ignore_user_permissions_enabled and ignore_user_permissions: continue
+			ret[parent] = { "child_doctype": options, "fieldname": links_dict[options]}
+			if options in ret: del ret[options]
 
 	return ret
 
 def get_dynamic_linked_fields(doctype, without_ignore_user_permissions_enabled=False):
 	ret = {}
-
-	filters=[['fieldtype','=', 'Dynamic Link']]
-	if without_ignore_user_permissions_enabled: filters.append(['ignore_user_permissions', '!=', 1])
+	graph = get_link_graph()
 
 	# find dynamic links of parents
-	links = frappe.get_all("DocField", fields=["parent as doctype", "fieldname", "options as doctype_fieldname"], filters=filters)
-	links+= frappe.get_all("Custom Field", fields=["dt as doctype", "fieldname", "options as doctype_fieldname"], filters=filters)
+	for parent, fieldname, doctype_fieldname, ignore_user_permissions in graph.dynamic_links:
+		if without_ignore_user_permissions_enabled and ignore_user_permissions: continue
+		if parent in graph.singles: continue
 
-	for df in links:
-		if is_single(df.doctype): continue
+		df = frappe._dict(doctype=parent, fieldname=fieldname, doctype_fieldname=doctype_fieldname)
 
 		# optimized to get both link exists and parenttype
 		possible_link = frappe.db.sql("""select distinct `{doctype_fieldname}`, parenttype
@@ -203,4 +265,4 @@ def get_dynamic_linked_fields(doctype, without_ignore_user_permissions_enabled=F
 					"doctype_fieldname": df.doctype_fieldname
 				}
 
-	return ret
\ No newline at end of file
+	return ret
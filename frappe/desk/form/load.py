@@ -78,9 +78,14 @@ def getdoctype(doctype, with_parent=False, cached_timestamp=None):
 
 def get_meta_bundle(doctype):
 	bundle = [frappe.desk.form.meta.get_meta(doctype)]
-	for df in bundle[0].fields:
-		if df.fieldtype in frappe.model.table_fields:
-			bundle.append(frappe.desk.form.meta.get_meta(df.options, not frappe.conf.developer_mode))
+	child_doctypes = [df.options for df in bundle[0].fields if df.fieldtype in frappe.model.table_fields]
+
+	if child_doctypes and not frappe.conf.developer_mode:
+		# fetch cached child metas in one round trip
+		frappe.cache().hget_many("form_meta", child_doctypes)
+
+	for child_doctype in child_doctypes:
+		bundle.append(frappe.desk.form.meta.get_meta(child_doctype, not frappe.conf.developer_mode))
 	return bundle
 
 @frappe.whitelist()
@@ -4,7 +4,7 @@
 from __future__ import unicode_literals
 import frappe, unittest
 
-from frappe.desk.form.linked_with import get_linked_docs, get_linked_doctypes
+from frappe.desk.form.linked_with import get_linked_docs, get_linked_doctypes, get_linked_docs_count
 
 class TestForm(unittest.TestCase):
 	def test_linked_with(self):
@@ -12,6 +12,24 @@ class TestForm(unittest.TestCase):
 		self.assertTrue("User" in results)
 		self.assertTrue("DocType" in results)
 
+		counts = get_linked_docs_count("Role", "System Manager", linkinfo=get_linked_doctypes("Role"))
+		self.assertEqual(counts["User"], len(results["User"]))
+		self.assertEqual(set(counts), set(results))
+
+	def test_link_graph(self):
+		from frappe.desk.form.linked_with import get_link_graph
+
+		graph = get_link_graph()
+		self.assertTrue(["Has Role", "role", 0] in graph.links["Role"])
+		self.assertTrue("Has Role" in graph.child_tables)
+
+		custom_field = frappe.get_doc(dict(doctype="Custom Field", dt="Note", fieldname="test_linked_role",
+			label="Test Linked Role", fieldtype="Link", options="Role")).insert()
+		self.assertTrue("Note" in get_linked_doctypes("Role"))
+
+		custom_field.delete()
+		self.assertFalse("Note" in get_linked_doctypes("Role"))
+
 if __name__=="__main__":
 	frappe.connect()
 	unittest.main()
@@ -0,0 +1,225 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Trigram index for link field search
+
+Doctypes listed in the `link_search_index` hook or site config are indexed in
+`__link_search_index`: one row per (doctype, gram, name) for the words of the
+name, title field and search fields of each document.
+
+`search_widget` uses the index to narrow down the candidates of a `like %txt%`
+search. Words shorter than 3 characters have no grams and are only matched by the
+`like`, if all words of the search are that short the index is not used. The index is kept current by document hooks and (re)built in the
+background when it is missing or the search fields of the doctype change.
+"""
+
+from __future__ import unicode_literals
+
+import re
+import redis
+
+import frappe
+from frappe.utils import cstr
+
+# fieldtypes searched with `like` by `search_widget`
+SEARCHABLE_FIELDTYPES = ("Data", "Text", "Small Text", "Long Text", "Link", "Select",
+	"Read Only", "Text Editor")
+
+# if a search matches more documents than this, the index is not selective enough
+MAX_CANDIDATES = 5000
+
+# documents indexed per chunk while building the index
+BUILD_CHUNK_SIZE = 5000
+
+# rows per insert query
+INSERT_CHUNK_SIZE = 1000
+
+def get_indexed_doctypes():
+	return (frappe.get_hooks("link_search_index") or []) \
+		+ (frappe.local.conf.get("link_search_index") or [])
+
+def get_index_fields(meta):
+	"""Returns the fields of a doctype that are searched by `search_widget`"""
+	fields = ["name"]
+	if meta.title_field:
+		fields.append(meta.title_field)
+	if meta.search_fields:
+		fields.extend(meta.get_search_fields())
+
+	out = []
+	for f in fields:
+		f = f.strip()
+		df = meta.get_field(f)
+		if f not in out and (f == "name" or (df and df.fieldtype in SEARCHABLE_FIELDTYPES)):
+			out.append(f)
+
+	return out
+
+def get_words(text):
+	return [w for w in re.split(r"\W+", cstr(text).lower(), flags=re.UNICODE) if w]
+
+def get_document_grams(values):
+	"""Returns the grams of all words in values"""
+	grams = set()
+	for value in values:
+		for word in get_words(value):
+			grams.update(word[i:i + 3] for i in range(len(word) - 2))
+
+	return grams
+
+def get_search_grams(txt):
+	"""Returns the grams a document must have to match `txt`. Words shorter than
+	3 characters are skipped"""
+	grams = set()
+	for word in get_words(txt):
+		grams.update(word[i:i + 3] for i in range(len(word) - 2))
+
+	return grams
+
+def get_index_signature(doctype):
+	return ",".join(get_index_fields(frappe.get_meta(doctype)))
+
+def is_index_ready(doctype):
+	"""Returns True if the index of the doctype is built for its current search fields.
+	Enqueues a build if it is not"""
+	if doctype not in get_indexed_doctypes():
+		return False
+
+	signature = get_index_signature(doctype)
+	if frappe.cache().hget("link_search_index_ready", doctype) == signature:
+		return True
+
+	try:
+		if frappe.cache().set(get_build_lock_key(doctype), frappe.local.site, nx=True, ex=3600):
+			frappe.enqueue("frappe.desk.link_search_index.build_link_search_index",
+				queue="long", doctype=doctype, enqueue_after_commit=True)
+	except redis.exceptions.ConnectionError:
+		pass
+
+	return False
+
+def is_index_active(doctype):
+	"""Returns True if the index of the doctype is built or being built, so changed
+	documents must be reindexed"""
+	if doctype not in get_indexed_doctypes():
+		return False
+
+	cache = frappe.cache()
+	try:
+		return bool(cache.hget("link_search_index_ready", doctype) or cache.get(get_build_lock_key(doctype)))
+	except redis.exceptions.ConnectionError:
+		return False
+
+def get_build_lock_key(doctype):
+	return frappe.cache().make_key("link_search_index_build|" + doctype)
+
+def get_candidate_names(doctype, txt):
+	"""Returns names of documents that may match `txt`, or None if the index
+	can not be used"""
+	grams = get_search_grams(txt)
+	if not grams or not is_index_ready(doctype):
+		return None
+
+	names = frappe.db.sql_list("""select `name`
+		from `__link_search_index`
+		where `doctype`=%(doctype)s and `gram` in %(grams)s
+		group by `name`
+		having count(distinct `gram`)=%(count)s
+		limit %(limit)s""", dict(doctype=doctype, grams=tuple(grams), count=len(grams),
+			limit=MAX_CANDIDATES + 1))
+
+	if len(names) > MAX_CANDIDATES:
+		return None
+
+	return names
+
+def insert_grams(doctype, rows):
+	"""Insert (gram, name) rows"""
+	for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+		chunk = rows[i:i + INSERT_CHUNK_SIZE]
+		placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+		params = [v for gram, name in chunk for v in (doctype, gram, name)]
+
+		# grams that only differ in accents are duplicates in a case and accent insensitive collation
+		frappe.db.multisql({
+			"mariadb": """insert ignore into `__link_search_index` (`doctype`, `gram`, `name`)
+				values {0}""".format(placeholders),
+			"postgres": """insert into `__link_search_index` (`doctype`, `gram`, `name`)
+				values {0}
+				on conflict do nothing""".format(placeholders)
+		}, params)
+
+def index_documents(doctype, records, fields):
+	rows = []
+	for d in records:
+		rows.extend((gram, d.name) for gram in get_document_grams(d.get(f) for f in fields))
+
+	insert_grams(doctype, rows)
+
+def delete_names(doctype, names):
+	frappe.db.sql("""delete from `__link_search_index`
+		where `doctype`=%s and `name` in %s""", (doctype, tuple(names)))
+
+def build_link_search_index(doctype):
+	"""Rebuild the index of a doctype, in chunks ordered by name"""
+	cache = frappe.cache()
+	cache.hdel("link_search_index_ready", doctype)
+
+	frappe.db.create_link_search_index_table()
+	frappe.db.sql("delete from `__link_search_index` where `doctype`=%s", doctype)
+
+	signature = get_index_signature(doctype)
+	fields = get_index_fields(frappe.get_meta(doctype))
+
+	last_name = None
+	while True:
+		filters = {"name": [">", last_name]} if last_name is not None else {}
+		records = frappe.get_all(doctype, fields=fields, filters=filters,
+			order_by="name asc", limit_page_length=BUILD_CHUNK_SIZE)
+		if not records:
+			break
+
+		index_documents(doctype, records, fields)
+		frappe.db.commit()
+		last_name = records[-1].name
+
+	cache.hset("link_search_index_ready", doctype, signature)
+	cache.delete(get_build_lock_key(doctype))
+
+def bump_search_version(doctype):
+	"""Invalidate cached link search results of an indexed doctype"""
+	frappe.cache().hset("link_search_version", doctype, frappe.generate_hash(length=10))
+
+def get_search_version(doctype):
+	return frappe.cache().hget("link_search_version", doctype) or ""
+
+def update_link_search_index(doc, method=None):
+	"""Reindex a saved document, called via doc_events"""
+	if doc.doctype not in get_indexed_doctypes():
+		return
+
+	bump_search_version(doc.doctype)
+	if not is_index_active(doc.doctype):
+		return
+
+	fields = get_index_fields(frappe.get_meta(doc.doctype))
+	delete_names(doc.doctype, [doc.name])
+	index_documents(doc.doctype, [doc], fields)
+
+def delete_from_link_search_index(doc, method=None):
+	"""Remove a deleted document from the index, called via doc_events"""
+	if doc.doctype not in get_indexed_doctypes():
+		return
+
+	bump_search_version(doc.doctype)
+	if not is_index_active(doc.doctype):
+		return
+
+	delete_names(doc.doctype, [doc.name])
+
+def rename_in_link_search_index(doc, method=None, old=None, new=None, merge=False):
+	"""Reindex a renamed document, called via doc_events"""
+	if is_index_active(doc.doctype):
+		delete_names(doc.doctype, [old])
+
+	update_link_search_index(doc)
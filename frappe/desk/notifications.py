@@ -3,12 +3,17 @@
 
 from __future__ import unicode_literals
 
+import redis
 import frappe
-from frappe.utils import time_diff_in_seconds, now, now_datetime, DATETIME_FORMAT
+from frappe.utils import time_diff_in_seconds, now, now_datetime, DATETIME_FORMAT, cint
+from frappe.utils.data import evaluate_filters, operator_map
 from dateutil.relativedelta import relativedelta
-from six import string_types
+from six import string_types, iteritems
 import json
 
+# open counts of doctypes are capped at this value
+OPEN_COUNT_LIMIT = 100
+
 @frappe.whitelist()
 @frappe.read_only()
 def get_notifications():
@@ -24,13 +29,12 @@ def get_notifications():
 
 	config = get_notification_config()
 
-	groups = list(config.get("for_doctype")) + list(config.get("for_module"))
 	cache = frappe.cache()
 
-	notification_count = {}
+	notification_count = get_open_counts(list(config.get("for_doctype")))
 	notification_percent = {}
 
-	for name in groups:
+	for name in config.get("for_module"):
 		count = cache.hget("notification_count:" + name, frappe.session.user)
 		if count is not None:
 			notification_count[name] = count
@@ -104,7 +108,7 @@ def get_notifications_for_doctypes(config, notification_count):
 				try:
 					if isinstance(condition, dict):
 						result = len(frappe.get_list(d, fields=["name"],
-							filters=condition, limit_page_length = 100, as_list=True, ignore_ifnull=True))
+							filters=condition, limit_page_length = OPEN_COUNT_LIMIT, as_list=True, ignore_ifnull=True))
 					else:
 						result = frappe.get_attr(condition)()
 
@@ -121,7 +125,7 @@ def get_notifications_for_doctypes(config, notification_count):
 
 				else:
 					open_count_doctype[d] = result
-					frappe.cache().hset("notification_count:" + d, frappe.session.user, result)
+					set_open_count(d, frappe.session.user, result)
 
 	return open_count_doctype
 
@@ -178,15 +182,16 @@ def clear_notifications(user=None):
 	cache = frappe.cache()
 
 	for name in groups:
+		key = ("open_count:" if name in for_doctype else "notification_count:") + name
 		if user:
-			cache.hdel("notification_count:" + name, user)
+			cache.hdel(key, user)
 		else:
-			cache.delete_key("notification_count:" + name)
+			cache.delete_key(key)
 
 	frappe.publish_realtime('clear_notifications')
 
 def delete_notification_count_for(doctype):
-	frappe.cache().delete_key("notification_count:" + doctype)
+	frappe.cache().delete_key("open_count:" + doctype)
 	frappe.publish_realtime('clear_notifications')
 
 def clear_doctype_notifications(doc, method=None, *args, **kwargs):
@@ -197,9 +202,188 @@ def clear_doctype_notifications(doc, method=None, *args, **kwargs):
 		doctype = doc.doctype
 
 	if doctype in config.for_doctype:
+		if not isinstance(doc, string_types) \
+			and update_notification_count(doc, method, config.for_doctype[doctype]):
+			return
+
 		delete_notification_count_for(doctype)
 		return
 
+def update_notification_count(doc, method, condition):
+	"""Record the change in open status of a saved, cancelled or deleted document, it
+	is applied to the cached open counts by `flush_open_count_deltas` after commit.
+
+	Returns False if the change can not be computed from the document (e.g. the
+	condition is a method or uses operators that can only be evaluated in SQL)"""
+	if method not in ("on_update", "on_cancel", "on_trash") or not can_evaluate_condition(condition):
+		return False
+
+	if method == "on_trash":
+		was_open, is_open = evaluate_filters(doc, condition), False
+	else:
+		doc_before_save = doc.get_doc_before_save()
+		if not doc_before_save and not doc.flags.in_insert:
+			# on_update called outside save, previous state is unknown
+			return False
+
+		was_open = bool(doc_before_save) and evaluate_filters(doc_before_save, condition)
+		is_open = evaluate_filters(doc, condition)
+
+	delta = cint(is_open) - cint(was_open)
+	if not delta:
+		return True
+
+	# applied to the cached counts when the transaction is committed
+	frappe.local.open_count_deltas[doc.doctype] = \
+		frappe.local.open_count_deltas.get(doc.doctype, 0) + delta
+	return True
+
+def flush_open_count_deltas():
+	"""Apply the open count changes of the committed transaction with `HINCRBY`.
+
+	Only the counts of users who can read every document of the doctype through their
+	(cached) roles are changed, the counts of other users are dropped and computed
+	again on their next `get_notifications`"""
+	deltas = getattr(frappe.local, "open_count_deltas", None)
+	if not deltas:
+		return
+
+	frappe.local.open_count_deltas = {}
+	cache = frappe.cache()
+	try:
+		for doctype, delta in iteritems(deltas):
+			if delta:
+				apply_open_count_delta(cache, doctype, delta)
+	except redis.exceptions.ConnectionError:
+		return
+
+	frappe.publish_realtime('clear_notifications')
+
+def apply_open_count_delta(cache, doctype, delta):
+	key = get_open_count_key(doctype)
+	users = [frappe.safe_decode(user) for user in cache.pipeline(transaction=False).hkeys(key).execute()[0]]
+	if not users:
+		return
+
+	readers = get_users_who_can_read_all(doctype, users)
+
+	pipe = cache.pipeline(transaction=False)
+	for user in readers:
+		pipe.hincrby(key, user, delta)
+	dropped = [user for user in users if user not in readers]
+	if dropped:
+		pipe.hdel(key, *dropped)
+	counts = pipe.execute()
+
+	# clamp the new counts to 0..OPEN_COUNT_LIMIT
+	pipe = cache.pipeline(transaction=False)
+	for user, count in zip(readers, counts):
+		if count - delta >= OPEN_COUNT_LIMIT:
+			if delta < 0:
+				# actual count is unknown beyond the limit
+				pipe.hdel(key, user)
+			else:
+				pipe.hset(key, user, OPEN_COUNT_LIMIT)
+		elif count > OPEN_COUNT_LIMIT:
+			pipe.hset(key, user, OPEN_COUNT_LIMIT)
+		elif count < 0:
+			pipe.hset(key, user, 0)
+	pipe.execute()
+
+def get_users_who_can_read_all(doctype, users):
+	"""Returns the users of `users` who can read every document of `doctype` as decided
+	from their cached roles alone (no `if_owner` rules, user permissions or permission
+	hooks). Users whose roles or user permissions are not cached are not returned"""
+	from frappe.permissions import get_role_permissions
+
+	if frappe.get_hooks_registry().get_methods("has_permission", doctype):
+		return ["Administrator"] if "Administrator" in users else []
+
+	cache = frappe.cache()
+	roles = cache.hget_many("roles", users)
+	user_permissions = cache.hget_many("user_permissions", users)
+	meta = frappe.get_meta(doctype)
+
+	readers = []
+	for user in users:
+		if user != "Administrator":
+			if roles[user] is None or user_permissions[user] != {}:
+				continue
+
+			perms = get_role_permissions(meta, user=user)
+			if not perms.get("read") or perms.if_owner.get("read"):
+				continue
+
+		readers.append(user)
+
+	return readers
+
+def get_open_count_key(doctype):
+	return frappe.cache().make_key("open_count:" + doctype)
+
+def get_open_counts(doctypes, user=None):
+	"""Returns the cached open counts of `user` as {doctype: count}.
+
+	Open counts of doctypes are stored as plain integers (not pickled like other cached
+	values) so that they can be changed with `HINCRBY`"""
+	if not user: user = frappe.session.user
+
+	try:
+		pipe = frappe.cache().pipeline(transaction=False)
+		for doctype in doctypes:
+			pipe.hget(get_open_count_key(doctype), user)
+		counts = pipe.execute()
+	except redis.exceptions.ConnectionError:
+		return {}
+
+	return dict((doctype, cint(count)) for doctype, count in zip(doctypes, counts) if count is not None)
+
+def set_open_count(doctype, user, count):
+	try:
+		frappe.cache().pipeline(transaction=False).hset(get_open_count_key(doctype), user, count).execute()
+	except redis.exceptions.ConnectionError:
+		pass
+
+def can_evaluate_condition(condition):
+	"""Returns True if a `for_doctype` condition can be evaluated on a document in Python"""
+	if not isinstance(condition, dict):
+		return False
+
+	for value in condition.values():
+		if isinstance(value, (list, tuple)) and value[0] not in operator_map:
+			return False
+
+	return True
+
+def recompute_notification_counts():
+	"""Compute open counts of all doctypes for all users with an active session in one job,
+	so that `get_notifications` can be served from cache"""
+	from frappe.utils.user import UserPermissions
+
+	if frappe.flags.in_install or \
+		not frappe.db.get_single_value('System Settings', 'setup_complete'):
+		return
+
+	config = get_notification_config()
+
+	for user in frappe.db.sql_list("select distinct user from `tabSessions`"):
+		if user == "Guest":
+			continue
+
+		can_read = UserPermissions(user).get_can_read()
+		for doctype, condition in iteritems(config.for_doctype):
+			if doctype not in can_read or not isinstance(condition, dict):
+				continue
+
+			try:
+				count = len(frappe.get_list(doctype, fields=["name"], filters=condition,
+					limit_page_length=OPEN_COUNT_LIMIT, as_list=True, ignore_ifnull=True, user=user))
+			except frappe.PermissionError:
+				frappe.clear_messages()
+				continue
+
+			set_open_count(doctype, user, count)
+
 def get_notification_info_for_boot():
 	out = get_notifications()
 	config = get_notification_config()
@@ -4,7 +4,7 @@
 from __future__ import unicode_literals
 
 import frappe
-import os, json, datetime
+import os, json, datetime, time, hashlib, redis
 
 from frappe import _
 from frappe.modules import scrub, get_module_path
@@ -17,6 +17,12 @@ from six import string_types, iteritems
 from datetime import timedelta
 from frappe.utils import gzip_decompress
 
+# seconds a request computing a cached report holds the lock (the longest a report is
+# expected to compute, independent of how long its result is cached), and the interval
+# at which identical requests poll for its result
+REPORT_CACHE_LOCK_TIMEOUT = 120
+REPORT_CACHE_POLL_INTERVAL = 0.25
+
 def get_report_doc(report_name):
 	doc = frappe.get_doc("Report", report_name)
 	doc.custom_columns = []
@@ -175,7 +181,7 @@ def get_script(report_name):
 
 @frappe.whitelist()
 @frappe.read_only()
-def run(report_name, filters=None, user=None):
+def run(report_name, filters=None, user=None, paged=True):
 
 	report = get_report_doc(report_name)
 	if not user:
@@ -195,14 +201,115 @@ def run(report_name, filters=None, user=None):
 			filters.pop("prepared_report_name", None)
 		else:
 			dn = ""
-		result = get_prepared_report_result(report, filters, dn, user)
+		result = get_prepared_report_result(report, filters, dn, user, paged=paged)
 	else:
-		result = generate_report_result(report, filters, user)
+		result = get_cached_report_result(report, filters, user)
 
 	result["add_total_row"] = report.add_total_row
 
 	return result
 
+def get_cached_report_result(report, filters=None, user=None):
+	"""Returns the result of `generate_report_result` from the report result cache.
+
+	Results are cached for `result_cache_ttl` seconds (set on the Report) and keyed by the
+	report, the normalized filters, the user and their permissions and the watermark of the
+	report's `ref_doctype`. Concurrent identical requests are coalesced, so only one of
+	them computes the result while the others wait for it."""
+	ttl = cint(report.get("result_cache_ttl"))
+	if not ttl or report.report_type not in ("Query Report", "Script Report"):
+		return generate_report_result(report, filters, user)
+
+	if not user:
+		user = frappe.session.user
+
+	cache = frappe.cache()
+	cache_key = get_report_cache_key(report, filters, user)
+	lock_key = cache.make_key(cache_key + "|lock")
+	lock_timeout = REPORT_CACHE_LOCK_TIMEOUT
+
+	try:
+		result = cache.get_value(cache_key, expires=True)
+		if result is not None:
+			return result
+
+		acquired = cache.set(lock_key, frappe.local.site, nx=True, ex=lock_timeout)
+		if not acquired:
+			result = wait_for_cached_report_result(cache_key, lock_key, lock_timeout)
+			if result is not None:
+				return result
+
+	except redis.exceptions.ConnectionError:
+		return generate_report_result(report, filters, user)
+
+	try:
+		result = generate_report_result(report, filters, user)
+		cache.set_value(cache_key, result, expires_in_sec=ttl)
+	finally:
+		try:
+			cache.delete(lock_key)
+		except redis.exceptions.ConnectionError:
+			pass
+
+	return result
+
+def wait_for_cached_report_result(cache_key, lock_key, timeout):
+	"""Wait for another worker computing the same report to publish its result.
+	Returns None if the lock was released (or expired) without a result."""
+	cache = frappe.cache()
+	deadline = time.time() + timeout
+	while time.time() < deadline:
+		time.sleep(REPORT_CACHE_POLL_INTERVAL)
+		result = cache.get_value(cache_key, expires=True)
+		if result is not None:
+			return result
+		if not cache.exists(lock_key):
+			# computing request failed or was killed, compute it here
+			return cache.get_value(cache_key, expires=True)
+
+def get_report_cache_key(report, filters, user):
+	if filters and isinstance(filters, string_types):
+		filters = json.loads(filters)
+
+	key_parts = [
+		report.name,
+		user,
+		cstr(report.modified),
+		cstr(frappe.local.lang),
+		cstr(report.get("custom_columns")),
+		json.dumps(filters or {}, sort_keys=True, default=cstr),
+		get_permission_fingerprint(report.ref_doctype, user),
+		get_doctype_watermark(report.ref_doctype)
+	]
+
+	digest = hashlib.md5(frappe.as_unicode("\n".join(key_parts)).encode("utf-8")).hexdigest()
+	return "report_result:{0}:{1}".format(report.name, digest)
+
+def get_permission_fingerprint(doctype, user):
+	"""Returns a hash of everything that decides which rows `get_filtered_data` lets through
+	for the given user: roles, user permissions and documents shared with the user"""
+	from frappe.permissions import get_user_permissions
+
+	fingerprint = json.dumps([
+		sorted(frappe.get_roles(user)),
+		get_user_permissions(user),
+		sorted(frappe.share.get_shared(doctype, user))
+	], sort_keys=True, default=cstr)
+
+	return hashlib.md5(fingerprint.encode("utf-8")).hexdigest()
+
+def get_doctype_watermark(doctype):
+	"""Returns the number of documents and the latest `modified` timestamp of the doctype,
+	so that cached results are not served once any document is added, changed or deleted"""
+	if not doctype:
+		return ""
+
+	if frappe.get_meta(doctype).issingle:
+		return cstr(frappe.db.sql("""select value from `tabSingles`
+			where doctype=%s and field='modified'""", doctype))
+
+	return cstr(frappe.db.sql("select count(*), max(modified) from `tab{0}`".format(doctype))[0])
+
 def add_data_to_custom_columns(columns, result):
 	custom_fields_data = get_data_for_custom_report(columns)
 
@@ -233,8 +340,9 @@ def add_data_to_custom_columns(columns, result):
 
 	return data
 
-def get_prepared_report_result(report, filters, dn="", user=None):
+def get_prepared_report_result(report, filters, dn="", user=None, paged=True):
 	latest_report_data = {}
+	paging = {}
 	doc = None
 	if dn:
 		# Get specified dn
@@ -256,12 +364,27 @@ def get_prepared_report_result(report, filters, dn="", user=None):
 
 	if doc:
 		try:
-			# Prepared Report data is stored in a GZip compressed JSON file
-			attached_file_name = frappe.db.get_value("File", {"attached_to_doctype": doc.doctype, "attached_to_name":doc.name}, "name")
-			attached_file = frappe.get_doc('File', attached_file_name)
-			compressed_content = attached_file.get_content()
-			uncompressed_content = gzip_decompress(compressed_content).decode("utf-8")
-			data = json.loads(uncompressed_content)
+			from frappe.core.doctype.prepared_report.prepared_report import get_paged_result
+
+			paged_result = get_paged_result(doc)
+			if paged_result and not cint(paged):
+				data = paged_result.get_all()
+			elif paged_result:
+				# only the first page, the desk loads the next ones with `get_result_page`
+				data = paged_result.get_page(0) if paged_result.index.row_count else []
+				paging = {
+					"paged": True,
+					"total_count": paged_result.index.row_count,
+					"next_start": len(data),
+					"page_length": paged_result.index.page_length
+				}
+			else:
+				# older Prepared Reports are stored in a single GZip compressed JSON file
+				attached_file_name = frappe.db.get_value("File", {"attached_to_doctype": doc.doctype, "attached_to_name":doc.name}, "name")
+				attached_file = frappe.get_doc('File', attached_file_name)
+				compressed_content = attached_file.get_content()
+				uncompressed_content = gzip_decompress(compressed_content).decode("utf-8")
+				data = json.loads(uncompressed_content)
 			if data:
 				columns = json.loads(doc.columns) if doc.columns else data[0]
 
@@ -273,6 +396,7 @@ def get_prepared_report_result(report, filters, dn="", user=None):
 					"columns": columns,
 					"result": get_filtered_data(report.ref_doctype, columns, data, user)
 				}
+				latest_report_data.update(paging)
 		except Exception:
 			frappe.log_error(frappe.get_traceback())
 			frappe.delete_doc("Prepared Report", doc.name)
@@ -314,7 +438,8 @@ def export_query():
 		visible_idx = None
 
 	if file_format_type == "Excel":
-		data = run(report_name, filters)
+		# all rows of a prepared report, not only its first page
+		data = run(report_name, filters, paged=False)
 		data = frappe._dict(data)
 		columns = get_columns_dict(data.columns)
 
@@ -361,47 +486,42 @@ def get_report_module_dotted_path(module, report_name):
 		+ ".report." + scrub(report_name) + "." + scrub(report_name)
 
 def add_total_row(result, columns, meta = None):
+	"""Append a total row to `result`.
+
+	Column types are resolved once and all numeric, percent and time columns are
+	summed in a single pass over the rows."""
 	total_row = [""]*len(columns)
+	column_types = [get_column_type(col, meta) for col in columns]
+
+	summed_columns = []
 	has_percent = []
-	for i, col in enumerate(columns):
-		fieldtype, options, fieldname = None, None, None
-		if isinstance(col, string_types):
-			if meta:
-				# get fieldtype from the meta
-				field = meta.get_field(col)
-				if field:
-					fieldtype = meta.get_field(col).fieldtype
-					fieldname = meta.get_field(col).fieldname
-			else:
-				col = col.split(":")
-				if len(col) > 1:
-					if col[1]:
-						fieldtype = col[1]
-						if "/" in fieldtype:
-							fieldtype, options = fieldtype.split("/")
-					else:
-						fieldtype = "Data"
-		else:
-			fieldtype = col.get("fieldtype")
-			fieldname = col.get("fieldname")
-			options = col.get("options")
+	for i, (fieldtype, options, fieldname) in enumerate(column_types):
+		if fieldtype in ["Currency", "Int", "Float", "Percent", "Time"]:
+			summed_columns.append((i, fieldtype, fieldname))
+
+	for row in result:
+		is_dict = isinstance(row, dict)
+		row_length = len(row)
+		for i, fieldtype, fieldname in summed_columns:
+			if i >= row_length: continue
 
-		for row in result:
-			if i >= len(row): continue
+			cell = row.get(fieldname) if is_dict else row[i]
 
-			cell = row.get(fieldname) if isinstance(row, dict) else row[i]
-			if fieldtype in ["Currency", "Int", "Float", "Percent"] and flt(cell):
-				total_row[i] = flt(total_row[i]) + flt(cell)
+			if fieldtype == "Time":
+				if cell:
+					if not total_row[i]:
+						total_row[i] = timedelta(hours=0,minutes=0,seconds=0)
+					total_row[i] = total_row[i] + cell
+				continue
 
 			if fieldtype == "Percent" and i not in has_percent:
 				has_percent.append(i)
 
-			if fieldtype == "Time" and cell:
-				if not total_row[i]:
-					total_row[i]=timedelta(hours=0,minutes=0,seconds=0)
-				total_row[i] =  total_row[i] + cell
-
+			value = flt(cell)
+			if value:
+				total_row[i] = flt(total_row[i]) + value
 
+	for i, (fieldtype, options, fieldname) in enumerate(column_types):
 		if fieldtype=="Link" and options == "Currency":
 			total_row[i] = result[0].get(fieldname) if isinstance(result[0], dict) else result[0][i]
 
@@ -422,6 +542,32 @@ def add_total_row(result, columns, meta = None):
 	result.append(total_row)
 	return result
 
+def get_column_type(col, meta=None):
+	"""Returns (fieldtype, options, fieldname) of a report column"""
+	fieldtype, options, fieldname = None, None, None
+	if isinstance(col, string_types):
+		if meta:
+			# get fieldtype from the meta
+			field = meta.get_field(col)
+			if field:
+				fieldtype = field.fieldtype
+				fieldname = field.fieldname
+		else:
+			col = col.split(":")
+			if len(col) > 1:
+				if col[1]:
+					fieldtype = col[1]
+					if "/" in fieldtype:
+						fieldtype, options = fieldtype.split("/")
+				else:
+					fieldtype = "Data"
+	else:
+		fieldtype = col.get("fieldtype")
+		fieldname = col.get("fieldname")
+		options = col.get("options")
+
+	return fieldtype, options, fieldname
+
 @frappe.whitelist()
 def get_data_for_custom_field(doctype, field):
 
@@ -479,12 +625,20 @@ def get_filtered_data(ref_doctype, columns, data, user):
 	if_owner = role_permissions.get("if_owner", {}).get("report")
 
 	if match_filters_per_doctype:
+		# build the sets of permitted and existing names per linked doctype once,
+		# so that rows are filtered by set membership instead of a query per row
+		shared = set(shared)
+		existing_names = get_existing_names(linked_doctypes, match_filters_per_doctype, data)
+		match_filters_per_doctype = dict((dt, [dict((d, set(names)) for d, names in iteritems(match_filters))
+			for match_filters in filter_list]) for dt, filter_list in iteritems(match_filters_per_doctype))
+
 		for row in data:
 			# Why linked_doctypes.get(ref_doctype)? because if column is empty, linked_doctypes[ref_doctype] is removed
 			if linked_doctypes.get(ref_doctype) and shared and row[linked_doctypes[ref_doctype]] in shared:
 				result.append(row)
 
-			elif has_match(row, linked_doctypes, match_filters_per_doctype, ref_doctype, if_owner, columns_dict, user):
+			elif has_match(row, linked_doctypes, match_filters_per_doctype, ref_doctype, if_owner, columns_dict, user,
+				existing_names=existing_names):
 				result.append(row)
 	else:
 		result = list(data)
@@ -492,7 +646,40 @@ def get_filtered_data(ref_doctype, columns, data, user):
 	return result
 
 
-def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user):
+def get_existing_names(linked_doctypes, doctype_match_filters, data):
+	"""Returns {doctype: set of lowercased names} of linked values in `data` that exist in the
+	database, queried once per linked doctype that is restricted by user permissions.
+	Names are lowercased since MariaDB compares names case-insensitively"""
+	restricted_doctypes = set()
+	for filter_list in doctype_match_filters.values():
+		for match_filters in filter_list:
+			restricted_doctypes.update(match_filters)
+
+	existing_names = {}
+	for dt, idx in iteritems(linked_doctypes):
+		if dt not in restricted_doctypes:
+			continue
+
+		values = set()
+		for row in data:
+			if isinstance(row, dict):
+				values.add(row.get(idx))
+			elif isinstance(row, (list, tuple)) and isinstance(idx, int) and idx < len(row):
+				values.add(row[idx])
+		values.discard(None)
+		values.discard("")
+
+		names = set()
+		values = list(values)
+		for i in range(0, len(values), 10000):
+			names.update(cstr(name).lower() for name in frappe.db.sql_list(
+				"select name from `tab{0}` where name in %(names)s".format(dt), {"names": tuple(values[i:i + 10000])}))
+		existing_names[dt] = names
+
+	return existing_names
+
+def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user,
+	existing_names=None):
 	"""Returns True if after evaluating permissions for each linked doctype
 		- There is an owner match for the ref_doctype
 		- `and` There is a user permission match for all linked doctypes
@@ -538,7 +725,9 @@ def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner
 						else:
 							continue
 
-					if dt in match_filters and cell_value not in match_filters.get(dt) and frappe.db.exists(dt, cell_value):
+					if dt in match_filters and cell_value not in match_filters.get(dt) \
+						and (cstr(cell_value).lower() in existing_names[dt] if existing_names and dt in existing_names
+							else frappe.db.exists(dt, cell_value)):
 						match = False
 						break
 
@@ -240,24 +240,19 @@ def delete_items():
 
 	if len(items) > 10:
 		frappe.enqueue('frappe.desk.reportview.delete_bulk',
-			doctype=doctype, items=items)
+			doctype=doctype, items=items, queue='long', timeout=4000)
 	else:
 		delete_bulk(doctype, items)
 
 def delete_bulk(doctype, items):
-	for i, d in enumerate(items):
-		try:
-			frappe.delete_doc(doctype, d)
-			if len(items) >= 5:
-				frappe.publish_realtime("progress",
-					dict(progress=[i+1, len(items)], title=_('Deleting {0}').format(doctype), description=d),
-						user=frappe.session.user)
-			# Commit after successful deletion
-			frappe.db.commit()
-		except Exception:
-			# rollback if any record failed to delete
-			# if not rollbacked, queries get committed on after_request method in app.py
-			frappe.db.rollback()
+	from frappe.model.delete_doc import delete_docs_in_bulk
+
+	failed = delete_docs_in_bulk(doctype, items)
+	if failed:
+		frappe.log_error("\n".join("{0}: {1}".format(name, error) for name, error in failed.items()),
+			_("Bulk Delete of {0}").format(doctype))
+		frappe.publish_realtime("msgprint", _("{0} of {1} {2} could not be deleted: {3}").format(
+			len(failed), len(items), _(doctype), ", ".join(list(failed)[:20])), user=frappe.session.user)
 
 @frappe.whitelist()
 @frappe.read_only()
@@ -289,17 +284,11 @@ def get_stats(stats, doctype, filters=[]):
 	for tag in tags:
 		if not tag in columns: continue
 		try:
-			tagcount = frappe.get_list(doctype, fields=[tag, "count(*)"],
-				#filters=["ifnull(`%s`,'')!=''" % tag], group_by=tag, as_list=True)
-				filters = filters + ["ifnull(`%s`,'')!=''" % tag], group_by = tag, as_list = True)
-
 			if tag=='_user_tags':
-				stats[tag] = scrub_user_tags(tagcount)
-				stats[tag].append([_("No Tags"), frappe.get_list(doctype,
-					fields=[tag, "count(*)"],
-					filters=filters +["({0} = ',' or {0} = '' or {0} is null)".format(tag)], as_list=True)[0][1]])
+				stats[tag] = get_user_tags_stats(doctype, filters)
 			else:
-				stats[tag] = tagcount
+				stats[tag] = frappe.get_list(doctype, fields=[tag, "count(*)"],
+					filters = filters + ["ifnull(`%s`,'')!=''" % tag], group_by = tag, as_list = True)
 
 		except frappe.db.SQLError:
 			# does not work for child tables
@@ -345,6 +334,23 @@ def get_filter_dashboard_data(stats, doctype, filters=[]):
 
 	return stats
 
+def get_user_tags_stats(doctype, filters):
+	"""Returns [tag, count] of the documents matching filters, aggregated on `__tag_link`"""
+	from frappe.desk.tags import get_tag_counts
+
+	names_query = None
+	if filters or get_match_cond(doctype):
+		names_query = frappe.get_list(doctype, fields=["`tab{0}`.`name`".format(doctype)],
+			filters=filters, return_query=True)
+	else:
+		frappe.has_permission(doctype, throw=True)
+
+	tag_counts = [list(d) for d in get_tag_counts(doctype, names_query)]
+	tag_counts.append([_("No Tags"), frappe.get_list(doctype, fields=["count(*)"],
+		filters=filters + [["_user_tags", "not like", "%,%"]], as_list=True)[0][0]])
+
+	return tag_counts
+
 def scrub_user_tags(tagcount):
 	"""rebuild tag list for tags"""
 	rdict = {}
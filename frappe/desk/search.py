@@ -3,15 +3,20 @@
 
 # Search
 from __future__ import unicode_literals
-import frappe, json
+import frappe, json, hashlib
 from frappe.utils import cstr, unique, cint
 from frappe.permissions import has_permission
+from frappe.desk.link_search_index import (SEARCHABLE_FIELDTYPES, get_candidate_names,
+	get_search_version, get_indexed_doctypes)
 from frappe import _
 from six import string_types
 import re
 
 UNTRANSLATED_DOCTYPES = ["DocType", "Role"]
 
+# seconds for which results of a search are cached
+SEARCH_CACHE_TTL = 30
+
 def sanitize_searchfield(searchfield):
 	blacklisted_keywords = ['select', 'delete', 'drop', 'update', 'case', 'and', 'or', 'like']
 
@@ -88,6 +93,16 @@ def search_widget(doctype, txt, query=None, searchfield=None, start=0,
 			# custom query
 			# frappe.response["values"] = frappe.db.sql(scrub_custom_query(query, searchfield, txt))
 		else:
+			# only results of indexed doctypes are invalidated when their documents change
+			cache_key = None
+			if doctype in get_indexed_doctypes():
+				cache_key = get_search_cache_key(doctype, txt, searchfield, start, page_length, filters,
+					filter_fields, as_dict, reference_doctype, ignore_user_permissions)
+				values = frappe.cache().get_value(cache_key, expires=True)
+				if values is not None:
+					frappe.response["values"] = values
+					return
+
 			if isinstance(filters, dict):
 				filters_items = filters.items()
 				filters = []
@@ -113,10 +128,17 @@ def search_widget(doctype, txt, query=None, searchfield=None, start=0,
 
 				for f in search_fields:
 					fmeta = meta.get_field(f.strip())
-					if (doctype not in UNTRANSLATED_DOCTYPES) and (f == "name" or (fmeta and fmeta.fieldtype in ["Data", "Text", "Small Text", "Long Text",
-						"Link", "Select", "Read Only", "Text Editor"])):
+					if (doctype not in UNTRANSLATED_DOCTYPES) and (f == "name" or (fmeta and fmeta.fieldtype in SEARCHABLE_FIELDTYPES)):
 							or_filters.append([doctype, f.strip(), "like", "%{0}%".format(txt)])
 
+				# narrow down to the documents matching the trigrams of txt, if indexed
+				candidates = get_candidate_names(doctype, txt) if or_filters else None
+				if candidates is not None:
+					if not candidates:
+						frappe.response["values"] = []
+						return
+					filters.append([doctype, "name", "in", candidates])
+
 			if meta.get("fields", {"fieldname":"enabled", "fieldtype":"Check"}):
 				filters.append([doctype, "enabled", "=", 1])
 			if meta.get("fields", {"fieldname":"disabled", "fieldtype":"Check"}):
@@ -167,6 +189,16 @@ def search_widget(doctype, txt, query=None, searchfield=None, start=0,
 			else:
 				frappe.response["values"] = [r[:-1] for r in values]
 
+			if cache_key:
+				frappe.cache().set_value(cache_key, frappe.response["values"], expires_in_sec=SEARCH_CACHE_TTL)
+
+def get_search_cache_key(doctype, *args):
+	"""Returns the cache key of a search by the current user. Includes the search version
+	of the doctype, which changes whenever one of its documents is saved or deleted"""
+	args = json.dumps([doctype, get_search_version(doctype), frappe.session.user, frappe.local.lang] + list(args),
+		sort_keys=True, default=cstr)
+	return "link_search:{0}".format(hashlib.md5(args.encode("utf-8")).hexdigest())
+
 def get_std_fields_list(meta, key):
 	# get additional search fields
 	sflist = ["name"]
@@ -19,7 +19,8 @@ There should also be statistics available for tags (like top tags etc)
 
 Design:
 
-- free tags (user_tags) are stored in __user_tags
+- free tags (user_tags) are stored in the _user_tags column of each table, and
+  normalized in __tag_link (one row per document and tag) for filters and counts
 - doctype tags are set in tag_fields property of the doctype
 - top tags merges the tags from both the lists (only refreshes once an hour (max))
 
@@ -52,23 +53,65 @@ def remove_tag(tag, dt, dn):
 def get_tagged_docs(doctype, tag):
 	frappe.has_permission(doctype, throw=True)
 
-	return frappe.db.sql("""SELECT name
-		FROM `tab{0}`
-		WHERE _user_tags LIKE '%{1}%'""".format(doctype, tag))
+	return frappe.db.sql("""SELECT `document_name`
+		FROM `__tag_link`
+		WHERE `document_type`=%s and `tag` LIKE %s""", (doctype, '%' + tag + '%'))
 
 @frappe.whitelist()
 def get_tags(doctype, txt, cat_tags):
 	tags = json.loads(cat_tags)
-	try:
-		for _user_tags in frappe.db.sql_list("""select DISTINCT `_user_tags`
-			from `tab{0}`
-			where _user_tags like {1}
-			limit 50""".format(doctype, frappe.db.escape('%' + txt + '%'))):
-			tags.extend(_user_tags[1:].split(","))
-	except Exception as e:
-		if not frappe.db.is_column_missing(e): raise
+	tags.extend(frappe.db.sql_list("""select distinct `tag`
+		from `__tag_link`
+		where `document_type`=%s and `tag` like %s
+		limit 50""", (doctype, '%' + txt + '%')))
+
 	return sorted(filter(lambda t: t and txt.lower() in t.lower(), list(set(tags))))
 
+def get_tag_counts(doctype, names_query=None):
+	"""Returns [tag, count] of the documents of a doctype, optionally only of the
+	documents whose names are returned by `names_query`"""
+	condition = "and `document_name` in ({0})".format(names_query) if names_query else ""
+
+	# no query values, `names_query` is already escaped
+	return frappe.db.sql("""select `tag`, count(*)
+		from `__tag_link`
+		where `document_type`={0} {1}
+		group by `tag`""".format(frappe.db.escape(doctype, percent=False), condition), as_list=True)
+
+def update_tag_links(dt, dn, tags):
+	"""Replace the __tag_link rows of a document"""
+	delete_tag_links(dt, dn)
+
+	# tags are case insensitive
+	unique_tags = {}
+	for tag in tags:
+		unique_tags.setdefault(tag.lower(), tag)
+
+	for tag in unique_tags.values():
+		frappe.db.sql("""insert into `__tag_link` (`document_type`, `document_name`, `tag`)
+			values (%s, %s, %s)""", (dt, dn, tag))
+
+def delete_tag_links(dt, dn=None):
+	"""Delete the __tag_link rows of a document, a list of documents, or of all documents of a doctype"""
+	if dn:
+		frappe.db.sql("""delete from `__tag_link`
+			where `document_type`=%s and `document_name` in %s""",
+			(dt, tuple(dn) if isinstance(dn, (list, tuple)) else (dn,)))
+	else:
+		frappe.db.sql("delete from `__tag_link` where `document_type`=%s", dt)
+
+def rename_tag_links(dt, old, new, merge=False):
+	if merge:
+		# tags of the merged document are gone with its row
+		delete_tag_links(dt, old)
+	else:
+		frappe.db.sql("""update `__tag_link` set `document_name`=%s
+			where `document_type`=%s and `document_name`=%s""", (new, dt, old))
+
+def rename_doctype_tag_links(old, new):
+	frappe.db.sql("""update `__tag_link` set `document_type`=%s
+		where `document_type`=%s""", (new, old))
+
 class DocTags:
 	"""Tags for a particular doctype"""
 	def __init__(self, dt):
@@ -103,12 +146,14 @@ class DocTags:
 
 		if not tl:
 			tags = ''
+			tl = []
 		else:
 			tl = list(set(filter(lambda x: x, tl)))
 			tags = ',' + ','.join(tl)
 		try:
 			frappe.db.sql("update `tab%s` set _user_tags=%s where name=%s" % \
 				(self.dt,'%s','%s'), (tags , dn))
+			update_tag_links(self.dt, dn, tl)
 			doc= frappe.get_doc(self.dt, dn)
 			update_global_search(doc)
 		except Exception as e:
@@ -118,6 +118,9 @@ standard_queries = {
 	"User": "frappe.core.doctype.user.user.user_query"
 }
 
+# doctypes with a trigram index for link field search, see frappe.desk.link_search_index
+link_search_index = ["Contact", "Address"]
+
 doc_events = {
 	"*": {
 		"on_update": [
@@ -125,17 +128,25 @@ doc_events = {
 			"frappe.core.doctype.activity_log.feed.update_feed",
 			"frappe.workflow.doctype.workflow_action.workflow_action.process_workflow_actions",
 			"frappe.automation.doctype.assignment_rule.assignment_rule.apply",
-			"frappe.automation.doctype.milestone_tracker.milestone_tracker.evaluate_milestone"
+			"frappe.automation.doctype.milestone_tracker.milestone_tracker.evaluate_milestone",
+			"frappe.desk.doctype.dashboard_chart.dashboard_chart.update_rollups",
+			"frappe.desk.link_search_index.update_link_search_index"
+		],
+		"after_rename": [
+			"frappe.desk.notifications.clear_doctype_notifications",
+			"frappe.desk.link_search_index.rename_in_link_search_index"
 		],
-		"after_rename": "frappe.desk.notifications.clear_doctype_notifications",
 		"on_cancel": [
 			"frappe.desk.notifications.clear_doctype_notifications",
-			"frappe.workflow.doctype.workflow_action.workflow_action.process_workflow_actions"
+			"frappe.workflow.doctype.workflow_action.workflow_action.process_workflow_actions",
+			"frappe.desk.doctype.dashboard_chart.dashboard_chart.update_rollups"
 		],
 		"on_trash": [
 			"frappe.desk.notifications.clear_doctype_notifications",
-			"frappe.workflow.doctype.workflow_action.workflow_action.process_workflow_actions"
+			"frappe.workflow.doctype.workflow_action.workflow_action.process_workflow_actions",
+			"frappe.desk.link_search_index.delete_from_link_search_index"
 		],
+		"after_delete": "frappe.desk.doctype.dashboard_chart.dashboard_chart.update_rollups",
 		"on_change": [
 			"frappe.social.doctype.energy_point_rule.energy_point_rule.process_energy_points"
 		],
@@ -160,7 +171,8 @@ scheduler_events = {
 		"frappe.integrations.doctype.razorpay_settings.razorpay_settings.capture_payment",
 		"frappe.twofactor.delete_all_barcodes_for_users",
 		"frappe.website.doctype.web_page.web_page.check_publish_status",
-		'frappe.utils.global_search.sync_global_search'
+		'frappe.utils.global_search.sync_global_search',
+		"frappe.sessions.flush_sessions"
 	],
 	"hourly": [
 		"frappe.model.utils.link_count.update_link_count",
@@ -169,7 +181,9 @@ scheduler_events = {
 		"frappe.desk.page.backups.backups.delete_downloadable_backups",
 		"frappe.deferred_insert.save_to_db",
 		"frappe.desk.form.document_follow.send_hourly_updates",
-		"frappe.integrations.doctype.google_calendar.google_calendar.sync"
+		"frappe.integrations.doctype.google_calendar.google_calendar.sync",
+		"frappe.desk.doctype.dashboard_chart.dashboard_chart.sync_rollups",
+		"frappe.desk.notifications.recompute_notification_counts"
 	],
 	"daily": [
 		"frappe.email.queue.clear_outbox",
@@ -18,6 +18,7 @@ from frappe.utils.fixtures import sync_fixtures
 from frappe.website import render
 from frappe.modules.utils import sync_customizations
 from frappe.database import setup_database
+from frappe.utils.config_cache import get_stat, touch_if_unchanged, clear_config_cache
 
 def install_db(root_login="root", root_password=None, db_name=None, source_sql=None,
 	admin_password=None, verbose=True, force=0, site_config=None, reinstall=False,
@@ -40,6 +41,9 @@ def install_db(root_login="root", root_password=None, db_name=None, source_sql=N
 	frappe.db.create_auth_table()
 	frappe.db.create_global_search_table()
 	frappe.db.create_user_settings_table()
+	frappe.db.create_dashboard_chart_rollup_table()
+	frappe.db.create_link_search_index_table()
+	frappe.db.create_tag_link_table()
 
 	frappe.flags.in_install_db = False
 
@@ -233,9 +237,14 @@ def update_site_config(key, value, validate=True, site_config_path=None):
 	else:
 		site_config[key] = value
 
+	stat = get_stat(site_config_path)
 	with open(site_config_path, "w") as f:
 		f.write(json.dumps(site_config, indent=1, sort_keys=True))
 
+	# other processes re-read the file when its mtime or size changes
+	touch_if_unchanged(site_config_path, stat)
+	clear_config_cache(site_config_path)
+
 	if hasattr(frappe.local, "conf"):
 		frappe.local.conf[key] = value
 
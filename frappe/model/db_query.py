@@ -355,6 +355,11 @@ class DatabaseQuery(object):
 		if not tname in self.tables:
 			self.append_table(tname)
 
+		if f.fieldname == '_user_tags':
+			condition = self.get_user_tags_condition(f, tname)
+			if condition:
+				return condition
+
 		if 'ifnull(' in f.fieldname:
 			column_name = f.fieldname
 		else:
@@ -518,6 +523,35 @@ class DatabaseQuery(object):
 
 		return condition
 
+	def get_user_tags_condition(self, f, tname):
+		"""Returns a condition on the indexed `__tag_link` table for a filter on `_user_tags`,
+		or None if the filter does not match single tags"""
+		operator = f.operator.lower()
+		value = cstr(f.value)
+
+		if operator not in ('=', 'like', 'not like') or not value:
+			return None
+
+		if operator in ('like', 'not like'):
+			if value == '%,%':
+				# any tag
+				tag_condition = ''
+			elif ',' in value:
+				return None
+			else:
+				# because "like" uses backslash (\) for escaping
+				value = value.replace("\\", "\\\\").replace("%", "%%")
+				tag_condition = 'and `tag` like {0}'.format(frappe.db.escape(value, percent=False))
+		else:
+			if ',' in value:
+				return None
+			tag_condition = 'and `tag` = {0}'.format(frappe.db.escape(value, percent=False))
+
+		return '''{tname}.`name` {operator} (select `document_name` from `__tag_link`
+			where `document_type` = {doctype} {tag_condition})'''.format(tname=tname,
+				operator='not in' if operator == 'not like' else 'in',
+				doctype=frappe.db.escape(f.doctype, percent=False), tag_condition=tag_condition)
+
 	def build_match_conditions(self, as_condition=True):
 		"""add match conditions if applicable"""
 		self.match_filters = []
@@ -641,11 +675,11 @@ class DatabaseQuery(object):
 			self.match_filters.append(match_filters)
 
 	def get_permission_query_conditions(self):
-		condition_methods = frappe.get_hooks("permission_query_conditions", {}).get(self.doctype, [])
+		condition_methods = frappe.get_hooks_registry().get_methods("permission_query_conditions", self.doctype)
 		if condition_methods:
 			conditions = []
 			for method in condition_methods:
-				c = frappe.call(frappe.get_attr(method), self.user)
+				c = frappe.call(method, self.user)
 				if c:
 					conditions.append(c)
 
@@ -5,6 +5,7 @@ from __future__ import unicode_literals
 import os
 from six import string_types, integer_types
 import shutil
+from collections import OrderedDict
 
 import frappe
 import frappe.defaults
@@ -15,12 +16,19 @@ from frappe.model.dynamic_links import get_dynamic_link_map
 from frappe.core.doctype.file.file import remove_all
 from frappe.utils.password import delete_all_passwords_for
 from frappe.model.naming import revert_series_if_last
-from frappe.utils.global_search import delete_for_document
+from frappe.utils import cstr, now
+from frappe.utils.global_search import (delete_for_document, delete_for_documents,
+	delete_global_search_records_for_doctype)
+from frappe.desk.tags import delete_tag_links
+from frappe.cache_manager import clear_defaults_cache
 from frappe.exceptions import FileNotFoundError
 
 
 doctypes_to_skip = ("Communication", "ToDo", "DocShare", "Email Unsubscribe", "Activity Log", "File", "Version", "Document Follow", "Comment" , "View Log")
 
+# documents checked and deleted together by `delete_docs_in_bulk`
+BULK_DELETE_CHUNK_SIZE = 500
+
 def delete_doc(doctype=None, name=None, force=0, ignore_doctypes=None, for_reload=False,
 	ignore_permissions=False, flags=None, ignore_on_trash=False, ignore_missing=True):
 	"""
@@ -71,7 +79,10 @@ def delete_doc(doctype=None, name=None, force=0, ignore_doctypes=None, for_reloa
 				frappe.db.sql("delete from `tabProperty Setter` where doc_type = %s", name)
 				frappe.db.sql("delete from `tabReport` where ref_doctype=%s", name)
 				frappe.db.sql("delete from `tabCustom DocPerm` where parent=%s", name)
-				frappe.db.sql("delete from `__global_search` where doctype=%s", name)
+				delete_global_search_records_for_doctype(name)
+				delete_tag_links(name)
+				from frappe.core.doctype.doctype.doctype import clear_linked_doctype_cache
+				clear_linked_doctype_cache()
 
 			delete_from_table(doctype, name, ignore_doctypes, None)
 
@@ -101,6 +112,7 @@ def delete_doc(doctype=None, name=None, force=0, ignore_doctypes=None, for_reloa
 					
 			# delete attachments
 			remove_all(doctype, name, from_delete=True)
+			delete_tag_links(doctype, name)
 
 			update_naming_series(doc)
 			delete_from_table(doctype, name, ignore_doctypes, doc)
@@ -140,6 +152,235 @@ def add_to_deleted_document(doc):
 			owner=frappe.session.user
 		)).db_insert()
 
+def delete_docs_in_bulk(doctype, names, ignore_permissions=False, ignore_on_trash=False,
+	chunk_size=BULK_DELETE_CHUNK_SIZE, publish_progress=True):
+	"""
+		Deletes documents of a doctype in chunks, committing after every chunk.
+
+		Links to all documents of a chunk are checked with one query per link field.
+		Controller methods (`on_trash`, `on_change`, `after_delete`) run for every
+		document, rows of the document and its child tables are deleted with `in`
+		queries and Deleted Document rows are inserted in bulk. Documents that are
+		linked are deleted one by one with `delete_doc` at the end, once the other
+		documents are gone. DocTypes are always deleted one by one.
+
+		Returns a dict of {name: error} for the documents that could not be deleted.
+	"""
+	names = list(OrderedDict.fromkeys(names))
+	failed, deferred = {}, []
+
+	if doctype == "DocType":
+		# deleting a DocType drops its table and controller, always one by one
+		deferred, names_in_chunks = names, []
+	else:
+		names_in_chunks = names
+
+	def _publish_progress(done):
+		if publish_progress and len(names) >= 5:
+			frappe.publish_progress(done * 100.0 / len(names),
+				title=_('Deleting {0}').format(_(doctype)),
+				description=_('{0} of {1}').format(done, len(names)))
+
+	for i in range(0, len(names_in_chunks), chunk_size):
+		chunk = names_in_chunks[i:i + chunk_size]
+		linked = get_linked_names(doctype, chunk)
+
+		docs = []
+		for name in chunk:
+			if name in linked:
+				deferred.append(name)
+				continue
+
+			frappe.db.savepoint("bulk_delete")
+			try:
+				doc = frappe.get_doc(doctype, name)
+				update_flags(doc, None, ignore_permissions)
+				check_permission_and_not_submitted(doc)
+
+				if not ignore_on_trash:
+					doc.run_method("on_trash")
+					doc.flags.in_delete = True
+					doc.run_method('on_change')
+
+				docs.append(doc)
+			except frappe.DoesNotExistError:
+				# already deleted
+				frappe.db.rollback(save_point="bulk_delete")
+				frappe.clear_messages()
+			except Exception as e:
+				frappe.db.rollback(save_point="bulk_delete")
+				frappe.clear_messages()
+				failed[name] = cstr(e)
+
+		delete_from_tables_in_bulk(doctype, docs)
+		frappe.db.commit()
+		_publish_progress(i + len(chunk) - len(deferred))
+
+	# linked documents may be unlinked by their own on_trash or by the deleted documents,
+	# delete them with the standard checks
+	for i, name in enumerate(deferred):
+		frappe.db.savepoint("bulk_delete")
+		try:
+			delete_doc(doctype, name, ignore_permissions=ignore_permissions, ignore_on_trash=ignore_on_trash)
+		except Exception as e:
+			frappe.db.rollback(save_point="bulk_delete")
+			frappe.clear_messages()
+			failed[name] = cstr(e)
+
+		if (i + 1) % chunk_size == 0 or i == len(deferred) - 1:
+			frappe.db.commit()
+			_publish_progress(len(names) - len(deferred) + i + 1)
+
+	return failed
+
+def get_linked_names(doctype, names, method="Delete"):
+	"""Returns a dict of {name: (linked doctype, linked name)} for the given documents that
+	are linked in other records, with one query per link field"""
+	from frappe.model.rename_doc import get_link_fields
+
+	linked = {}
+	if not names:
+		return linked
+
+	names = tuple(names)
+	lower_names = {name.lower(): name for name in names}
+
+	def _add(name, reference_doctype, reference_name):
+		# case insensitive like the database
+		name = lower_names.get(cstr(name).lower())
+		if name and not (reference_doctype == doctype and reference_name == name):
+			linked.setdefault(name, (reference_doctype, reference_name))
+
+	for lf in get_link_fields(doctype):
+		link_dt, link_field = lf['parent'], lf['fieldname']
+		if lf['issingle']:
+			if link_dt not in doctypes_to_skip:
+				_add(frappe.db.get_value(link_dt, None, link_field), link_dt, link_dt)
+			continue
+
+		for item in frappe.db.sql("""select `name`, `parent`, `parenttype`, `docstatus`, `{0}` as link_name
+			from `tab{1}` where `{0}` in %s""".format(link_field, link_dt), (names,), as_dict=True):
+			linked_doctype = item.parenttype if item.parent else link_dt
+			if linked_doctype in doctypes_to_skip:
+				continue
+
+			if method == "Cancel" and item.docstatus != 1:
+				continue
+
+			_add(item.link_name, linked_doctype, item.parent or item.name)
+
+	for df in get_dynamic_link_map().get(doctype, []):
+		if df.parent in doctypes_to_skip:
+			continue
+
+		meta = frappe.get_meta(df.parent)
+		if meta.issingle:
+			refdoc = frappe.db.get_singles_dict(df.parent)
+			if refdoc.get(df.options) == doctype and refdoc.get(df.fieldname) in names:
+				_add(refdoc.get(df.fieldname), df.parent, df.parent)
+			continue
+
+		docstatus_condition = "`docstatus` = 1" if method == "Cancel" else "`docstatus` < 2"
+		for refdoc in frappe.db.sql("""select `name`, `{fieldname}` as link_name {table}
+			from `tab{parent}`
+			where `{options}`=%s and `{fieldname}` in %s and {condition}""".format(
+				table=", `parent`, `parenttype`" if meta.istable else "", condition=docstatus_condition,
+				**df), (doctype, names), as_dict=True):
+			_add(refdoc.link_name, refdoc.parenttype if meta.istable else df.parent,
+				refdoc.parent if meta.istable else refdoc.name)
+
+	return linked
+
+def delete_from_tables_in_bulk(doctype, docs):
+	"""Delete checked documents, their child rows and references, and add them to Deleted Document"""
+	if not docs:
+		return
+
+	names = tuple(d.name for d in docs)
+
+	try:
+		frappe.db.sql("""delete from `__Auth` where `doctype`=%s and `name` in %s""", (doctype, names))
+	except Exception as e:
+		if not frappe.db.is_missing_column(e):
+			raise
+
+	# delete attachments
+	for name in frappe.db.sql_list("""select distinct `attached_to_name` from `tabFile`
+		where `attached_to_doctype`=%s and `attached_to_name` in %s""", (doctype, names)):
+		remove_all(doctype, name, from_delete=True)
+
+	delete_tag_links(doctype, list(names))
+
+	for doc in docs:
+		update_naming_series(doc)
+
+	frappe.db.sql("delete from `tab{0}` where `name` in %s".format(doctype), (names,))
+	for table in set(d.options for d in frappe.get_meta(doctype).get_table_fields()):
+		frappe.db.sql("delete from `tab{0}` where `parenttype`=%s and `parent` in %s".format(table),
+			(doctype, names))
+
+	for doc in docs:
+		doc.run_method("after_delete")
+
+	frappe.enqueue('frappe.model.delete_doc.delete_dynamic_links',
+		doctype=doctype, name=list(names),
+		is_async=False if frappe.flags.in_test else True)
+
+	delete_for_documents(doctype, names)
+	add_to_deleted_documents(docs)
+	if not frappe.flags.in_patch:
+		for doc in docs:
+			try:
+				doc.notify_update()
+			except ImportError:
+				pass
+		insert_feeds(docs)
+
+	delete_user_permission_defaults(doctype, names)
+
+def delete_user_permission_defaults(doctype, names):
+	"""Delete user permissions on the given documents stored as defaults, and clear the
+	defaults cache of their users"""
+	users = frappe.db.sql_list("""select distinct `parent` from `tabDefaultValue`
+		where `parenttype`='User Permission' and `defkey`=%s and `defvalue` in %s""", (doctype, names))
+	if not users:
+		return
+
+	frappe.db.sql("""delete from `tabDefaultValue`
+		where `parenttype`='User Permission' and `defkey`=%s and `defvalue` in %s""", (doctype, names))
+
+	for user in users:
+		clear_defaults_cache(user)
+		frappe.clear_cache(user=user)
+
+def add_to_deleted_documents(docs):
+	'''Add deleted documents to the Deleted Document table with multi-row inserts'''
+	if frappe.flags.in_install == 'frappe':
+		return
+
+	timestamp, user = now(), frappe.session.user
+
+	frappe.db.bulk_insert('Deleted Document',
+		['name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus',
+			'deleted_doctype', 'deleted_name', 'data'],
+		[[frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0,
+			doc.doctype, doc.name, doc.as_json()] for doc in docs if doc.doctype != 'Deleted Document'])
+
+def insert_feeds(docs):
+	from frappe.utils import get_fullname
+
+	if frappe.flags.in_install or frappe.flags.in_import:
+		return
+
+	timestamp, user = now(), frappe.session.user
+
+	frappe.db.bulk_insert('Comment',
+		['name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus',
+			'comment_type', 'reference_doctype', 'subject', 'full_name'],
+		[[frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0,
+			'Deleted', doc.doctype, "{0} {1}".format(_(doc.doctype), doc.name), get_fullname(doc.owner)]
+			for doc in docs if not getattr(doc, "no_feed_on_delete", False)])
+
 def update_naming_series(doc):
 	if doc.meta.autoname:
 		if doc.meta.autoname.startswith("naming_series:") \
@@ -295,6 +536,7 @@ def raise_link_exists_exception(doc, reference_doctype, reference_docname, row='
 		.format(doc.doctype, doc_link, reference_doctype, reference_link, row), frappe.LinkExistsError)
 
 def delete_dynamic_links(doctype, name):
+	"""Delete or unlink records referring to a deleted document, or a list of deleted documents"""
 	delete_references('ToDo', doctype, name, 'reference_type')
 	delete_references('Email Unsubscribe', doctype, name)
 	delete_references('DocShare', doctype, name, 'share_doctype', 'share_name')
@@ -310,11 +552,14 @@ def delete_dynamic_links(doctype, name):
 	clear_references('Activity Log', doctype, name)
 	clear_references('Activity Log', doctype, name, 'timeline_doctype', 'timeline_name')
 
+def get_names(name):
+	return tuple(name) if isinstance(name, (list, tuple)) else (name,)
+
 def delete_references(doctype, reference_doctype, reference_name,
 		reference_doctype_field = 'reference_doctype', reference_name_field = 'reference_name'):
 	frappe.db.sql('''delete from `tab{0}`
-		where {1}=%s and {2}=%s'''.format(doctype, reference_doctype_field, reference_name_field), # nosec
-		(reference_doctype, reference_name))
+		where {1}=%s and {2} in %s'''.format(doctype, reference_doctype_field, reference_name_field), # nosec
+		(reference_doctype, get_names(reference_name)))
 
 def clear_references(doctype, reference_doctype, reference_name,
 		reference_doctype_field = 'reference_doctype', reference_name_field = 'reference_name'):
@@ -323,12 +568,13 @@ def clear_references(doctype, reference_doctype, reference_name,
 		set
 			{1}=NULL, {2}=NULL
 		where
-			{1}=%s and {2}=%s'''.format(doctype, reference_doctype_field, reference_name_field), # nosec
-		(reference_doctype, reference_name))
+			{1}=%s and {2} in %s'''.format(doctype, reference_doctype_field, reference_name_field), # nosec
+		(reference_doctype, get_names(reference_name)))
 
 def clear_timeline_references(link_doctype, link_name):
 	frappe.db.sql("""delete from `tabCommunication Link`
-		where `tabCommunication Link`.link_doctype='{0}' and `tabCommunication Link`.link_name='{1}'""".format(link_doctype, link_name)) # nosec
+		where `tabCommunication Link`.link_doctype=%s and `tabCommunication Link`.link_name in %s""",
+		(link_doctype, get_names(link_name)))
 
 def insert_feed(doc):
 	from frappe.utils import get_fullname
@@ -1045,12 +1045,8 @@ class Document(BaseDocument):
 			return runner
 
 		def composer(self, *args, **kwargs):
-			hooks = []
 			method = f.__name__
-			doc_events = frappe.get_doc_hooks()
-			for handler in doc_events.get(self.doctype, {}).get(method, []) \
-				+ doc_events.get("*", {}).get(method, []):
-				hooks.append(frappe.get_attr(handler))
+			hooks = frappe.get_hooks_registry().get_doc_event_handlers(self.doctype, method)
 
 			composed = compose(f, *hooks)
 			return composed(self, method, *args, **kwargs)
@@ -2,20 +2,40 @@
 # MIT License. See license.txt
 
 from __future__ import unicode_literals, print_function
+import json
 import frappe
+import frappe.defaults
 from frappe import _
-from frappe.utils import cint
+from frappe.utils import cint, cstr
 from frappe.model.naming import validate_name
 from frappe.model.dynamic_links import get_dynamic_link_map
 from frappe.utils.password import rename_password
 from frappe.model.utils.user_settings import sync_user_settings, update_user_settings_data
+from frappe.desk.tags import rename_tag_links, rename_doctype_tag_links
+
+# rows updated per query when propagating a rename
+RENAME_CHUNK_SIZE = 1000
 
 @frappe.whitelist()
-def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=False, ignore_if_exists=False):
+def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=False, ignore_if_exists=False,
+	commit_in_chunks=False, publish_progress=False):
 	"""
 		Renames a doc(dt, old) to doc(dt, new) and
 		updates all linked fields of type "Link"
+
+		If `commit_in_chunks` is set, the document itself is renamed and committed first.
+		References are then updated in chunks of `RENAME_CHUNK_SIZE` rows, each chunk
+		in its own transaction, so large tables are not locked for the whole rename.
+		Use it from background jobs (see `enqueue_rename_doc`), not in a web request.
+		If updating the references fails, calling it again with the same names resumes
+		the update.
 	"""
+	commit_in_chunks = cint(commit_in_chunks)
+	if commit_in_chunks and is_rename_in_progress(doctype, old, new):
+		# the document was renamed but not all its references were updated
+		update_references(doctype, old, new, commit_in_chunks=True, publish_progress=publish_progress)
+		return new
+
 	if not frappe.db.exists(doctype, old):
 		return
 
@@ -42,11 +62,25 @@ def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=F
 	if not merge:
 		rename_parent_and_child(doctype, old, new, meta)
 
+	if commit_in_chunks:
+		if not merge:
+			# the old name no longer exists, record the rename so that it can be resumed
+			set_rename_in_progress(doctype, old, new)
+		frappe.db.commit()
+
+	update_references(doctype, old, new, force, merge, commit_in_chunks, publish_progress, old_doc)
+
+	return new
+
+def update_references(doctype, old, new, force=False, merge=False, commit_in_chunks=False, publish_progress=False,
+	old_doc=None):
+	"""Update links, dynamic links, settings, attachments etc. of a renamed document"""
 	# update link fields' values
 	link_fields = get_link_fields(doctype)
-	update_link_field_values(link_fields, old, new, doctype)
+	update_link_field_values(link_fields, old, new, doctype, commit_in_chunks=commit_in_chunks,
+		publish_progress=publish_progress)
 
-	rename_dynamic_links(doctype, old, new)
+	rename_dynamic_links(doctype, old, new, commit_in_chunks=commit_in_chunks)
 
 	# save the user settings in the db
 	update_user_settings(old, new, link_fields)
@@ -57,6 +91,7 @@ def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=F
 	update_attachments(doctype, old, new)
 
 	rename_versions(doctype, old, new)
+	rename_tag_links(doctype, old, new, merge)
 
 	# call after_rename
 	new_doc = frappe.get_doc(doctype, new)
@@ -81,10 +116,27 @@ def rename_doc(doctype, old, new, force=False, merge=False, ignore_permissions=F
 	if merge:
 		frappe.delete_doc(doctype, old)
 
+	if commit_in_chunks and not merge:
+		clear_rename_in_progress(doctype, old, new)
+
 	frappe.clear_cache()
 	frappe.enqueue('frappe.utils.global_search.rebuild_for_doctype', doctype=doctype)
 
-	return new
+def get_rename_progress_value(old, new):
+	return json.dumps([old, new])
+
+def set_rename_in_progress(doctype, old, new):
+	frappe.defaults.add_default(doctype, get_rename_progress_value(old, new), "__rename_in_progress")
+
+def clear_rename_in_progress(doctype, old, new):
+	frappe.defaults.clear_default(key=doctype, value=get_rename_progress_value(old, new),
+		parent="__rename_in_progress")
+
+def is_rename_in_progress(doctype, old, new):
+	"""Returns True if `old` was renamed with `commit_in_chunks` and its references
+	have not all been updated"""
+	return bool(frappe.db.exists("DefaultValue", dict(parent="__rename_in_progress",
+		defkey=doctype, defvalue=get_rename_progress_value(old, new))))
 
 
 def update_user_settings(old, new, link_fields):
@@ -102,7 +154,8 @@ def update_user_settings(old, new, link_fields):
 	user_settings_details = frappe.db.sql('''SELECT `user`, `doctype`, `data`
 			FROM `__UserSettings`
 			WHERE `data` like %s
-			AND `doctype` IN ('{doctypes}')'''.format(doctypes="', '".join(linked_doctypes)), (old), as_dict=1)
+			AND `doctype` IN ('{doctypes}')'''.format(doctypes="', '".join(linked_doctypes)),
+			("%" + old.replace("%", "\\%").replace("_", "\\_") + "%",), as_dict=1)
 
 	# create the dict using the doctype name as key and values as list of the user settings
 	from collections import defaultdict
@@ -187,40 +240,99 @@ def rename_doctype(doctype, old, new, force=False):
 	# change parenttype for fieldtype Table
 	update_parenttype_values(old, new)
 
+	rename_doctype_tag_links(old, new)
+
 def update_child_docs(old, new, meta):
 	# update "parent"
 	for df in meta.get_table_fields():
 		frappe.db.sql("update `tab%s` set parent=%s where parent=%s" \
 			% (df.options, '%s', '%s'), (new, old))
 
-def update_link_field_values(link_fields, old, new, doctype):
+def update_link_field_values(link_fields, old, new, doctype, commit_in_chunks=False, publish_progress=False):
+	single_fields = [field for field in link_fields if field['issingle']]
+	update_single_link_values(single_fields, old, new)
+
+	updates = []
 	for field in link_fields:
-		if field['issingle']:
-			try:
-				single_doc = frappe.get_doc(field['parent'])
-				if single_doc.get(field['fieldname'])==old:
-					single_doc.set(field['fieldname'], new)
-					# update single docs using ORM rather then query
-					# as single docs also sometimes sets defaults!
-					single_doc.flags.ignore_mandatory = True
-					single_doc.save(ignore_permissions=True)
-			except ImportError:
-				# fails in patches where the doctype has been renamed
-				# or no longer exists
-				pass
-		else:
+		if not field['issingle']:
 			# because the table hasn't been renamed yet!
 			parent = field['parent'] if field['parent']!=new else old
+			updates.append(frappe._dict(parent=parent, fieldname=field['fieldname']))
 
-			frappe.db.sql("""
-				update `tab{table_name}` set `{fieldname}`=%s
-				where `{fieldname}`=%s""".format(
-					table_name=parent,
-					fieldname=field['fieldname']), (new, old))
 		# update cached link_fields as per new
 		if doctype=='DocType' and field['parent'] == old:
 			field['parent'] = new
 
+	run_reference_updates(updates, old, new, commit_in_chunks=commit_in_chunks,
+		progress_title=_('Renaming {0}').format(old) if publish_progress else None)
+
+def update_single_link_values(single_fields, old, new):
+	"""Update link fields in single doctypes. Only singles that link to `old`
+	are loaded and saved"""
+	if not single_fields:
+		return
+
+	singles = frappe.db.sql_list("""select distinct `doctype` from `tabSingles`
+		where `value`=%s and ({0})""".format(" or ".join(["(`doctype`=%s and `field`=%s)"] * len(single_fields))),
+		[old] + [v for field in single_fields for v in (field['parent'], field['fieldname'])])
+
+	for single in singles:
+		try:
+			single_doc = frappe.get_doc(single)
+			for field in single_fields:
+				if field['parent']==single and single_doc.get(field['fieldname'])==old:
+					single_doc.set(field['fieldname'], new)
+
+			# update single docs using ORM rather then query
+			# as single docs also sometimes sets defaults!
+			single_doc.flags.ignore_mandatory = True
+			single_doc.save(ignore_permissions=True)
+		except ImportError:
+			# fails in patches where the doctype has been renamed
+			# or no longer exists
+			pass
+
+def run_reference_updates(updates, old, new, commit_in_chunks=False, progress_title=None,
+	chunk_size=RENAME_CHUNK_SIZE):
+	"""Set `fieldname` from `old` to `new` in all rows of the planned updates.
+
+	:param updates: list of `frappe._dict(parent, fieldname, doctype_fieldname, doctype)`.
+		If `doctype_fieldname` is set, only rows where it is `doctype` are updated (Dynamic Link).
+	:param commit_in_chunks: commit after every chunk
+
+	Rows are selected in chunks ordered by `name` and updated by `name`, so every
+	query only locks the rows of its chunk"""
+	for i, d in enumerate(updates):
+		condition, values = "`{0}`=%s".format(d.fieldname), [old]
+		if d.doctype_fieldname:
+			condition += " and `{0}`=%s".format(d.doctype_fieldname)
+			values.append(d.doctype)
+
+		last_name = None
+		while True:
+			names = frappe.db.sql_list("""select `name` from `tab{parent}`
+				where {condition} {after}
+				order by `name` limit {limit}""".format(parent=d.parent, condition=condition,
+					after="and `name` > %s" if last_name is not None else "", limit=cint(chunk_size)),
+				values + ([last_name] if last_name is not None else []))
+			if not names:
+				break
+
+			frappe.db.sql("""update `tab{parent}` set `{fieldname}`=%s
+				where `name` in %s and {condition}""".format(parent=d.parent, fieldname=d.fieldname,
+					condition=condition), [new, tuple(names)] + values)
+
+			if commit_in_chunks:
+				frappe.db.commit()
+
+			last_name = names[-1]
+			if len(names) < chunk_size:
+				break
+
+		if progress_title and len(updates) > 1:
+			frappe.publish_progress((i + 1) * 100.0 / len(updates), title=progress_title,
+				description=_('{0} of {1}').format(i + 1, len(updates)))
+
 def get_link_fields(doctype):
 	# get link fields from tabDocField
 	if not frappe.flags.link_fields:
@@ -388,7 +500,8 @@ def update_parenttype_values(old, new):
 			where parenttype=%s""" % (doctype, '%s', '%s'),
 		(new, old))
 
-def rename_dynamic_links(doctype, old, new):
+def rename_dynamic_links(doctype, old, new, commit_in_chunks=False):
+	updates = []
 	for df in get_dynamic_link_map().get(doctype, []):
 		# dynamic link in single, just one value to check
 		if frappe.get_meta(df.parent).issingle:
@@ -400,15 +513,57 @@ def rename_dynamic_links(doctype, old, new):
 		else:
 			# because the table hasn't been renamed yet!
 			parent = df.parent if df.parent != new else old
-			frappe.db.sql("""update `tab{parent}` set {fieldname}=%s
-				where {options}=%s and {fieldname}=%s""".format(parent = parent,
-					fieldname=df.fieldname, options=df.options), (new, doctype, old))
+			updates.append(frappe._dict(parent=parent, fieldname=df.fieldname,
+				doctype_fieldname=df.options, doctype=doctype))
+
+	run_reference_updates(updates, old, new, commit_in_chunks=commit_in_chunks)
+
+@frappe.whitelist()
+def enqueue_rename_doc(doctype, old, new, merge=False):
+	"""Rename a document in a background job. References are updated in chunks,
+	each in its own transaction, and progress is published to the user"""
+	merge = cint(merge)
+	if not frappe.db.exists(doctype, old) and not is_rename_in_progress(doctype, old, new):
+		frappe.throw(_("{0} {1} not found").format(_(doctype), old), frappe.DoesNotExistError)
+
+	if not frappe.has_permission(doctype, "write"):
+		frappe.throw(_("You need write permission to rename"), frappe.PermissionError)
+
+	frappe.enqueue("frappe.model.rename_doc.rename_doc_in_background", queue="long", timeout=4000,
+		doctype=doctype, old=old, new=new, merge=merge, enqueue_after_commit=True)
+
+def rename_doc_in_background(doctype, old, new, merge=False):
+	try:
+		new = rename_doc(doctype, old, new, merge=merge, commit_in_chunks=True, publish_progress=True)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), _("Rename of {0} {1}").format(doctype, old))
+		if is_rename_in_progress(doctype, old, new):
+			message = _("{0} {1} was renamed to {2}, but not all references were updated: {3}. Rename it again to resume.")\
+				.format(_(doctype), old, new, cstr(e))
+		else:
+			message = _("Could not rename {0} {1}: {2}").format(_(doctype), old, cstr(e))
+		frappe.publish_realtime("msgprint", message, user=frappe.session.user)
+		frappe.publish_realtime("rename_doc", {"doctype": doctype, "old": old, "new": new, "failed": 1},
+			user=frappe.session.user)
+		return
+
+	frappe.db.commit()
+	frappe.publish_realtime("msgprint", _("{0} {1} renamed to {2}").format(_(doctype), old, new),
+		user=frappe.session.user)
+
+	# lets the desk update the renamed form or tree node
+	frappe.publish_realtime("rename_doc", {"doctype": doctype, "old": old, "new": new},
+		user=frappe.session.user)
 
 def bulk_rename(doctype, rows=None, via_console = False):
 	"""Bulk rename documents
 
 	:param doctype: DocType to be renamed
-	:param rows: list of documents as `((oldname, newname), ..)`"""
+	:param rows: list of documents as `((oldname, newname), ..)`
+
+	Every row is committed on its own and its references are updated in chunks,
+	see `rename_doc(commit_in_chunks=True)`"""
 	if not rows:
 		frappe.throw(_("Please select a valid csv file with data"))
 
@@ -418,11 +573,11 @@ def bulk_rename(doctype, rows=None, via_console = False):
 			frappe.throw(_("Maximum {0} rows allowed").format(max_rows))
 
 	rename_log = []
-	for row in rows:
+	for i, row in enumerate(rows):
 		# if row has some content
 		if len(row) > 1 and row[0] and row[1]:
 			try:
-				if rename_doc(doctype, row[0], row[1]):
+				if rename_doc(doctype, row[0], row[1], commit_in_chunks=True):
 					msg = _("Successful: {0} to {1}").format(row[0], row[1])
 					frappe.db.commit()
 				else:
@@ -436,6 +591,10 @@ def bulk_rename(doctype, rows=None, via_console = False):
 			else:
 				rename_log.append(msg)
 
+		if not via_console and len(rows) >= 5:
+			frappe.publish_progress((i + 1) * 100.0 / len(rows), title=_('Renaming {0}').format(_(doctype)),
+				description=_('{0} of {1}').format(i + 1, len(rows)))
+
 	frappe.enqueue('frappe.utils.global_search.rebuild_for_doctype', doctype=doctype)
 
 	if not via_console:
@@ -3,12 +3,16 @@
 
 from __future__ import unicode_literals
 
+import redis
 import frappe
-from six import iteritems
+from frappe.utils import cint, cstr
 
 ignore_doctypes = ("DocType", "Print Format", "Role", "Module Def", "Communication",
 	"ToDo")
 
+# documents updated per query by update_link_count
+UPDATE_CHUNK_SIZE = 500
+
 def notify_link_count(doctype, name):
 	'''updates link count for given document'''
 	if hasattr(frappe.local, 'link_count'):
@@ -17,35 +21,81 @@ def notify_link_count(doctype, name):
 		else:
 			frappe.local.link_count[(doctype, name)] = 1
 
+def get_link_count_key():
+	# older versions stored a pickled dict under `_link_count`, HINCRBY fails on it
+	return frappe.cache().make_key('_link_count_hash')
+
 def flush_local_link_count():
-	'''flush from local before ending request'''
+	'''flush from local before ending request
+
+	Counts are added to the `_link_count_hash` hash with `HINCRBY`, so concurrent
+	workers do not overwrite each other's counts'''
 	if not getattr(frappe.local, 'link_count', None):
 		return
 
-	link_count = frappe.cache().get_value('_link_count')
-	if not link_count:
-		link_count = {}
+	cache = frappe.cache()
+	key = get_link_count_key()
+	try:
+		pipe = cache.pipeline(transaction=False)
+		for (doctype, name), count in frappe.local.link_count.items():
+			pipe.hincrby(key, '{0}::{1}'.format(doctype, name), count)
+		pipe.execute()
+	except redis.exceptions.ConnectionError:
+		return
+
+	frappe.local.link_count = {}
+
+def get_pending_link_counts():
+	'''Returns counts that have not been applied yet as {(doctype, name): count}'''
+	try:
+		counts = frappe.cache().pipeline(transaction=False).hgetall(get_link_count_key()).execute()[0]
+	except redis.exceptions.ConnectionError:
+		return {}
 
-		for key, value in frappe.local.link_count.items():
-			if key in link_count:
-				link_count[key] += frappe.local.link_count[key]
-			else:
-				link_count[key] = frappe.local.link_count[key]
+	return parse_link_counts(counts)
 
-	frappe.cache().set_value('_link_count', link_count)
+def parse_link_counts(counts):
+	out = {}
+	for field, count in counts.items():
+		doctype, name = cstr(field).split('::', 1)
+		out[(doctype, name)] = cint(count)
+	return out
 
 def update_link_count():
 	'''increment link count in the `idx` column for the given document'''
-	link_count = frappe.cache().get_value('_link_count')
-
-	if link_count:
-		for key, count in iteritems(link_count):
-			if key[0] not in ignore_doctypes:
-				try:
-					frappe.db.sql('update `tab{0}` set idx = idx + {1} where name=%s'.format(key[0], count),
-						key[1], auto_commit=1)
-				except Exception as e:
-					if not frappe.db.is_table_missing(e): # table not found, single
-						raise e
-	# reset the count
-	frappe.cache().delete_value('_link_count')
+	# read and reset the counts atomically, counts flushed later are applied next time
+	try:
+		pipe = frappe.cache().pipeline(transaction=True)
+		pipe.hgetall(get_link_count_key())
+		pipe.delete(get_link_count_key())
+		link_count = parse_link_counts(pipe.execute()[0])
+	except redis.exceptions.ConnectionError:
+		return
+
+	# counts left by older versions
+	legacy_link_count = frappe.cache().get_value('_link_count')
+	if legacy_link_count:
+		frappe.cache().delete_value('_link_count')
+		for key, count in legacy_link_count.items():
+			link_count[key] = link_count.get(key, 0) + count
+
+	counts_by_doctype = {}
+	for (doctype, name), count in link_count.items():
+		if doctype not in ignore_doctypes:
+			counts_by_doctype.setdefault(doctype, []).append((name, count))
+
+	for doctype, counts in counts_by_doctype.items():
+		try:
+			for i in range(0, len(counts), UPDATE_CHUNK_SIZE):
+				update_idx(doctype, counts[i:i + UPDATE_CHUNK_SIZE])
+		except Exception as e:
+			if not frappe.db.is_table_missing(e): # table not found, single
+				raise e
+		else:
+			frappe.db.commit()
+
+def update_idx(doctype, counts):
+	'''Add counts to `idx` of [(name, count)] with one query'''
+	frappe.db.sql('''update `tab{0}` set idx = idx + case name {1} else 0 end
+		where name in %s'''.format(doctype, ' '.join(['when %s then %s'] * len(counts))),
+		[v for row in counts for v in row] + [tuple(name for name, count in counts)])
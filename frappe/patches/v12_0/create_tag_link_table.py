@@ -0,0 +1,13 @@
+import frappe
+from frappe.desk.tags import update_tag_links
+
+def execute():
+	frappe.db.create_tag_link_table()
+
+	for doctype in frappe.db.sql_list("select name from `tabDocType` where issingle=0"):
+		if not frappe.db.table_exists(doctype) or not frappe.db.has_column(doctype, "_user_tags"):
+			continue
+
+		for name, tags in frappe.db.sql("""select name, _user_tags from `tab{0}`
+			where ifnull(_user_tags, '') not in ('', ',')""".format(doctype)):
+			update_tag_links(doctype, name, [t for t in tags.split(",") if t])
@@ -293,13 +293,13 @@ def has_controller_permissions(doc, ptype, user=None):
 	"""Returns controller permissions if defined. None if not defined"""
 	if not user: user = frappe.session.user
 
-	methods = frappe.get_hooks("has_permission").get(doc.doctype, [])
+	methods = frappe.get_hooks_registry().get_methods("has_permission", doc.doctype)
 
 	if not methods:
 		return None
 
 	for method in methods:
-		controller_permission = frappe.call(frappe.get_attr(method), doc=doc, ptype=ptype, user=user)
+		controller_permission = frappe.call(method, doc=doc, ptype=ptype, user=user)
 		if controller_permission is not None:
 			return controller_permission
 
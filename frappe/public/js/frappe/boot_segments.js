@@ -0,0 +1,83 @@
+// Copyright (c) 2026, libracore and Contributors
+// MIT License. See license.txt
+
+// segments of bootinfo that are not sent with the desk (see `frappe.boot.boot_segments`).
+// they are kept in localStorage with their version and only fetched when it changed
+
+frappe.provide("frappe.boot_segments");
+
+$.extend(frappe.boot_segments, {
+	// called with the data of a segment when it is added to frappe.boot
+	handlers: {
+		print: function(data) {
+			if(data.print_css) {
+				frappe.dom.set_style(data.print_css, "print-style");
+			}
+		}
+	},
+
+	loaded: {},
+
+	load: function() {
+		// add stored lazy segments that are still current, fetch the others
+		var versions = frappe.boot.boot_segments || {};
+		var changed = {};
+
+		$.each(frappe.boot.lazy_boot_segments || [], function(i, name) {
+			var version = versions[name];
+			if(frappe.boot_segments.loaded[name]) return;
+
+			var stored = frappe.boot_segments.get_stored(name);
+			if(stored && stored.version === version) {
+				frappe.boot_segments.add(name, stored.data);
+			} else {
+				changed[name] = stored ? stored.version : null;
+			}
+		});
+
+		if($.isEmptyObject(changed)) {
+			return Promise.resolve();
+		}
+
+		return frappe.xcall("frappe.boot.get_changed_boot_segments", {versions: changed})
+			.then(function(segments) {
+				$.each(segments, function(name, segment) {
+					frappe.boot_segments.store(name, segment);
+					frappe.boot_segments.add(name, segment.data);
+				});
+			});
+	},
+
+	add: function(name, data) {
+		$.each(data, function(key, value) {
+			if(key === "docs") {
+				frappe.model.sync(value);
+			} else {
+				frappe.boot[key] = value;
+			}
+		});
+		frappe.boot_segments.loaded[name] = true;
+
+		if(frappe.boot_segments.handlers[name]) {
+			frappe.boot_segments.handlers[name](data);
+		}
+	},
+
+	get_stored: function(name) {
+		var stored = localStorage.getItem(frappe.boot_segments.get_key(name));
+		return stored ? JSON.parse(stored) : null;
+	},
+
+	store: function(name, segment) {
+		try {
+			localStorage.setItem(frappe.boot_segments.get_key(name), JSON.stringify(segment));
+		} catch(e) {
+			// localStorage is full, the segment is fetched again next time
+		}
+	},
+
+	get_key: function(name) {
+		// segments are per user
+		return "_boot_segment:" + frappe.boot.user.name + ":" + name;
+	}
+});
@@ -242,9 +242,7 @@ frappe.Application = Class.extend({
 			if(frappe.boot.timezone_info) {
 				moment.tz.add(frappe.boot.timezone_info);
 			}
-			if(frappe.boot.print_css) {
-				frappe.dom.set_style(frappe.boot.print_css, "print-style");
-			}
+			frappe.boot_segments.load();
 			frappe.user.name = frappe.boot.user.name;
 		} else {
 			this.set_as_guest();
@@ -7,7 +7,7 @@ frappe.ui.form.Review = class Review {
 	constructor({parent, frm}) {
 		this.parent = parent;
 		this.frm = frm;
-		this.points = frappe.boot.points;
+		this.points = frappe.boot.points || {};
 		this.make_review_container();
 		this.add_review_button();
 		this.update_reviewers();
@@ -554,8 +554,24 @@ $.extend(frappe.model, {
 		d.set_primary_action(__("Rename"), function() {
 			var args = d.get_values();
 			if(!args) return;
+
+			// references are updated in a background job, which publishes its progress
+			// and `rename_doc` once it is done
+			var on_rename = function(data) {
+				if(data.doctype !== doctype || data.old !== docname) return;
+				frappe.realtime.off("rename_doc", on_rename);
+				if(data.failed) return;
+
+				$(document).trigger('rename', [doctype, docname, data["new"]]);
+				if(locals[doctype] && locals[doctype][docname])
+					delete locals[doctype][docname];
+				if(callback)
+					callback(data["new"]);
+			};
+			frappe.realtime.on("rename_doc", on_rename);
+
 			return frappe.call({
-				method:"frappe.model.rename_doc.rename_doc",
+				method:"frappe.model.rename_doc.enqueue_rename_doc",
 				args: {
 					doctype: doctype,
 					old: docname,
@@ -565,14 +581,12 @@ $.extend(frappe.model, {
 				btn: d.get_primary_btn(),
 				callback: function(r,rt) {
 					if(!r.exc) {
-						$(document).trigger('rename', [doctype, docname,
-							r.message || args.new_name]);
-						if(locals[doctype] && locals[doctype][docname])
-							delete locals[doctype][docname];
 						d.hide();
-						if(callback)
-							callback(r.message);
+						frappe.show_alert(__("Renaming {0} to {1}", [__(docname), args.new_name]));
 					}
+				},
+				error: function() {
+					frappe.realtime.off("rename_doc", on_rename);
 				}
 			});
 		});
@@ -83,7 +83,7 @@ frappe.search.utils = {
 
 	get_frequent_links() {
 		let options = [];
-		frappe.boot.frequently_visited_links.forEach(link => {
+		(frappe.boot.frequently_visited_links || []).forEach(link => {
 			const label = frappe.utils.get_route_label(link.route);
 			options.push({
 				'route': link.route,
@@ -449,14 +449,17 @@ frappe.views.QueryReport = class QueryReport extends frappe.views.BaseList {
 
 	render_datatable() {
 		let data = this.data;
+		// the total row is the last row of the last page of a paged prepared report
+		const show_total_row = this.raw_data.add_total_row && this.all_rows_loaded();
 
-		if (this.raw_data.add_total_row) {
+		if (show_total_row) {
 			data = data.slice();
 			data.splice(-1, 1);
 		}
 
 		if (this.datatable) {
 			this.datatable.options.treeView = this.tree_report;
+			this.datatable.options.showTotalRow = show_total_row;
 			this.datatable.refresh(data, this.columns);
 		} else {
 			let datatable_options = {
@@ -466,7 +469,7 @@ frappe.views.QueryReport = class QueryReport extends frappe.views.BaseList {
 				treeView: this.tree_report,
 				layout: 'fixed',
 				cellHeight: 33,
-				showTotalRow: this.raw_data.add_total_row,
+				showTotalRow: show_total_row,
 				direction: frappe.utils.is_rtl() ? 'rtl' : 'ltr',
 				hooks: {
 					columnTotal: frappe.utils.report_column_total
@@ -487,6 +490,31 @@ frappe.views.QueryReport = class QueryReport extends frappe.views.BaseList {
 		}
 	}
 
+	all_rows_loaded() {
+		// `next_start` and `total_count` count stored rows, before permission filtering
+		return !this.raw_data.paged || this.raw_data.next_start >= this.raw_data.total_count;
+	}
+
+	load_more_rows() {
+		// prepared reports are sent one page at a time
+		return frappe.call({
+			method: 'frappe.core.doctype.prepared_report.prepared_report.get_result_page',
+			args: {
+				dn: this.raw_data.doc.name,
+				start: this.raw_data.next_start,
+				page_length: this.raw_data.page_length
+			},
+			freeze: true
+		}).then(r => {
+			this.raw_data.next_start = r.message.next_start;
+			this.raw_data.total_count = r.message.total_count;
+			this.raw_data.result = this.raw_data.result.concat(r.message.result);
+			this.data = this.data.concat(this.prepare_data(r.message.result));
+			this.render_datatable();
+			this.show_footer_message();
+		});
+	}
+
 	get_chart_options(data) {
 		let options = this.report_settings.get_chart_data
 			? this.report_settings.get_chart_data(data.columns, data.result)
@@ -1281,6 +1309,11 @@ frappe.views.QueryReport = class QueryReport extends frappe.views.BaseList {
 			<span class="text-left col-md-6">${message}</span><span class="text-right col-md-6">${execution_time_msg}</span>
 		`);
 
+		if (this.data && this.data.length && !this.all_rows_loaded()) {
+			this.page.footer.find('.text-left').append(`<button class="btn btn-xs btn-default" data-action="load_more_rows">
+				${__('Load More ({0} of {1} rows)', [this.raw_data.next_start, this.raw_data.total_count])}</button>`);
+		}
+
 		this.page.wrapper.find('.tree-footer').remove();
 		if (this.tree_report) {
 			this.$tree_footer = this.page.footer.clone().addClass('tree-footer');
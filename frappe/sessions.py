@@ -8,7 +8,7 @@ Boot session from cache or build
 Session bootstraps info needed by common client side activities including
 permission, homepage, default variables, system defaults etc
 """
-import frappe, json
+import frappe, json, time
 from frappe import _
 import frappe.utils
 from frappe.utils import cint, cstr
@@ -21,6 +21,11 @@ from six.moves.urllib.parse import unquote
 from six import text_type
 from frappe.cache_manager import clear_user_cache
 
+DEVICES = ("desktop", "mobile")
+
+# sessions per batched update of `tabSessions`
+SESSION_FLUSH_CHUNK_SIZE = 500
+
 @frappe.whitelist()
 def clear(user=None):
 	frappe.local.session_obj.update(force=True)
@@ -79,7 +84,8 @@ def delete_session(sid=None, user=None, reason="Session Expired"):
 	from frappe.core.doctype.activity_log.feed import logout_feed
 
 	frappe.cache().hdel("session", sid)
-	frappe.cache().hdel("last_db_session_update", sid)
+	for device in DEVICES:
+		frappe.cache().zrem(get_session_index_key(device), sid)
 	if sid and not user:
 		user_details = frappe.db.sql("""select user from tabSessions where sid=%s""", sid, as_dict=True)
 		if user_details: user = user_details[0].get("user")
@@ -96,26 +102,95 @@ def clear_all_sessions(reason=None):
 		delete_session(sid, reason=reason)
 
 def get_expired_sessions():
-	'''Returns list of expired sessions'''
+	'''Returns list of expired sessions, from the index of last updates in redis'''
+	if not frappe.cache().get_value("sessions_indexed"):
+		# redis was flushed, or sessions were not indexed yet
+		index_sessions_from_db()
+
 	expired = []
-	for device in ("desktop", "mobile"):
-		expired += frappe.db.sql_list("""SELECT `sid`
-				FROM `tabSessions`
-				WHERE (NOW() - `lastupdate`) > %s
-				AND device = %s""", (get_expiry_period_for_query(device), device))
+	now = time.time()
+	for device in DEVICES:
+		expired += [frappe.safe_decode(sid) for sid in frappe.cache().zrangebyscore(
+			get_session_index_key(device), "-inf", now - get_expiry_in_seconds(device=device))]
 
 	return expired
 
 def clear_expired_sessions():
 	"""This function is meant to be called from scheduler"""
+	flush_sessions()
 	for sid in get_expired_sessions():
 		delete_session(sid, reason="Session Expired")
 
+def get_session_index_key(device):
+	"""Returns the name of the sorted set of sids of `device` by last update time"""
+	return "session_last_updated:" + (device or "desktop")
+
+def index_sessions_from_db():
+	"""Add the sessions in `tabSessions` to the index of last updates"""
+	now, now_datetime = time.time(), frappe.utils.now_datetime()
+	for sid, device, lastupdate in frappe.db.sql("""select `sid`, `device`, `lastupdate`
+		from `tabSessions` where `sid` is not null"""):
+		age = frappe.utils.time_diff_in_seconds(now_datetime, lastupdate) if lastupdate else 0
+		frappe.cache().zadd(get_session_index_key(device), sid, now - age)
+
+	frappe.cache().set_value("sessions_indexed", 1)
+
+def flush_sessions():
+	"""Write sessions updated in redis since the last flush to `tabSessions`.
+	This function is meant to be called from scheduler"""
+	now = time.time()
+	since = frappe.cache().get_value("sessions_last_flushed") or 0
+
+	sids = []
+	for device in DEVICES:
+		sids += [frappe.safe_decode(sid) for sid in
+			frappe.cache().zrangebyscore(get_session_index_key(device), since, now)]
+
+	for i in range(0, len(sids), SESSION_FLUSH_CHUNK_SIZE):
+		save_sessions_to_db(sids[i:i + SESSION_FLUSH_CHUNK_SIZE])
+		frappe.db.commit()
+
+	frappe.cache().set_value("sessions_last_flushed", now)
+
+def save_sessions_to_db(sids):
+	"""Update `sessiondata` of `sids` in `tabSessions` and `last_active` of their users
+	from the sessions in redis, with one query each"""
+	sessions = frappe.cache().hget_many("session", sids)
+	sessions = [(sid, session) for sid, session in sessions.items() if session]
+	if not sessions:
+		return
+
+	values = []
+	for sid, session in sessions:
+		values += [sid, str(session['data'])]
+
+	frappe.db.sql("""update `tabSessions` set lastupdate=NOW(),
+		sessiondata = case sid {0} end where sid in ({1})""".format(
+			" ".join(["when %s then %s"] * len(sessions)), ", ".join(["%s"] * len(sessions))),
+		values + [sid for sid, session in sessions])
+
+	last_active = {}
+	for sid, session in sessions:
+		user, last_updated = session['user'], session['data'].get('last_updated')
+		if last_updated and last_updated > last_active.get(user, ""):
+			last_active[user] = last_updated
+
+	if not last_active:
+		return
+
+	values = []
+	for user, last_updated in last_active.items():
+		values += [user, last_updated]
+
+	frappe.db.sql("""update `tabUser` set last_active = case name {0} end
+		where name in ({1})""".format(" ".join(["when %s then %s"] * len(last_active)),
+			", ".join(["%s"] * len(last_active))), values + list(last_active))
+
 def get():
 	"""get session boot info"""
 	from frappe.desk.notifications import \
 		get_notification_info_for_boot, get_notifications
-	from frappe.boot import get_bootinfo, get_unseen_notes
+	from frappe.boot import get_bootinfo, get_unseen_notes, load_boot_segments
 
 	bootinfo = None
 	if not getattr(frappe.conf,'disable_session_cache', None):
@@ -145,14 +220,17 @@ def get():
 		if frappe.local.request:
 			bootinfo["change_log"] = get_change_log()
 
+	# segments are cached separately, so that they are rebuilt only when they change
+	load_boot_segments(bootinfo)
+
 	bootinfo["metadata_version"] = frappe.cache().get_value("metadata_version")
 	if not bootinfo["metadata_version"]:
 		bootinfo["metadata_version"] = frappe.reset_metadata_version()
 
 	bootinfo.notes = get_unseen_notes()
 
-	for hook in frappe.get_hooks("extend_bootinfo"):
-		frappe.get_attr(hook)(bootinfo=bootinfo)
+	for hook in frappe.get_hooks_registry().get_methods("extend_bootinfo"):
+		hook(bootinfo=bootinfo)
 
 	bootinfo["lang"] = frappe.translate.get_user_lang()
 	bootinfo["disable_async"] = frappe.conf.disable_async
@@ -250,6 +328,7 @@ class Session:
 
 		# also add to memcache
 		frappe.cache().hset("session", self.data.sid, self.data)
+		frappe.cache().zadd(get_session_index_key(self.device), self.data.sid, time.time())
 
 	def resume(self):
 		"""non-login request: load a session"""
@@ -338,7 +417,8 @@ class Session:
 		self.start()
 
 	def update(self, force=False):
-		"""extend session expiry"""
+		"""extend session expiry. The session is kept in redis and written to the
+		database by `flush_sessions`, or right away if `force` is set"""
 		if (frappe.session['user'] == "Guest" or frappe.form_dict.cmd=="logout"):
 			return
 
@@ -347,32 +427,17 @@ class Session:
 		self.data['data']['last_updated'] = now
 		self.data['data']['lang'] = text_type(frappe.lang)
 
-		# update session in db
-		last_updated = frappe.cache().hget("last_db_session_update", self.sid)
-		time_diff = frappe.utils.time_diff_in_seconds(now, last_updated) if last_updated else None
+		# set in memcache
+		frappe.cache().hset("session", self.sid, self.data)
+		frappe.cache().zadd(get_session_index_key(self.device), self.sid, time.time())
 
-		# database persistence is secondary, don't update it too often
+		# database persistence is secondary, sessions are flushed in batches
 		updated_in_db = False
-		if force or (time_diff==None) or (time_diff > 600):
-			# update sessions table
-			frappe.db.sql("""update `tabSessions` set sessiondata=%s,
-				lastupdate=NOW() where sid=%s""" , (str(self.data['data']),
-				self.data['sid']))
-
-			# update last active in user table
-			frappe.db.sql("""update `tabUser` set last_active=%(now)s where name=%(name)s""", {
-				"now": now,
-				"name": frappe.session.user
-			})
-
+		if force:
+			save_sessions_to_db([self.sid])
 			frappe.db.commit()
-			frappe.cache().hset("last_db_session_update", self.sid, now)
-
 			updated_in_db = True
 
-		# set in memcache
-		frappe.cache().hset("session", self.sid, self.data)
-
 		return updated_in_db
 
 def get_expiry_period_for_query(device=None):
@@ -22,12 +22,16 @@ class EnergyPointLog(Document):
 				['reference_type', 'reference_name'])
 
 	def after_insert(self):
+		from frappe.boot import clear_boot_segment_cache
+
 		alert_dict = get_alert_dict(self)
 		if alert_dict:
 			frappe.publish_realtime('energy_point_alert', message=alert_dict, user=self.user)
 			send_review_mail(self, alert_dict)
 
 		frappe.cache().hdel('energy_points', self.user)
+		for user in {self.user, self.owner}:
+			clear_boot_segment_cache('energy_points', user)
 		frappe.publish_realtime('update_points', after_commit=True)
 
 		if self.type != 'Review':
@@ -0,0 +1,18 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Benchmarks for hot paths, run against a site with
+
+	bench --site [site] execute frappe.tests.benchmarks.[module].run
+"""
+
+from __future__ import unicode_literals, print_function
+
+import time
+
+def timed(label, fn, *args, **kwargs):
+	"""Run `fn` and print the time it took"""
+	start = time.time()
+	out = fn(*args, **kwargs)
+	print("{0:<40} {1:>10.3f}s".format(label, time.time() - start))
+	return out
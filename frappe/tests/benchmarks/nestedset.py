@@ -0,0 +1,65 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Benchmark for nested set operations on a large tree
+
+	bench --site [site] execute frappe.tests.benchmarks.nestedset.run --kwargs "{'nodes': 200000}"
+
+Adds `nodes` rows to a tree doctype (File by default, or e.g. Account or Territory with
+`'doctype': 'Territory'`) under its first root, rebuilds lft/rgt, moves a subtree and
+reads ancestors with and without the cache. The rows are deleted again at the end."""
+
+from __future__ import unicode_literals, print_function
+
+import random
+
+import frappe
+from frappe.utils import now
+from frappe.utils.nestedset import (rebuild_tree, update_move_node, get_ancestors_of,
+	_get_ancestors_of, clear_tree_cache)
+from frappe.tests.benchmarks import timed
+
+def run(nodes=200000, doctype="File", children_per_node=10):
+	parent_field = frappe.get_meta(doctype).nsm_parent_field or "parent_" + frappe.scrub(doctype)
+	root = frappe.db.sql_list("""select name from `tab{0}`
+		where ifnull(`{1}`, '')='' order by lft limit 1""".format(doctype, parent_field))[0]
+
+	names = timed("insert {0} nodes".format(nodes), make_nodes, doctype, parent_field, root,
+		int(nodes), int(children_per_node))
+
+	try:
+		timed("rebuild_tree", rebuild_tree, doctype, parent_field)
+		timed("rebuild_tree (unchanged)", rebuild_tree, doctype, parent_field)
+
+		doc = frappe.get_doc(doctype, names[1])
+		doc.set(parent_field, names[2])
+		timed("move subtree", update_move_node, doc, parent_field)
+
+		sample = random.sample(names, min(1000, len(names)))
+		timed("ancestors of 1000 nodes (query)", lambda: [_get_ancestors_of(doctype, n) for n in sample])
+		clear_tree_cache(doctype)
+		timed("ancestors of 1000 nodes (cold cache)", lambda: [get_ancestors_of(doctype, n) for n in sample])
+		frappe.local.cache.clear()
+		timed("ancestors of 1000 nodes (redis cache)", lambda: [get_ancestors_of(doctype, n) for n in sample])
+		timed("ancestors of 1000 nodes (local cache)", lambda: [get_ancestors_of(doctype, n) for n in sample])
+	finally:
+		frappe.db.rollback()
+		frappe.db.sql("delete from `tab{0}` where name in %s".format(doctype), (tuple(names),))
+		rebuild_tree(doctype, parent_field)
+		frappe.db.commit()
+
+def make_nodes(doctype, parent_field, root, count, children_per_node):
+	"""Insert a tree with `children_per_node` children under every node, without lft/rgt"""
+	names = ["_Bench Node {0}".format(i) for i in range(count)]
+	n, user = now(), frappe.session.user
+
+	values = []
+	for i, name in enumerate(names):
+		parent = names[(i - 1) // children_per_node] if i else root
+		values.append((name, parent, parent, 1, n, n, user, user))
+
+	frappe.db.bulk_insert(doctype, ["name", parent_field, "old_parent", "is_group" if doctype != "File" else "is_folder",
+		"creation", "modified", "owner", "modified_by"], values, chunk_size=1000)
+	frappe.db.commit()
+
+	return names
@@ -0,0 +1,44 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Benchmark for the post processing of script report results
+
+	bench --site [site] execute frappe.tests.benchmarks.query_report.run --kwargs "{'rows': 500000, 'user': 'test@example.com'}"
+
+Pass a `user` with User Permissions on Role or User to measure permission filtering."""
+
+from __future__ import unicode_literals, print_function
+
+import random
+
+import frappe
+from frappe.desk.query_report import add_total_row, get_filtered_data
+from frappe.tests.benchmarks import timed
+
+columns = [
+	{"fieldname": "name", "label": "Name", "fieldtype": "Data"},
+	{"fieldname": "owner", "label": "Owner", "fieldtype": "Link", "options": "User"},
+	{"fieldname": "role", "label": "Role", "fieldtype": "Link", "options": "Role"},
+	{"fieldname": "qty", "label": "Qty", "fieldtype": "Float"},
+	{"fieldname": "amount", "label": "Amount", "fieldtype": "Currency"},
+	{"fieldname": "progress", "label": "Progress", "fieldtype": "Percent"}
+]
+
+def run(rows=500000, user=None, as_dict=False):
+	users = frappe.db.sql_list("select name from tabUser")
+	roles = frappe.db.sql_list("select name from tabRole")
+	data = timed("build {0} rows".format(rows), make_rows, int(rows), users, roles, as_dict)
+
+	user = user or frappe.session.user
+	filtered = timed("get_filtered_data ({0})".format(user), get_filtered_data, "ToDo", columns, data, user)
+	print("{0} of {1} rows permitted".format(len(filtered), len(data)))
+
+	timed("add_total_row", add_total_row, filtered, columns)
+
+def make_rows(count, users, roles, as_dict=False):
+	data = []
+	for i in range(count):
+		row = ["ROW-{0}".format(i), random.choice(users), random.choice(roles),
+			random.randint(1, 100), random.random() * 1000, random.randint(0, 100)]
+		data.append(dict(zip([c["fieldname"] for c in columns], row)) if as_dict else row)
+	return data
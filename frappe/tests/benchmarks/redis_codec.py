@@ -0,0 +1,46 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Benchmark for the serialization of large redis cache values
+
+	bench --site [site] execute frappe.tests.benchmarks.redis_codec.run --kwargs "{'lang': 'de'}"
+
+Prints the size of the biggest core cache values with every available codec and the
+time to encode and decode them `repeat` times."""
+
+from __future__ import unicode_literals, print_function
+
+import frappe
+from frappe.utils import redis_codec
+from frappe.tests.benchmarks import timed
+
+def run(lang="de", repeat=100):
+	values = get_values(lang)
+
+	for codec, codec_id in sorted(redis_codec.codec_ids.items(), key=lambda c: c[1]):
+		frappe.local.conf.redis_cache_compression = codec
+		print("codec: {0}".format(codec))
+
+		for key, value in values:
+			data = redis_codec.dumps(value)
+			print("{0:<40} {1:>10} bytes".format(key, len(data)))
+			timed("  dumps x {0}".format(repeat), lambda: [redis_codec.dumps(value) for i in range(repeat)])
+			timed("  loads x {0}".format(repeat), lambda: [redis_codec.loads(data) for i in range(repeat)])
+
+	frappe.local.conf.pop("redis_cache_compression", None)
+
+def get_values(lang):
+	from frappe.boot import get_bootinfo
+	from frappe.desk.form.meta import get_meta
+	from frappe.translate import load_lang
+	from frappe.website.render import render_page
+
+	frappe.local.lang = "en"
+	return [
+		("meta::DocType", frappe.get_meta("DocType").as_dict()),
+		("form_meta::User", get_meta("User", cached=False).as_dict()),
+		("bootinfo", get_bootinfo()),
+		("app_hooks", frappe.get_hooks()),
+		("lang_full_dict::{0}".format(lang), load_lang(lang)),
+		("website_page::login", render_page("login"))
+	]
@@ -0,0 +1,69 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Benchmark for the cold start of the cli and of a web worker
+
+	bench --site [site] execute frappe.tests.benchmarks.startup.run
+
+Times `bench frappe --help` and the first request (`/api/method/ping`) served by a new
+process, both including the start of the interpreter and all imports, and lists the
+`LAZY_MODULES` that are loaded at startup anyway. Use
+`bench --site [site] show-import-times` to find the imports that are slow."""
+
+from __future__ import unicode_literals, print_function
+
+import os
+import subprocess # nosec
+import sys
+import time
+
+import frappe
+
+# modules imported on first use, that importing the web app or the cli commands must not
+# load, asserted in CI by frappe.tests.test_startup
+LAZY_MODULES = {
+	"frappe.app": ("frappe.api", "frappe.handler", "frappe.auth", "frappe.website.render",
+		"frappe.recorder", "frappe.utils.response", "frappe.utils.error", "frappe.middlewares"),
+	"frappe.commands": ("frappe.installer", "frappe.utils.response", "coverage")
+}
+
+FIRST_REQUEST_SCRIPT = """
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from frappe.app import application
+
+response = Client(application, Response).get("/api/method/ping",
+	headers={"X-Frappe-Site-Name": %r})
+assert response.status_code == 200, response.status_code
+"""
+
+def run(repeat=3):
+	for label, fn in (("bench frappe --help", get_cli_start_time),
+		("first request", get_first_request_time)):
+		times = [fn() for i in range(repeat)]
+		print("{0:<40} {1:>10.3f}s (best of {2})".format(label, min(times), repeat))
+
+	for module in LAZY_MODULES:
+		print("{0:<40} {1}".format("loaded by " + module, ", ".join(get_loaded_lazy_modules(module)) or "-"))
+
+def get_cli_start_time():
+	"""Returns the seconds taken by `bench frappe --help` in a new process"""
+	return run_timed([sys.executable, "-m", "frappe.utils.bench_helper", "frappe", "--help"])
+
+def get_first_request_time():
+	"""Returns the seconds taken by a new process to import the web app and serve a request"""
+	return run_timed([sys.executable, "-c", FIRST_REQUEST_SCRIPT % frappe.local.site])
+
+def get_loaded_lazy_modules(module):
+	"""Returns the `LAZY_MODULES` of `module` that are loaded when it is imported by a new process"""
+	script = "import sys, {0}; print('\\n'.join(sys.modules))".format(module)
+	output = subprocess.check_output([sys.executable, "-c", script], # nosec
+		cwd=os.path.abspath(frappe.local.sites_path))
+	loaded = set(frappe.safe_decode(output).split())
+	return [m for m in LAZY_MODULES[module] if m in loaded]
+
+def run_timed(command):
+	with open(os.devnull, "w") as devnull:
+		start = time.time()
+		subprocess.check_call(command, cwd=os.path.abspath(frappe.local.sites_path), stdout=devnull)
+		return time.time() - start
@@ -0,0 +1,32 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import frappe, unittest
+from frappe.boot import boot_segments, get_changed_boot_segments, clear_boot_segment_cache
+
+
+class TestBoot(unittest.TestCase):
+	def test_boot_segments(self):
+		frappe.set_user("Administrator")
+		bootinfo = frappe.sessions.get()
+
+		self.assertEqual(set(bootinfo.boot_segments), set(boot_segments))
+		self.assertTrue(bootinfo.allowed_modules)
+		self.assertTrue(bootinfo.lang_dict)
+
+		# lazy segments are not sent with the desk
+		self.assertIn("print", bootinfo.lazy_boot_segments)
+		self.assertFalse(bootinfo.get("print_css"))
+
+		# only segments whose version changed are returned
+		versions = dict(bootinfo.boot_segments)
+		versions["print"] = "old"
+		changed = get_changed_boot_segments(versions)
+		self.assertEqual(list(changed), ["print"])
+		self.assertEqual(changed["print"].version, bootinfo.boot_segments["print"])
+		self.assertTrue(changed["print"].data.print_css)
+
+		# versions do not change when a segment is rebuilt with the same data
+		clear_boot_segment_cache("desktop")
+		self.assertEqual(get_changed_boot_segments(versions), changed)
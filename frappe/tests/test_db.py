@@ -65,3 +65,18 @@ class TestDB(unittest.TestCase):
 		self.assertIn('tabCustom Field', frappe.flags.touched_tables)
 		frappe.flags.in_migrate = False
 		frappe.flags.touched_tables.clear()
+
+	def test_rollback_to_savepoint(self):
+		frappe.local.open_count_deltas = {"ToDo": 1}
+		frappe.local.search_index_writes = []
+
+		frappe.db.savepoint("_test_savepoint")
+		frappe.local.open_count_deltas["ToDo"] += 1
+		frappe.local.search_index_writes.append(("backend", "delete", ("ToDo", "_test")))
+
+		# changes queued after the savepoint are dropped with it
+		frappe.db.rollback(save_point="_test_savepoint")
+		self.assertEqual(frappe.local.open_count_deltas, {"ToDo": 1})
+		self.assertEqual(frappe.local.search_index_writes, [])
+
+		frappe.db.rollback()
@@ -332,6 +332,40 @@ class TestReportview(unittest.TestCase):
 		self.assertTrue({'name': 'Prepared Report'} in res)
 		self.assertFalse({'name': 'Property Setter'} in res)
 
+	def test_user_tags_filter(self):
+		from frappe.desk.tags import add_tag, remove_tag
+		from frappe.desk.reportview import get_user_tags_stats
+
+		tagged = create_event('_Test Tagged Event')
+		untagged = create_event('_Test Untagged Event')
+		add_tag('_Test Tag', 'Event', tagged.name)
+		add_tag('_Test Other Tag', 'Event', tagged.name)
+
+		condition = DatabaseQuery('Event').get_user_tags_condition(
+			frappe._dict(doctype='Event', fieldname='_user_tags', operator='like', value='%_Test Tag%'), '`tabEvent`')
+		self.assertTrue('__tag_link' in condition)
+
+		names = [d.name for d in frappe.get_all('Event', filters={'_user_tags': ('like', '%_Test Tag%')})]
+		self.assertTrue(tagged.name in names)
+		self.assertFalse(untagged.name in names)
+
+		names = [d.name for d in frappe.get_all('Event', filters={'_user_tags': ('not like', '%,%')})]
+		self.assertTrue(untagged.name in names)
+		self.assertFalse(tagged.name in names)
+
+		stats = dict(get_user_tags_stats('Event', [['Event', 'name', 'in', [tagged.name, untagged.name]]]))
+		self.assertEqual(stats['_Test Tag'], 1)
+		self.assertEqual(stats['_Test Other Tag'], 1)
+
+		remove_tag('_Test Tag', 'Event', tagged.name)
+		names = [d.name for d in frappe.get_all('Event', filters={'_user_tags': ('=', '_Test Tag')})]
+		self.assertFalse(tagged.name in names)
+
+		frappe.delete_doc('Event', tagged.name)
+		frappe.delete_doc('Event', untagged.name)
+		self.assertFalse(frappe.db.sql("""select 1 from `__tag_link`
+			where `document_type`='Event' and `document_name`=%s""", tagged.name))
+
 
 def create_event(subject="_Test Event", starts_on=None):
 	""" create a test event """
@@ -190,7 +190,7 @@ class TestDocument(unittest.TestCase):
 			# of parallelism
 			return
 
-		from frappe.model.utils.link_count import update_link_count
+		from frappe.model.utils.link_count import update_link_count, get_pending_link_counts
 
 		update_link_count()
 
@@ -201,13 +201,11 @@ class TestDocument(unittest.TestCase):
 
 		d.save()
 
-		link_count = frappe.cache().get_value('_link_count') or {}
-		old_count = link_count.get((doctype, name)) or 0
+		old_count = get_pending_link_counts().get((doctype, name)) or 0
 
 		frappe.db.commit()
 
-		link_count = frappe.cache().get_value('_link_count') or {}
-		new_count = link_count.get((doctype, name)) or 0
+		new_count = get_pending_link_counts().get((doctype, name)) or 0
 
 		self.assertEqual(old_count + 1, new_count)
 
@@ -219,6 +217,63 @@ class TestDocument(unittest.TestCase):
 
 		self.assertEqual(before_update + new_count, after_update)
 
+	def test_bulk_delete(self):
+		from frappe.model.delete_doc import delete_docs_in_bulk, get_linked_names
+
+		roles = []
+		for i in range(3):
+			role = '_Test Bulk Delete Role {0}'.format(i)
+			if not frappe.db.exists('Role', role):
+				frappe.get_doc(dict(doctype='Role', role_name=role)).insert()
+			roles.append(role)
+
+		user = frappe.get_doc('User', 'test@example.com')
+		user.add_roles(roles[0])
+
+		self.assertEqual(list(get_linked_names('Role', roles)), [roles[0]])
+
+		failed = delete_docs_in_bulk('Role', roles, chunk_size=2)
+		self.assertEqual(list(failed), [roles[0]])
+
+		self.assertTrue(frappe.db.exists('Role', roles[0]))
+		for role in roles[1:]:
+			self.assertFalse(frappe.db.exists('Role', role))
+			self.assertTrue(frappe.db.exists('Deleted Document', dict(deleted_doctype='Role', deleted_name=role)))
+
+		user.remove_roles(roles[0])
+		self.assertEqual(delete_docs_in_bulk('Role', [roles[0]]), {})
+		self.assertFalse(frappe.db.exists('Role', roles[0]))
+
+	def test_rename_in_chunks(self):
+		from frappe.model.rename_doc import run_reference_updates
+
+		old, new = '_Test Rename Role', '_Test Rename Role New'
+		for role in (old, new):
+			frappe.delete_doc('Role', role, force=True, ignore_missing=True)
+
+		frappe.get_doc(dict(doctype='Role', role_name=old)).insert()
+		todos = [frappe.get_doc(dict(doctype='ToDo', description='_Test Rename {0}'.format(i),
+			role=old, reference_type='Role', reference_name=old)).insert().name for i in range(5)]
+
+		frappe.rename_doc('Role', old, new)
+		for todo in todos:
+			self.assertEqual(frappe.db.get_value('ToDo', todo, ['role', 'reference_name']), (new, new))
+
+		# chunks smaller than the number of rows
+		run_reference_updates([frappe._dict(parent='ToDo', fieldname='role')], new, old, chunk_size=2)
+		self.assertEqual(frappe.db.count('ToDo', dict(name=('in', todos), role=old)), 5)
+
+		# a rename whose references were not all updated is resumed by renaming again
+		from frappe.model.rename_doc import set_rename_in_progress, is_rename_in_progress
+		set_rename_in_progress('Role', old, new)
+		self.assertEqual(frappe.rename_doc('Role', old, new, commit_in_chunks=True), new)
+		self.assertEqual(frappe.db.count('ToDo', dict(name=('in', todos), role=new)), 5)
+		self.assertFalse(is_rename_in_progress('Role', old, new))
+
+		for todo in todos:
+			frappe.delete_doc('ToDo', todo)
+		frappe.delete_doc('Role', new)
+
 	def test_naming_series(self):
 		data = ["TEST-", "TEST/17-18/.test_data./.####", "TEST.YYYY.MM.####"]
 
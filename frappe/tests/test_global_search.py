@@ -191,3 +191,59 @@ class TestGlobalSearch(unittest.TestCase):
 		frappe.db.commit()
 		results = global_search.web_search('unsubscribe')
 		self.assertTrue('Unsubscribe' in results[0].content)
+
+	def test_sync_keeps_latest_queued_value(self):
+		frappe.cache().delete_value('global_search_queue')
+		for content in ('first version', 'second version', 'latest version'):
+			global_search.sync_value_in_queue(dict(doctype='Event', name='_Test Queue Event',
+				content=content, published=0, title='_Test Queue Event', route=''))
+
+		self.assertEqual(global_search.sync_global_search(), 3)
+		self.assertEqual(frappe.cache().llen('global_search_queue'), 0)
+
+		content = frappe.db.sql_list('''select content from `__global_search`
+			where doctype='Event' and name='_Test Queue Event' ''')
+		self.assertEqual(content, ['latest version'])
+
+	def test_sqlite_backend(self):
+		from frappe.utils.search_backends import SQLiteSearchBackend
+
+		backend = SQLiteSearchBackend()
+		backend.clear()
+		backend.index([
+			dict(doctype='Event', name='_Test FTS 1', content='Subject : Extraterrestrial colonization',
+				published=0, title='Extraterrestrial', route=''),
+			dict(doctype='Event', name='_Test FTS 2', content='Subject : Café meeting about colonies',
+				published=0, title='Meeting', route='')
+		])
+
+		# written when the transaction is committed
+		self.assertEqual(backend.search('extraterr'), [])
+		frappe.db.commit()
+
+		results = backend.search('extraterr')
+		self.assertEqual([r.name for r in results], ['_Test FTS 1'])
+
+		# prefix match on the last word, diacritics are ignored
+		results = backend.search('cafe colon')
+		self.assertEqual([r.name for r in results], ['_Test FTS 2'])
+
+		results = backend.search('colon', allowed_doctypes=['ToDo'])
+		self.assertEqual(results, [])
+
+		backend.index([dict(doctype='Event', name='_Test FTS 1', content='Subject : Updated',
+			published=0, title='Updated', route='')])
+		frappe.db.commit()
+		self.assertEqual(backend.search('extraterrestrial'), [])
+
+		backend.delete('Event', '_Test FTS 2')
+		frappe.db.commit()
+		self.assertEqual(backend.search('cafe'), [])
+
+		# changes of a rolled back transaction are not written
+		backend.delete('Event', '_Test FTS 1')
+		frappe.db.rollback()
+		self.assertEqual([r.name for r in backend.search('updated')], ['_Test FTS 1'])
+
+		backend.clear()
+		frappe.db.commit()
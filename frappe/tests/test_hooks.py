@@ -14,3 +14,18 @@ class TestHooks(unittest.TestCase):
 		self.assertTrue(isinstance(hooks.get("doc_events").get("*"), dict))
 		self.assertTrue("frappe.desk.notifications.clear_doctype_notifications" in
 			hooks.get("doc_events").get("*").get("on_update"))
+
+	def test_hooks_registry(self):
+		from frappe.desk.notifications import clear_doctype_notifications
+
+		registry = frappe.get_hooks_registry()
+		self.assertIn(clear_doctype_notifications, registry.get_doc_event_handlers("ToDo", "on_update"))
+		self.assertEqual(registry.get_methods("has_permission", "_Test No Hooks"), [])
+		self.assertIs(frappe.get_hooks_registry(), registry)
+
+		# get_hooks returns the merged hooks of the registry
+		self.assertIs(frappe.get_hooks("doc_events"), registry.hooks.doc_events)
+
+		# rebuilt when the hooks cache is cleared
+		frappe.clear_cache()
+		self.assertIsNot(frappe.get_hooks_registry(), registry)
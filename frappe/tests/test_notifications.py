@@ -0,0 +1,42 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+from __future__ import unicode_literals
+
+import unittest
+
+import frappe
+from frappe.desk.notifications import can_evaluate_condition, get_open_counts, set_open_count
+
+class TestNotifications(unittest.TestCase):
+	def tearDown(self):
+		frappe.cache().delete_key("open_count:Error Log")
+
+	def test_incremental_open_count(self):
+		set_open_count("Error Log", "Administrator", 5)
+
+		error_log = frappe.get_doc(dict(doctype="Error Log", error="Test Notification Count")).insert()
+		# counts are changed when the transaction is committed
+		self.assertEqual(get_open_counts(["Error Log"], "Administrator"), {"Error Log": 5})
+		frappe.db.commit()
+		self.assertEqual(get_open_counts(["Error Log"], "Administrator"), {"Error Log": 6})
+
+		error_log.seen = 1
+		error_log.save()
+		frappe.db.commit()
+		self.assertEqual(get_open_counts(["Error Log"], "Administrator"), {"Error Log": 5})
+
+		error_log.delete()
+		frappe.db.commit()
+		self.assertEqual(get_open_counts(["Error Log"], "Administrator"), {"Error Log": 5})
+
+		# changes are discarded on rollback
+		frappe.get_doc(dict(doctype="Error Log", error="Test Notification Count")).insert()
+		frappe.db.rollback()
+		self.assertEqual(get_open_counts(["Error Log"], "Administrator"), {"Error Log": 5})
+
+	def test_can_evaluate_condition(self):
+		self.assertTrue(can_evaluate_condition({"seen": 0}))
+		self.assertTrue(can_evaluate_condition({"status": ("not in", ("Closed", "Cancelled"))}))
+		self.assertFalse(can_evaluate_condition({"subject": ("like", "%test%")}))
+		self.assertFalse(can_evaluate_condition("frappe.core.notifications.get_things_todo"))
@@ -6,7 +6,7 @@ from __future__ import unicode_literals
 import unittest
 
 import frappe
-from frappe.desk.query_report import build_xlsx_data
+from frappe.desk.query_report import build_xlsx_data, get_cached_report_result, get_report_cache_key
 import frappe.utils
 
 
@@ -42,3 +42,40 @@ class TestQueryReport(unittest.TestCase):
 
 		for row in xlsx_data:
 			self.assertEqual(type(row), list)
+
+	def test_report_result_cache(self):
+		report = frappe.get_doc("Report", "Permitted Documents For User")
+		report.result_cache_ttl = 60
+		filters = {"user": "Administrator", "doctype": "DocType"}
+
+		cache_key = get_report_cache_key(report, filters, "Administrator")
+		frappe.cache().delete_value(cache_key)
+
+		result = get_cached_report_result(report, filters, "Administrator")
+		self.assertEqual(frappe.cache().get_value(cache_key, expires=True)["result"], result["result"])
+
+		# key does not depend on the order of filters
+		self.assertEqual(cache_key, get_report_cache_key(report,
+			{"doctype": "DocType", "user": "Administrator"}, "Administrator"))
+
+		# results are cached per user
+		self.assertNotEqual(cache_key, get_report_cache_key(report, filters, "Guest"))
+
+		# results are cached per language
+		lang = frappe.local.lang
+		frappe.local.lang = "de"
+		try:
+			self.assertNotEqual(cache_key, get_report_cache_key(report, filters, "Administrator"))
+		finally:
+			frappe.local.lang = lang
+
+		# any change in the ref_doctype invalidates the key
+		frappe.db.sql("update `tabUser` set modified=%s where name='Guest'",
+			frappe.utils.add_days(frappe.utils.now_datetime(), 1))
+		self.assertNotEqual(cache_key, get_report_cache_key(report, filters, "Administrator"))
+		frappe.db.rollback()
+
+		# so does a delete
+		frappe.db.sql("delete from `tabUser` where name='Guest'")
+		self.assertNotEqual(cache_key, get_report_cache_key(report, filters, "Administrator"))
+		frappe.db.rollback()
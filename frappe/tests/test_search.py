@@ -48,5 +48,42 @@ class TestSearch(unittest.TestCase):
 		result = [['found' for x in y if x=="Country"] for y in output]
 		self.assertTrue(['found'] in result)
 
+	def test_link_search_index(self):
+		from frappe.desk.link_search_index import (build_link_search_index, get_candidate_names,
+			get_search_grams)
+
+		self.assertEqual(get_search_grams('ab'), set())
+		self.assertEqual(get_search_grams('an jordan'), {'jor', 'ord', 'rda', 'dan'})
+		self.assertEqual(get_search_grams('Mulder'), {'mul', 'uld', 'lde', 'der'})
+
+		contact = frappe.get_doc(dict(doctype='Contact', first_name='_Test Trigram',
+			last_name='Mulderson')).insert()
+		build_link_search_index('Contact')
+
+		self.assertTrue(contact.name in get_candidate_names('Contact', 'ulders'))
+		self.assertTrue(contact.name in get_candidate_names('Contact', 'tri mul'))
+		self.assertFalse(contact.name in get_candidate_names('Contact', 'ulder scully'))
+
+		# searches with only short words are not narrowed down by the index
+		self.assertEqual(get_candidate_names('Contact', 'on'), None)
+		search_widget(doctype='Contact', txt='on', page_length=100)
+		self.assertTrue(contact.name in [r[0] for r in frappe.response['values']])
+
+		search_widget(doctype='Contact', txt='ldersO', page_length=20)
+		self.assertTrue(contact.name in [r[0] for r in frappe.response['values']])
+
+		# new documents are indexed and invalidate cached results
+		search_widget(doctype='Contact', txt='scullys', page_length=20)
+		self.assertEqual(frappe.response['values'], [])
+
+		other = frappe.get_doc(dict(doctype='Contact', first_name='_Test Trigram',
+			last_name='Scullyson')).insert()
+		search_widget(doctype='Contact', txt='scullys', page_length=20)
+		self.assertEqual([r[0] for r in frappe.response['values']], [other.name])
+
+		other.delete()
+		contact.delete()
+		self.assertFalse(contact.name in get_candidate_names('Contact', 'mulderson'))
+
 	def tearDown(self):
 		frappe.local.lang = 'en'
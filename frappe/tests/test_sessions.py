@@ -0,0 +1,33 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import frappe, unittest, time
+from frappe.sessions import (flush_sessions, get_expired_sessions, get_session_index_key,
+	get_expiry_in_seconds)
+
+
+class TestSessions(unittest.TestCase):
+	def test_write_behind(self):
+		sid = frappe.generate_hash()
+		data = frappe._dict(user="Administrator", sid=sid,
+			data=frappe._dict(user="Administrator", last_updated=frappe.utils.now(), device="desktop"))
+
+		frappe.db.sql("""insert into `tabSessions` (`sessiondata`, `user`, `lastupdate`, `sid`, `status`, `device`)
+			values ('{}', 'Administrator', NOW(), %s, 'Active', 'desktop')""", sid)
+		frappe.cache().hset("session", sid, data)
+		frappe.cache().zadd(get_session_index_key("desktop"), sid, time.time())
+
+		flush_sessions()
+		self.assertEqual(frappe.db.sql("select sessiondata from `tabSessions` where sid=%s", sid)[0][0],
+			str(data.data))
+		self.assertNotIn(sid, get_expired_sessions())
+
+		# expiry is read from the index
+		frappe.cache().zadd(get_session_index_key("desktop"), sid,
+			time.time() - get_expiry_in_seconds(device="desktop") - 1)
+		self.assertIn(sid, get_expired_sessions())
+
+		frappe.sessions.delete_session(sid, "Administrator")
+		self.assertNotIn(sid, get_expired_sessions())
+		self.assertFalse(frappe.db.sql("select sid from `tabSessions` where sid=%s", sid))
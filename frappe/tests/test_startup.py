@@ -0,0 +1,12 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+from frappe.tests.benchmarks.startup import get_loaded_lazy_modules, LAZY_MODULES
+
+
+class TestStartup(unittest.TestCase):
+	def test_lazy_imports(self):
+		for module in LAZY_MODULES:
+			self.assertEqual(get_loaded_lazy_modules(module), [])
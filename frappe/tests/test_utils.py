@@ -122,3 +122,171 @@ class TestHTMLUtils(unittest.TestCase):
 		clean = clean_email_html(sample)
 		self.assertTrue('<h1>Hello</h1>' in clean)
 		self.assertTrue('<a href="http://test.com">text</a>' in clean)
+
+class TestRedisWrapper(unittest.TestCase):
+	def test_multi_get_and_set(self):
+		import frappe
+		cache = frappe.cache()
+		cache.delete_value(["_test_multi_1", "_test_multi_2", "_test_multi_3"])
+
+		cache.set_values({"_test_multi_1": {"a": 1}, "_test_multi_2": [2]})
+
+		# read from redis, not frappe.local.cache
+		frappe.local.cache.clear()
+		self.assertEqual(cache.get_values(["_test_multi_1", "_test_multi_2", "_test_multi_3"]),
+			{"_test_multi_1": {"a": 1}, "_test_multi_2": [2], "_test_multi_3": None})
+		self.assertEqual(frappe.local.cache[cache.make_key("_test_multi_2")], [2])
+		self.assertEqual(cache.get_all("_test_multi_"), {"_test_multi_1": {"a": 1}, "_test_multi_2": [2]})
+
+		cache.hset("_test_multi_hash", "a", 1)
+		cache.hset("_test_multi_hash", "b", [2])
+		frappe.local.cache.clear()
+		self.assertEqual(cache.hget_many("_test_multi_hash", ["a", "b", "c"]), {"a": 1, "b": [2], "c": None})
+		self.assertEqual(cache.hget("_test_multi_hash", "b"), [2])
+
+		cache.delete_value(["_test_multi_1", "_test_multi_2", "_test_multi_hash"])
+
+	def test_registered_keys(self):
+		import frappe
+		cache = frappe.cache()
+		user = "_test_registry@example.com"
+
+		cache.set_value("_test_key", 1, user=user)
+		cache.set_value("_test_expiring_key", 1, user=user, expires_in_sec=1)
+		cache.set_value("_test_key", 1, user="_test_registry@example.com2")
+		self.assertTrue(cache.sismember("key_registry:user:" + user, cache.make_key("_test_key", user=user)))
+		self.assertEqual(len(cache.get_keys("user:" + user)), 2)
+
+		cache.delete_keys("user:" + user)
+		self.assertEqual(cache.get_keys("user:" + user), [])
+		self.assertFalse(cache.sismember("key_registry:user:" + user, cache.make_key("_test_key", user=user)))
+		self.assertEqual(cache.get_value("_test_key", user="_test_registry@example.com2"), 1)
+		cache.delete_keys("user:_test_registry@example.com2")
+
+		cache.rpush("insert_queue_for__Test", "{}")
+		self.assertEqual(cache.get_keys("insert_queue_for__Test"), [cache.make_key("insert_queue_for__Test")])
+		cache.lpop("insert_queue_for__Test")
+
+		# emptied lists are removed from the registry
+		self.assertEqual(cache.get_keys("insert_queue_for__Test"), [])
+		self.assertFalse(cache.sismember("key_registry:insert_queue_for_", cache.make_key("insert_queue_for__Test")))
+
+		# keys written before the registry existed are found with SCAN and registered
+		cache.delete_value("key_registry:user:" + user)
+		frappe.cache().set(cache.make_key("_test_key", user=user), "1")
+		self.assertEqual(cache.get_keys("user:" + user), [cache.make_key("_test_key", user=user)])
+		self.assertTrue(cache.sismember("key_registry:user:" + user, cache.make_key("_test_key", user=user)))
+		cache.delete_keys("user:" + user)
+
+	def test_codec(self):
+		import frappe
+		from six.moves import cPickle as pickle
+		from frappe.utils.redis_codec import dumps, loads, MAGIC, COMPRESSION_THRESHOLD
+
+		small, large = {"a": 1}, [frappe.generate_hash() for i in range(COMPRESSION_THRESHOLD // 8)]
+
+		# plain pickles unless compression is enabled
+		self.assertEqual(dumps(large), pickle.dumps(large, pickle.HIGHEST_PROTOCOL))
+
+		frappe.local.conf.redis_cache_compression = "zlib"
+		try:
+			self.assertEqual(dumps(small), pickle.dumps(small, pickle.HIGHEST_PROTOCOL))
+			self.assertEqual(loads(dumps(small)), small)
+			self.assertEqual(loads(dumps(large)), large)
+			self.assertTrue(isinstance(dumps(large), bytes))
+			self.assertTrue(dumps(large).startswith(MAGIC))
+			self.assertTrue(len(dumps(large)) < len(pickle.dumps(large, pickle.HIGHEST_PROTOCOL)))
+		finally:
+			frappe.local.conf.pop("redis_cache_compression", None)
+
+		# values written by older versions
+		self.assertEqual(loads(pickle.dumps(large)), large)
+		self.assertEqual(frappe.cache().get_value("_test_codec"), None)
+		frappe.cache().set_value("_test_codec", large)
+		frappe.local.cache.clear()
+		self.assertEqual(frappe.cache().get_value("_test_codec"), large)
+		frappe.cache().delete_value("_test_codec")
+
+	def test_process_cache(self):
+		import frappe
+		from frappe.utils.process_cache import process_cache, is_process_cached
+
+		cache = frappe.cache()
+		key = cache.make_key("app_hooks")
+		self.assertTrue(is_process_cached(key))
+		self.assertFalse(is_process_cached(cache.make_key("_test_key")))
+
+		# values read before an eviction are not stored
+		generation = process_cache.generation
+		cache.delete_value("app_hooks")
+		process_cache.set(key, b"stale", generation)
+		self.assertEqual(process_cache.get(key), None)
+
+		process_cache.set(key, b"value", process_cache.generation)
+		process_cache.set(cache.make_key("meta"), b"meta", process_cache.generation, field="User")
+		self.assertEqual(process_cache.get(cache.make_key("meta"), "User"), b"meta")
+
+		cache.hdel("meta", "User")
+		self.assertEqual(process_cache.get(cache.make_key("meta"), "User"), None)
+		self.assertEqual(process_cache.get(key), b"value")
+
+		frappe.clear_cache()
+		self.assertEqual(process_cache.get(key), None)
+
+class TestLocalCache(unittest.TestCase):
+	def test_lru_eviction(self):
+		import frappe
+		from frappe.utils.local_cache import LocalCache
+
+		frappe.local.conf.local_cache_max_size = 100
+		try:
+			cache = LocalCache()
+			cache.set("a", 1, 40)
+			cache.set("b", 2, 40)
+			cache["a"]
+			cache.set("c", 3, 40)
+
+			# b is the least recently used
+			self.assertEqual(list(cache), ["a", "c"])
+			self.assertEqual(cache.get_stats().evictions, 1)
+			self.assertEqual(cache.size, 80)
+
+			# entries grow as values are added to cached hashes
+			cache["h"] = {}
+			cache["h"]["x"] = 1
+			cache.add_size("h", 70)
+			self.assertEqual(list(cache), ["h"])
+			self.assertEqual(cache.size, 70)
+
+			# overwritten and deleted hash values release their size
+			cache.set_field_size("h", "y", 20)
+			cache.set_field_size("h", "y", 10)
+			self.assertEqual(cache.size, 80)
+			cache.remove_field("h", "y")
+			self.assertEqual(cache.size, 70)
+		finally:
+			del frappe.local.conf["local_cache_max_size"]
+
+class TestConfigCache(unittest.TestCase):
+	def test_config_cache(self):
+		import os, json, tempfile
+		from frappe.utils.config_cache import get_config_json, files
+
+		fd, path = tempfile.mkstemp(suffix=".json")
+		try:
+			with os.fdopen(fd, "w") as f:
+				json.dump({"a": 1}, f)
+
+			self.assertEqual(get_config_json(path), {"a": 1})
+			self.assertIn((path, "json"), files)
+
+			# a rewrite with the same size is detected by its mtime
+			with open(path, "w") as f:
+				json.dump({"a": 2}, f)
+			os.utime(path, (os.stat(path).st_mtime + 1, os.stat(path).st_mtime + 1))
+			self.assertEqual(get_config_json(path), {"a": 2})
+		finally:
+			os.remove(path)
+
+		self.assertEqual(get_config_json(path), None)
+		self.assertNotIn((path, "json"), files)
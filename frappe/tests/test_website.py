@@ -47,7 +47,7 @@ class TestWebsite(unittest.TestCase):
 		})
 		website_settings.save()
 
-		frappe.cache().delete_key('app_hooks')
+		frappe.clear_cache()
 		frappe.cache().delete_key('website_redirects')
 
 		set_request(method='GET', path='/testfrom')
@@ -75,5 +75,5 @@ class TestWebsite(unittest.TestCase):
 		self.assertEquals(response.headers.get('Location'), '/testtarget')
 
 		delattr(frappe.hooks, 'website_redirects')
-		frappe.cache().delete_key('app_hooks')
+		frappe.clear_cache()
 
@@ -262,11 +262,12 @@ def get_user_translations(lang):
 
 def clear_cache():
 	"""Clear all translation assets from :meth:`frappe.cache`"""
+	from frappe.boot import clear_boot_segment_cache
 	cache = frappe.cache()
 	cache.delete_key("langinfo")
 
 	# clear translations saved in boot cache
-	cache.delete_key("bootinfo")
+	clear_boot_segment_cache("translations")
 	cache.delete_key("lang_full_dict", shared=True)
 	cache.delete_key("translation_assets", shared=True)
 	cache.delete_key("lang_user_translations")
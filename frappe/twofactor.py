@@ -251,8 +251,7 @@ def get_link_for_qrcode(user, totp_uri):
 	lifespan = int(frappe.db.get_value('System Settings', 'System Settings', 'lifespan_qrcode_image'))
 	if lifespan<=0:
 		lifespan = 240
-	frappe.cache().set_value(key_uri, totp_uri, expires_in_sec=lifespan)
-	frappe.cache().set_value(key_user, user, expires_in_sec=lifespan)
+	frappe.cache().set_values({key_uri: totp_uri, key_user: user}, expires_in_sec=lifespan)
 	return get_url('/qrcode?k={}'.format(key))
 
 def send_token_via_sms(otpsecret, token=None, phone_no=None):
@@ -3,6 +3,7 @@ import redis
 from rq import Connection, Queue, Worker
 from rq.logutils import setup_loghandlers
 from frappe.utils import cstr
+from frappe.utils.local_cache import log_stats as log_local_cache_stats
 from collections import defaultdict
 import frappe
 import os, socket, time
@@ -127,6 +128,7 @@ def execute_job(site, method, event, job_name, kwargs, user=None, is_async=True,
 		frappe.db.commit()
 
 	finally:
+		log_local_cache_stats("job " + method_name)
 		if is_async:
 			frappe.destroy()
 
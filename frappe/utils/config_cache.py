@@ -0,0 +1,72 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Process level cache of config files (`site_config.json`, `common_site_config.json`,
+`apps.txt`), so that they are not read and parsed for every request
+
+Files are cached by path with their `(mtime, size)` and re-read only when either
+changes, so changes made by other processes (like `bench set-config`) are picked up
+by the next request. `update_site_config` also clears the cache of this process and
+makes sure the mtime of a rewritten file changes.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import os
+
+# (path, kind): ((mtime, size), value)
+files = {}
+
+def get_config_json(path):
+	"""Returns the parsed JSON of `path`, or None if it does not exist"""
+	return get_cached(path, "json", parse_json)
+
+def get_config_items(path):
+	"""Returns the lines of `path` like `frappe.get_file_items`, or None if it does not exist"""
+	return get_cached(path, "items", parse_items)
+
+def get_cached(path, kind, parse):
+	stat = get_stat(path)
+	if not stat:
+		files.pop((path, kind), None)
+		return None
+
+	cached = files.get((path, kind))
+	if cached and cached[0] == stat:
+		return cached[1]
+
+	value = parse(path)
+	files[(path, kind)] = (stat, value)
+	return value
+
+def get_stat(path):
+	"""Returns `(mtime, size)` of `path`, or None if it does not exist"""
+	try:
+		stat = os.stat(path)
+	except OSError:
+		return None
+
+	return (stat.st_mtime, stat.st_size)
+
+def parse_json(path):
+	with open(path, 'r') as f:
+		return json.load(f)
+
+def parse_items(path):
+	with open(path, 'r') as f:
+		content = f.read().strip()
+
+	return [p.strip() for p in content.splitlines() if p.strip() and not p.startswith("#")]
+
+def clear_config_cache(path=None):
+	"""Clear cached files of `path`, or all cached files"""
+	for key in list(files):
+		if not path or key[0] == path:
+			files.pop(key, None)
+
+def touch_if_unchanged(path, stat):
+	"""Move the mtime of `path` forward if it is rewritten with the same size within the
+	mtime resolution of the file system, so that other processes see the change"""
+	if stat and get_stat(path) == stat:
+		os.utime(path, (stat[0] + 1, stat[0] + 1))
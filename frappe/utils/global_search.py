@@ -11,8 +11,16 @@ import os
 from bs4 import BeautifulSoup
 from frappe.utils import cint, strip_html_tags
 from frappe.model.base_document import get_controller
+from frappe.utils.search_backends import get_search_backend
 from six import text_type
 
+# number of queued values synced per batch, and rows per upsert query
+GLOBAL_SEARCH_SYNC_BATCH_SIZE = 1000
+GLOBAL_SEARCH_UPSERT_CHUNK_SIZE = 100
+
+# documents read per chunk when rebuilding global search for a doctype
+GLOBAL_SEARCH_REBUILD_CHUNK_SIZE = 5000
+
 def setup_global_search_table():
 	"""
 	Creates __global_search table
@@ -27,6 +35,7 @@ def reset():
 	:return:
 	"""
 	frappe.db.sql('DELETE FROM `__global_search`')
+	get_search_backend().clear()
 
 
 def get_doctypes_with_global_search(with_child_tables=True):
@@ -59,18 +68,43 @@ def get_doctypes_with_global_search(with_child_tables=True):
 	return frappe.cache().get_value('doctypes_with_global_search', _get)
 
 
-def rebuild_for_doctype(doctype):
+def get_doctypes_to_rebuild(doctypes):
+	"""
+	Return `doctypes` with child tables replaced by their parents, without
+	duplicates, as rebuilding a child table rebuilds its parents
+	:param doctypes: Doctypes
+	:return:
+	"""
+	out = []
+	for doctype in doctypes:
+		if cint(frappe.get_meta(doctype).istable) == 1:
+			parents = [p.parent for p in frappe.get_all("DocField", fields="parent", filters={
+				"fieldtype": ["in", frappe.model.table_fields],
+				"options": doctype
+			})]
+		else:
+			parents = [doctype]
+
+		out.extend(d for d in parents if d not in out)
+
+	return out
+
+
+def rebuild_for_doctype(doctype, resume=False):
 	"""
 	Rebuild entries of doctype's documents in __global_search on change of
 	searchable fields
+
+	Documents are read in chunks ordered by name. Entries of each chunk are
+	upserted and stale entries in the chunk's name range are removed, so the
+	existing index stays searchable during the rebuild. Progress is checkpointed
+	after every chunk.
 	:param doctype: Doctype
+	:param resume: continue from the last checkpoint of an interrupted rebuild
 	"""
 	if frappe.local.conf.get('disable_global_search'):
 		return
 
-	if frappe.local.conf.get('disable_global_search'):
-		return
-
 	def _get_filters():
 		filters = frappe._dict({ "docstatus": ["!=", 2] })
 		if meta.has_field("enabled"):
@@ -87,24 +121,46 @@ def rebuild_for_doctype(doctype):
 			"options": doctype
 		})
 		for p in parent_doctypes:
-			rebuild_for_doctype(p.parent)
+			rebuild_for_doctype(p.parent, resume=resume)
 
 		return
 
-	# Delete records
-	delete_global_search_records_for_doctype(doctype)
-
 	parent_search_fields = meta.get_global_search_fields()
 	fieldnames = get_selected_fields(meta, parent_search_fields)
 
-	# Get all records from parent doctype table
-	all_records = frappe.get_all(doctype, fields=fieldnames, filters=_get_filters())
+	last_name = get_rebuild_checkpoint(doctype) if resume else None
+	while True:
+		filters = _get_filters()
+		if last_name is not None:
+			filters.name = [">", last_name]
 
-	# Children data
-	all_children, child_search_fields = get_children_data(doctype, meta)
-	all_contents = []
+		records = frappe.get_all(doctype, fields=fieldnames, filters=filters,
+			order_by="name asc", limit_page_length=GLOBAL_SEARCH_REBUILD_CHUNK_SIZE)
+		if not records:
+			break
+
+		all_children, child_search_fields = get_children_data(doctype, meta,
+			parents=[d.name for d in records])
+		all_contents = get_contents_for_records(doctype, meta, records, parent_search_fields,
+			all_children, child_search_fields)
+
+		# swap in the chunk: upsert new content, then remove entries of documents in
+		# this name range that no longer exist or are not searchable anymore
+		sync_values(all_contents)
+		delete_stale_records(doctype, last_name, records[-1].name, [d["name"] for d in all_contents])
+
+		last_name = records[-1].name
+		set_rebuild_checkpoint(doctype, last_name)
+		frappe.db.commit()
 
-	for doc in all_records:
+	delete_stale_records(doctype, last_name, None, [])
+	get_search_backend().prune(doctype)
+	clear_rebuild_checkpoint(doctype)
+	frappe.db.commit()
+
+def get_contents_for_records(doctype, meta, records, parent_search_fields, all_children, child_search_fields):
+	all_contents = []
+	for doc in records:
 		content = []
 		for field in parent_search_fields:
 			value = doc.get(field.fieldname)
@@ -112,9 +168,9 @@ def rebuild_for_doctype(doctype):
 				content.append(get_formatted_value(value, field))
 
 		# get children data
-		for child_doctype, records in all_children.get(doc.name, {}).items():
+		for child_doctype, child_records in all_children.get(doc.name, {}).items():
 			for field in child_search_fields.get(child_doctype):
-				for r in records:
+				for r in child_records:
 					if r.get(field.fieldname):
 						content.append(get_formatted_value(r.get(field.fieldname), field))
 
@@ -133,21 +189,49 @@ def rebuild_for_doctype(doctype):
 				pass
 
 			all_contents.append({
-				"doctype": frappe.db.escape(doctype),
-				"name": frappe.db.escape(doc.name),
-				"content": frappe.db.escape(' ||| '.join(content or '')),
+				"doctype": doctype,
+				"name": doc.name,
+				"content": ' ||| '.join(content or ''),
 				"published": published,
-				"title": frappe.db.escape(title or '')[:int(frappe.db.VARCHAR_LEN)],
-				"route": frappe.db.escape(route or '')[:int(frappe.db.VARCHAR_LEN)]
+				"title": (title or '')[:int(frappe.db.VARCHAR_LEN)],
+				"route": (route or '')[:int(frappe.db.VARCHAR_LEN)]
 			})
-	if all_contents:
-		insert_values_for_multiple_docs(all_contents)
+
+	return all_contents
+
+def delete_stale_records(doctype, from_name, to_name, names_to_keep):
+	"""Delete entries of doctype with name in (from_name, to_name] that are not in names_to_keep"""
+	conditions = ["doctype = %(doctype)s"]
+	values = {"doctype": doctype}
+	if from_name is not None:
+		conditions.append("name > %(from_name)s")
+		values["from_name"] = from_name
+	if to_name is not None:
+		conditions.append("name <= %(to_name)s")
+		values["to_name"] = to_name
+	if names_to_keep:
+		conditions.append("name not in %(names_to_keep)s")
+		values["names_to_keep"] = tuple(names_to_keep)
+
+	frappe.db.sql('''DELETE
+		FROM `__global_search`
+		WHERE {0}'''.format(" AND ".join(conditions)), values)
+
+def get_rebuild_checkpoint(doctype):
+	return frappe.cache().hget("global_search_rebuild_checkpoint", doctype)
+
+def set_rebuild_checkpoint(doctype, name):
+	frappe.cache().hset("global_search_rebuild_checkpoint", doctype, name)
+
+def clear_rebuild_checkpoint(doctype):
+	frappe.cache().hdel("global_search_rebuild_checkpoint", doctype)
 
 
 def delete_global_search_records_for_doctype(doctype):
 	frappe.db.sql('''DELETE
 		FROM `__global_search`
 		WHERE doctype = %s''', doctype, as_dict=True)
+	get_search_backend().delete_doctype(doctype)
 
 
 def get_selected_fields(meta, global_search_fields):
@@ -163,9 +247,10 @@ def get_selected_fields(meta, global_search_fields):
 	return fieldnames
 
 
-def get_children_data(doctype, meta):
+def get_children_data(doctype, meta, parents=None):
 	"""
-		Get all records from all the child tables of a doctype
+		Get all records from all the child tables of a doctype,
+		only of the given parents if `parents` is set
 
 		all_children = {
 			"parent1": {
@@ -188,10 +273,14 @@ def get_children_data(doctype, meta):
 		if search_fields:
 			child_search_fields.setdefault(child.options, search_fields)
 			child_fieldnames = get_selected_fields(child_meta, search_fields)
-			child_records = frappe.get_all(child.options, fields=child_fieldnames, filters={
+			filters = {
 				"docstatus": ["!=", 1],
 				"parenttype": doctype
-			})
+			}
+			if parents is not None:
+				filters["parent"] = ["in", parents]
+
+			child_records = frappe.get_all(child.options, fields=child_fieldnames, filters=filters)
 
 			for record in child_records:
 				all_children.setdefault(record.parent, frappe._dict())\
@@ -200,27 +289,6 @@ def get_children_data(doctype, meta):
 	return all_children, child_search_fields
 
 
-def insert_values_for_multiple_docs(all_contents):
-	values = []
-	for content in all_contents:
-		values.append("({doctype}, {name}, {content}, {published}, {title}, {route})"
-			.format(**content))
-
-	batch_size = 50000
-	for i in range(0, len(values), batch_size):
-		batch_values = values[i:i + batch_size]
-		# ignoring duplicate keys for doctype_name
-		frappe.db.multisql({
-			'mariadb': '''INSERT IGNORE INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {0} '''.format(", ".join(batch_values)),
-			'postgres': '''INSERT INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {0}
-				ON CONFLICT("name", "doctype") DO NOTHING'''.format(", ".join(batch_values))
-			})
-
-
 def update_global_search(doc):
 	"""
 	Add values marked with `in_global_search` to
@@ -354,12 +422,35 @@ def sync_global_search():
 	"""
 	Inserts / updates values from `global_search_queue` to __global_search.
 	This is called via job scheduler
-	:param flags:
-	:return:
+
+	The queue is drained in batches, oldest first. Only the latest value of a
+	document in a batch is written, with one multi-row upsert per chunk
+	:return: size of the queue when the sync started
 	"""
-	while frappe.cache().llen('global_search_queue') > 0:
-		value = json.loads(frappe.cache().lpop('global_search_queue').decode('utf-8'))
-		sync_value(value)
+	cache = frappe.cache()
+	backlog = cache.llen('global_search_queue')
+	if not backlog:
+		return 0
+
+	frappe.logger(__name__).info({"global_search_queue_backlog": backlog})
+
+	synced = 0
+	while synced < backlog:
+		items = cache.rpop_many('global_search_queue', GLOBAL_SEARCH_SYNC_BATCH_SIZE)
+		if not items:
+			break
+
+		# items are oldest first, latest value of a document wins
+		values = {}
+		for item in items:
+			value = json.loads(frappe.safe_decode(item))
+			values[(value['doctype'], value['name'])] = value
+
+		sync_values(list(values.values()))
+		frappe.db.commit()
+		synced += len(items)
+
+	return backlog
 
 def sync_value_in_queue(value):
 	try:
@@ -374,27 +465,42 @@ def sync_value(value):
 	Sync a given document to global search
 	:param value: dict of { doctype, name, content, published, title, route }
 	'''
+	sync_values([value])
 
-	frappe.db.multisql({
-		'mariadb': '''INSERT INTO `__global_search`
-			(`doctype`, `name`, `content`, `published`, `title`, `route`)
-			VALUES (%(doctype)s, %(name)s, %(content)s, %(published)s, %(title)s, %(route)s)
-			ON DUPLICATE key UPDATE
-				`content`=%(content)s,
-				`published`=%(published)s,
-				`title`=%(title)s,
-				`route`=%(route)s
-		''',
-		'postgres': '''INSERT INTO `__global_search`
-			(`doctype`, `name`, `content`, `published`, `title`, `route`)
-			VALUES (%(doctype)s, %(name)s, %(content)s, %(published)s, %(title)s, %(route)s)
-			ON CONFLICT("doctype", "name") DO UPDATE SET
-				`content`=%(content)s,
-				`published`=%(published)s,
-				`title`=%(title)s,
-				`route`=%(route)s
-		'''
-	}, value)
+def sync_values(values):
+	'''
+	Sync given documents to global search with multi-row upserts
+	:param values: list of dict of { doctype, name, content, published, title, route }
+	'''
+	fields = ('doctype', 'name', 'content', 'published', 'title', 'route')
+
+	for i in range(0, len(values), GLOBAL_SEARCH_UPSERT_CHUNK_SIZE):
+		chunk = values[i:i + GLOBAL_SEARCH_UPSERT_CHUNK_SIZE]
+		placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))
+		params = [value.get(field) for value in chunk for field in fields]
+
+		frappe.db.multisql({
+			'mariadb': '''INSERT INTO `__global_search`
+				(`doctype`, `name`, `content`, `published`, `title`, `route`)
+				VALUES {0}
+				ON DUPLICATE key UPDATE
+					`content`=VALUES(`content`),
+					`published`=VALUES(`published`),
+					`title`=VALUES(`title`),
+					`route`=VALUES(`route`)
+			'''.format(placeholders),
+			'postgres': '''INSERT INTO `__global_search`
+				(`doctype`, `name`, `content`, `published`, `title`, `route`)
+				VALUES {0}
+				ON CONFLICT("doctype", "name") DO UPDATE SET
+					`content`=EXCLUDED.`content`,
+					`published`=EXCLUDED.`published`,
+					`title`=EXCLUDED.`title`,
+					`route`=EXCLUDED.`route`
+			'''.format(placeholders)
+		}, params)
+
+	get_search_backend().index(values)
 
 def delete_for_document(doc):
 	"""
@@ -407,12 +513,33 @@ def delete_for_document(doc):
 		FROM `__global_search`
 		WHERE doctype = %s
 		AND name = %s''', (doc.doctype, doc.name), as_dict=True)
+	get_search_backend().delete(doc.doctype, doc.name)
+
+
+def delete_for_documents(doctype, names):
+	"""
+	Delete the __global_search entries of deleted documents
+	:param doctype: Doctype of the documents
+	:param names: names of the deleted documents
+	"""
+	if not names:
+		return
+
+	frappe.db.sql('''DELETE
+		FROM `__global_search`
+		WHERE doctype = %s
+		AND name in %s''', (doctype, tuple(names)))
+
+	backend = get_search_backend()
+	for name in names:
+		backend.delete(doctype, name)
 
 
 @frappe.whitelist()
 def search(text, start=0, limit=20, doctype=""):
 	"""
-	Search for given text in __global_search
+	Search for given text in the global search backend of the site,
+	`__global_search` unless `global_search_backend` is set in site config
 	:param text: phrase to be searched
 	:param start: start results at, default 0
 	:param limit: number of results to return, default 20
@@ -423,46 +550,15 @@ def search(text, start=0, limit=20, doctype=""):
 	results = []
 	texts = [t.strip() for t in text.split('&') if t]
 	priorities = get_doctypes_for_global_search()
-	allowed_doctypes = ",".join(["'{0}'".format(dt) for dt in priorities])
+	backend = get_search_backend()
 	for text in texts:
-		mariadb_conditions = ''
-		postgres_conditions = ''
-		offset = ''
-
-		if doctype:
-			mariadb_conditions = postgres_conditions = '`doctype` = {} AND '.format(frappe.db.escape(doctype))
-
-		mariadb_text = frappe.db.escape('+' + text + '*')
-
-		mariadb_fields = '`doctype`, `name`, `content`, MATCH (`content`) AGAINST ({} IN BOOLEAN MODE) AS rank'.format(mariadb_text)
-		postgres_fields = '`doctype`, `name`, `content`, TO_TSVECTOR("content") @@ PLAINTO_TSQUERY({}) AS rank'.format(frappe.db.escape(text))
-
-		if allowed_doctypes:
-			mariadb_conditions += '`doctype` IN ({})'.format(allowed_doctypes)
-			postgres_conditions += '`doctype` IN ({})'.format(allowed_doctypes)
-
-		if int(start) > 0:
-			offset = 'OFFSET {}'.format(start)
-
-		common_query = """
-				SELECT {fields}
-				FROM `__global_search`
-				WHERE {conditions}
-				ORDER BY rank DESC
-				LIMIT {limit}
-				{offset}
-			"""
-
-		result = frappe.db.multisql({
-				'mariadb': common_query.format(fields=mariadb_fields, conditions=mariadb_conditions, limit=limit, offset=offset),
-				'postgres': common_query.format(fields=postgres_fields, conditions=postgres_conditions, limit=limit, offset=offset)
-			}, as_dict=True)
+		result = backend.search(text, start=start, limit=limit, doctype=doctype,
+			allowed_doctypes=priorities)
 
 		tmp_result=[]
 		for i in result:
-			if i.rank > 0.0:
-				if i in results or not results:
-					tmp_result.extend([i])
+			if i in results or not results:
+				tmp_result.extend([i])
 		results.extend(tmp_result)
 
 	for r in results:
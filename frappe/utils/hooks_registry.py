@@ -0,0 +1,99 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Per process registry of hooks with resolved callables
+
+Loading the cached `app_hooks` decodes all hooks in every request and `frappe.get_attr`
+imports and resolves dotted paths every time. The registry keeps the merged hooks
+(returned by `frappe.get_hooks`), `doc_events` indexed by `(doctype, event)` and the
+methods of hooks like `has_permission` resolved to callables. Methods are resolved the
+first time they are used, so that a broken hook only fails where it is called.
+
+There is one registry per site in each process. It is rebuilt when the installed apps
+or the `app_hooks_version` change, the version is reset whenever `app_hooks` is
+rebuilt. In developer mode it is rebuilt for every request.
+"""
+
+from __future__ import unicode_literals
+
+from six import iteritems
+
+import frappe
+
+# site: HooksRegistry
+registries = {}
+
+class HooksRegistry(object):
+	def __init__(self, hooks, key=None):
+		self.key = key
+		self.hooks = hooks
+		self.doc_events_hooks = self.get_doc_events_hooks()
+		self.resolved = {}
+
+	def get_doc_events_hooks(self):
+		"""Returns {doctype: {event: [methods]}}, doctype tuples are expanded"""
+		out = {}
+		for key, value in iteritems(self.hooks.get("doc_events") or {}):
+			if isinstance(key, tuple):
+				for doctype in key:
+					frappe.append_hook(out, doctype, value)
+			else:
+				frappe.append_hook(out, key, value)
+
+		return out
+
+	def get_doc_event_handlers(self, doctype, event):
+		"""Returns the callables of `event` for `doctype` and for all doctypes (`*`)"""
+		key = ("doc_events", doctype, event)
+		if key not in self.resolved:
+			self.resolved[key] = self.resolve(self.doc_events_hooks.get(doctype, {}).get(event, [])
+				+ self.doc_events_hooks.get("*", {}).get(event, []))
+
+		return self.resolved[key]
+
+	def get_methods(self, hook, key=None):
+		"""Returns the callables of `hook`, or of `key` if the hook is a dict
+		(like `has_permission` or `permission_query_conditions`, by doctype)"""
+		_key = (hook, key)
+		if _key not in self.resolved:
+			methods = self.hooks.get(hook) or ([] if key is None else {})
+			if key is not None:
+				methods = methods.get(key) or []
+			self.resolved[_key] = self.resolve(methods)
+
+		return self.resolved[_key]
+
+	def resolve(self, methods):
+		return [frappe.get_attr(method) for method in methods]
+
+def get_hooks_registry():
+	"""Returns the hooks registry of the current site, built once per request"""
+	registry = getattr(frappe.local, "hooks_registry", None)
+	if registry:
+		return registry
+
+	if frappe.conf.developer_mode:
+		# hooks are not cached in developer mode
+		registry = HooksRegistry(frappe._dict(frappe.load_app_hooks()))
+	else:
+		# the merged hooks are only loaded if the registry is out of date
+		registry = registries.get(frappe.local.site)
+		if not registry or registry.key != get_registry_key():
+			# loads app_hooks first, which resets the version if they are rebuilt
+			hooks = frappe.get_cached_hooks()
+			registry = registries[frappe.local.site] = HooksRegistry(hooks, get_registry_key())
+
+	frappe.local.hooks_registry = registry
+	return registry
+
+def get_registry_key():
+	return (get_hooks_version(), tuple(frappe.get_installed_apps()))
+
+def get_hooks_version():
+	"""Returns the version of the cached `app_hooks`, a new one if it was reset"""
+	version = frappe.cache().get_value("app_hooks_version")
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache().set_value("app_hooks_version", version)
+
+	return version
@@ -0,0 +1,143 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""`frappe.local.cache`, the request or job local mirror of redis cache values
+
+It is a dict-like LRU bounded by an approximate size in bytes, `local_cache_max_size`
+in site config (32 MB by default). Sizes are the encoded sizes of the values read from
+or written to redis by `RedisWrapper`, entries set directly (like `frappe.local_cache`
+namespaces) count as empty.
+
+Hits, misses and evictions are counted. Set `log_local_cache_stats` in site config to
+log them at the end of every request and background job.
+"""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import frappe
+
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024
+
+class LocalCache(object):
+	def __init__(self):
+		self.data = OrderedDict()
+		self.sizes = {}
+		# sizes of the values in cached hashes, {key: {field: size}}
+		self.field_sizes = {}
+		self.size = 0
+		self.hits = self.misses = self.evictions = 0
+
+	@property
+	def max_size(self):
+		conf = getattr(frappe.local, "conf", None) or {}
+		return conf.get("local_cache_max_size") or DEFAULT_MAX_SIZE
+
+	def __contains__(self, key):
+		return key in self.data
+
+	def __getitem__(self, key):
+		# move to the end, most recently used
+		value = self.data.pop(key)
+		self.data[key] = value
+		return value
+
+	def __setitem__(self, key, value):
+		self.set(key, value)
+
+	def __delitem__(self, key):
+		del self.data[key]
+		self.size -= self.sizes.pop(key, 0)
+		self.field_sizes.pop(key, None)
+
+	def __iter__(self):
+		return iter(list(self.data))
+
+	def __len__(self):
+		return len(self.data)
+
+	def get(self, key, default=None):
+		return self[key] if key in self.data else default
+
+	def set(self, key, value, size=0):
+		"""Set `key`, `size` is the approximate size of `value` in bytes"""
+		if key in self.data:
+			del self[key]
+
+		self.data[key] = value
+		self.add_size(key, size)
+
+	def add_size(self, key, size):
+		"""Add `size` bytes to an entry (or remove them if it is negative)"""
+		if not size:
+			return
+
+		self.sizes[key] = self.sizes.get(key, 0) + size
+		self.size += size
+		if size > 0:
+			self.evict(keep=key)
+
+	def set_field_size(self, key, field, size):
+		"""Set the size of the value of `field` in the cached hash `key`, replacing the
+		size of its previous value"""
+		field_sizes = self.field_sizes.setdefault(key, {})
+		previous_size = field_sizes.get(field, 0)
+		field_sizes[field] = size
+		self.add_size(key, size - previous_size)
+
+	def remove_field(self, key, field):
+		"""Remove the size of `field` from the cached hash `key`"""
+		size = self.field_sizes.get(key, {}).pop(field, 0)
+		self.add_size(key, -size)
+
+	def evict(self, keep=None):
+		"""Remove least recently used entries until the cache fits its budget"""
+		max_size = self.max_size
+		while self.size > max_size:
+			key = next((k for k in self.data if k != keep), None)
+			if key is None:
+				break
+
+			del self[key]
+			self.evictions += 1
+
+	def update(self, mapping):
+		for key, value in mapping.items():
+			self.set(key, value)
+
+	def pop(self, key, *default):
+		if key not in self.data:
+			if default:
+				return default[0]
+			raise KeyError(key)
+
+		value = self.data[key]
+		del self[key]
+		return value
+
+	def clear(self):
+		self.data.clear()
+		self.sizes.clear()
+		self.field_sizes.clear()
+		self.size = 0
+
+	def record_hit(self, count=1):
+		self.hits += count
+
+	def record_miss(self, count=1):
+		self.misses += count
+
+	def get_stats(self):
+		return frappe._dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+			entries=len(self.data), size=self.size, max_size=self.max_size)
+
+def log_stats(context):
+	"""Log the counters of `frappe.local.cache` if `log_local_cache_stats` is set"""
+	cache = getattr(frappe.local, "cache", None)
+	conf = getattr(frappe.local, "conf", None) or {}
+	if not (isinstance(cache, LocalCache) and conf.get("log_local_cache_stats")):
+		return
+
+	frappe.logger("frappe.local_cache", with_more_info=False).info("{site} {context} {stats}".format(
+		site=frappe.local.site, context=context, stats=frappe.as_json(cache.get_stats(), indent=None)))
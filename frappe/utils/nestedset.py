@@ -17,6 +17,9 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now
 
+# nodes updated per query by rebuild_tree
+REBUILD_CHUNK_SIZE = 1000
+
 class NestedSetRecursionError(frappe.ValidationError): pass
 class NestedSetMultipleRootsError(frappe.ValidationError): pass
 class NestedSetChildExistsError(frappe.ValidationError): pass
@@ -38,8 +41,10 @@ def update_nsm(doc):
 	# has parent changed (?) or parent is None (root)
 	if not doc.lft and not doc.rgt:
 		update_add_node(doc, p or '', pf)
+		clear_tree_cache(doc.doctype)
 	elif op != p:
 		update_move_node(doc, pf)
+		clear_tree_cache(doc.doctype)
 
 	# set old parent
 	doc.set(opf, p)
@@ -86,8 +91,13 @@ def update_add_node(doc, parent, parent_field):
 
 
 def update_move_node(doc, parent_field):
+	"""
+		move the subtree of a node to the end of its new parent (or to the end
+		of the tree if it is a root) with a single update
+	"""
 	n = now()
 	parent = doc.get(parent_field)
+	lft, rgt = doc.lft, doc.rgt
 
 	if parent:
 		new_parent = frappe.db.sql("""select lft, rgt from `tab{0}`
@@ -95,86 +105,103 @@ def update_move_node(doc, parent_field):
 
 		validate_loop(doc.doctype, doc.name, new_parent.lft, new_parent.rgt)
 
-	# move to dark side
-	frappe.db.sql("""update `tab{0}` set lft = -lft, rgt = -rgt, modified=%s
-		where lft >= %s and rgt <= %s""".format(doc.doctype), (n, doc.lft, doc.rgt))
-
-	# shift left
-	diff = doc.rgt - doc.lft + 1
-	frappe.db.sql("""update `tab{0}` set lft = lft -%s, rgt = rgt - %s, modified=%s
-		where lft > %s""".format(doc.doctype), (diff, diff, n, doc.rgt))
-
-	# shift left rgts of ancestors whose only rgts must shift
-	frappe.db.sql("""update `tab{0}` set rgt = rgt - %s, modified=%s
-		where lft < %s and rgt > %s""".format(doc.doctype), (diff, n, doc.lft, doc.rgt))
-
-	if parent:
-		new_parent = frappe.db.sql("""select lft, rgt from `tab%s`
-			where name = %s""" % (doc.doctype, '%s'), parent, as_dict=1)[0]
-
-
-		# set parent lft, rgt
-		frappe.db.sql("""update `tab{0}` set rgt = rgt + %s, modified=%s
-			where name = %s""".format(doc.doctype), (diff, n, parent))
-
-		# shift right at new parent
-		frappe.db.sql("""update `tab{0}` set lft = lft + %s, rgt = rgt + %s, modified=%s
-			where lft > %s""".format(doc.doctype), (diff, diff, n, new_parent.rgt))
-
-		# shift right rgts of ancestors whose only rgts must shift
-		frappe.db.sql("""update `tab{0}` set rgt = rgt + %s, modified=%s
-			where lft < %s and rgt > %s""".format(doc.doctype),
-			(diff, n, new_parent.lft, new_parent.rgt))
-
-
-		new_diff = new_parent.rgt - doc.lft
+		# the subtree is inserted before the rgt of the new parent
+		position = new_parent.rgt
 	else:
 		# new root
-		max_rgt = frappe.db.sql("""select max(rgt) from `tab{0}`""".format(doc.doctype))[0][0]
-		new_diff = max_rgt + 1 - doc.lft
+		position = frappe.db.sql("""select max(rgt) from `tab{0}`""".format(doc.doctype))[0][0] + 1
 
-	# bring back from dark side
-	frappe.db.sql("""update `tab{0}` set lft = -lft + %s, rgt = -rgt + %s, modified=%s
-		where lft < 0""".format(doc.doctype), (new_diff, new_diff, n))
+	width = rgt - lft + 1
+	if position > rgt:
+		# moving right: the subtree shifts to end before position,
+		# values between the subtree and position shift left by its width
+		diff, lower, upper, shift = position - rgt - 1, rgt + 1, position - 1, -width
+	else:
+		# moving left: the subtree shifts to start at position,
+		# values between position and the subtree shift right by its width
+		diff, lower, upper, shift = position - lft, position, lft - 1, width
+
+	# each column only refers to itself, so the result does not depend on the
+	# order in which the assignments are evaluated
+	frappe.db.sql("""update `tab{0}` set
+			lft = case
+				when lft between %(lft)s and %(rgt)s then lft + %(diff)s
+				when lft between %(lower)s and %(upper)s then lft + %(shift)s
+				else lft end,
+			rgt = case
+				when rgt between %(lft)s and %(rgt)s then rgt + %(diff)s
+				when rgt between %(lower)s and %(upper)s then rgt + %(shift)s
+				else rgt end,
+			modified = %(modified)s
+		where (lft between %(start)s and %(end)s) or (rgt between %(start)s and %(end)s)""".format(doc.doctype),
+		dict(lft=lft, rgt=rgt, diff=diff, lower=lower, upper=upper, shift=shift, modified=n,
+			start=min(lft, position), end=max(rgt, position)))
 
 def rebuild_tree(doctype, parent_field):
 	"""
-		call rebuild_node for all root nodes
-	"""
-	# get all roots
-	frappe.db.auto_commit_on_many_writes = 1
+		rebuild lft, rgt of all nodes from the parent field
 
-	right = 1
-	result = frappe.db.sql("SELECT name FROM `tab%s` WHERE `%s`='' or `%s` IS NULL ORDER BY name ASC" % (doctype, parent_field, parent_field))
-	for r in result:
-		right = rebuild_node(doctype, r[0], right, parent_field)
-
-	frappe.db.auto_commit_on_many_writes = 0
-
-def rebuild_node(doctype, parent, left, parent_field):
+		The tree is loaded with one query and numbered in memory, children in order
+		of name. Only nodes whose lft or rgt changed are updated, in bulk
 	"""
-		reset lft, rgt and recursive call for all children
-	"""
-	from frappe.utils import now
-	n = now()
+	nodes = frappe.db.sql("""select name, `{0}`, lft, rgt from `tab{1}`
+		order by name asc""".format(parent_field, doctype))
 
-	# the right value of this node is the left value + 1
-	right = left+1
+	children = {}
+	for name, parent, lft, rgt in nodes:
+		children.setdefault(parent or '', []).append(name)
 
-	# get all children of this node
-	result = frappe.db.sql("SELECT name FROM `tab{0}` WHERE `{1}`=%s"
-		.format(doctype, parent_field), (parent))
-	for r in result:
-		right = rebuild_node(doctype, r[0], right, parent_field)
+	numbers = get_nested_set_numbers(children)
 
-	# we've got the left value, and now that we've processed
-	# the children of this node we also know the right value
-	frappe.db.sql("""UPDATE `tab{0}` SET lft=%s, rgt=%s, modified=%s
-		WHERE name=%s""".format(doctype), (left,right,n,parent))
-
-	#return the right value of this node + 1
-	return right+1
+	changed = [(name, ) + numbers[name] for name, parent, lft, rgt in nodes
+		if name in numbers and (lft, rgt) != numbers[name]]
 
+	n = now()
+	for i in range(0, len(changed), REBUILD_CHUNK_SIZE):
+		update_lft_rgt(doctype, changed[i:i + REBUILD_CHUNK_SIZE], n)
+
+	clear_tree_cache(doctype)
+
+def get_nested_set_numbers(children):
+	"""Returns {name: (lft, rgt)} for a tree given as {parent: [children]}, roots under ''.
+	Nodes that can not be reached from a root are left out"""
+	numbers = {}
+	counter = 1
+
+	# iterative depth first walk, deep trees would hit the recursion limit
+	stack = [(name, False) for name in reversed(children.get('', []))]
+	while stack:
+		name, visited = stack.pop()
+		if visited:
+			numbers[name] = (numbers[name], counter)
+			counter += 1
+			continue
+
+		if name in numbers:
+			# loop in the parent field
+			continue
+
+		numbers[name] = counter
+		counter += 1
+		stack.append((name, True))
+		stack.extend((child, False) for child in reversed(children.get(name, [])))
+
+	return numbers
+
+def update_lft_rgt(doctype, rows, modified):
+	"""Set lft, rgt of [(name, lft, rgt)] with one query"""
+	frappe.db.multisql({
+		"mariadb": """update `tab{0}` t
+			join ({1}) v on t.name = v.name
+			set t.lft = v.lft, t.rgt = v.rgt, t.modified = {2}""".format(doctype,
+				" union all ".join(["select %s as name, %s as lft, %s as rgt"] * len(rows)),
+				frappe.db.escape(modified)),
+		"postgres": """update `tab{0}` t
+			set lft = v.lft, rgt = v.rgt, modified = {2}
+			from (values {1}) as v(name, lft, rgt)
+			where t.name = v.name""".format(doctype, ", ".join(["(%s, %s, %s)"] * len(rows)),
+				frappe.db.escape(modified))
+	}, [v for row in rows for v in row])
 
 def validate_loop(doctype, name, lft, rgt):
 	"""check if item not an ancestor (loop)"""
@@ -238,6 +265,8 @@ class NestedSet(Document):
 
 		if merge:
 			rebuild_tree(self.doctype, parent_field)
+		else:
+			clear_tree_cache(self.doctype)
 
 	def validate_one_root(self):
 		if not self.get(self.nsm_parent_field):
@@ -268,6 +297,14 @@ def get_root_of(doctype):
 
 def get_ancestors_of(doctype, name, order_by="lft desc", limit=None):
 	"""Get ancestor elements of a DocType with a tree structure"""
+	if order_by in ("lft desc", "lft asc"):
+		result = frappe.cache().hget(get_tree_cache_key("ancestors", doctype), name,
+			lambda: _get_ancestors_of(doctype, name))
+		return apply_order_and_limit(result, order_by, limit)
+
+	return _get_ancestors_of(doctype, name, order_by, limit)
+
+def _get_ancestors_of(doctype, name, order_by="lft desc", limit=None):
 	lft, rgt = frappe.db.get_value(doctype, name, ["lft", "rgt"])
 
 	result = [d["name"] for d in frappe.db.get_all(doctype, {"lft": ["<", lft], "rgt": [">", rgt]},
@@ -278,9 +315,34 @@ def get_ancestors_of(doctype, name, order_by="lft desc", limit=None):
 def get_descendants_of(doctype, name, order_by="lft desc", limit=None,
 	ignore_permissions=False):
 	'''Return descendants of the current record'''
+	# permitted descendants depend on the user, only cache the full list
+	if ignore_permissions and order_by in ("lft desc", "lft asc"):
+		result = frappe.cache().hget(get_tree_cache_key("descendants", doctype), name,
+			lambda: _get_descendants_of(doctype, name, ignore_permissions=True))
+		return apply_order_and_limit(result, order_by, limit)
+
+	return _get_descendants_of(doctype, name, order_by, limit, ignore_permissions)
+
+def _get_descendants_of(doctype, name, order_by="lft desc", limit=None,
+	ignore_permissions=False):
 	lft, rgt = frappe.db.get_value(doctype, name, ['lft', 'rgt'])
 
 	result = [d["name"] for d in frappe.db.get_list(doctype, {"lft": [">", lft], "rgt": ["<", rgt]},
 		"name", order_by=order_by, limit_page_length=limit, ignore_permissions=ignore_permissions)]
 
 	return result or []
+
+def apply_order_and_limit(names, order_by, limit):
+	"""`names` are cached in order of lft desc"""
+	if order_by == "lft asc":
+		names = names[::-1]
+	return names[:limit] if limit else list(names)
+
+def get_tree_cache_key(map_type, doctype):
+	return "nestedset_{0}::{1}".format(map_type, doctype)
+
+def clear_tree_cache(doctype):
+	"""Clear the cached ancestors and descendants of the nodes of a tree,
+	called whenever lft, rgt or names of the tree change"""
+	frappe.cache().delete_value([get_tree_cache_key("ancestors", doctype),
+		get_tree_cache_key("descendants", doctype)])
@@ -0,0 +1,141 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Process wide cache of redis values, kept consistent across workers with pub/sub
+
+Values of `PROCESS_CACHED_KEYS` (plain keys and hashes) read by `RedisWrapper` are also
+kept in this process, so later requests do not need a round trip to redis for them.
+Values are kept encoded and decoded once per request, so requests never share objects.
+
+Every write or delete of such a key through `RedisWrapper` publishes the key on
+`CHANNEL`. A listener thread in every process evicts published keys. While the listener
+is not subscribed (not started yet, redis down) the process cache is not used.
+
+Enable it with `process_cache: 1` in common_site_config.json once all workers run a
+version that publishes invalidations. It is only used in web requests.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import os
+import threading
+import time
+
+import redis
+import frappe
+
+CHANNEL = "frappe:cache_invalidation"
+
+# names of keys and hashes that are cached in the process
+PROCESS_CACHED_KEYS = ("meta", "form_meta", "app_hooks", "app_hooks_version", "system_settings",
+	"website_route_rules", "installed_apps", "app_modules", "module_app", "table_columns")
+
+class ProcessCache(object):
+	def __init__(self):
+		self.data = {}
+		self.lock = threading.Lock()
+		self.pid = None
+		self.listener = None
+		self.subscribed = False
+
+		# incremented on every eviction, values read before an eviction are not stored
+		self.generation = 0
+
+	def is_active(self, redis_client):
+		"""Returns True if the process cache can be used, starts the listener if needed"""
+		conf = getattr(frappe.local, "conf", None) or {}
+		if not (conf.get("process_cache") and getattr(frappe.local, "request", None)):
+			return False
+
+		if self.pid != os.getpid():
+			# forked, threads and subscriptions do not survive a fork
+			self.start_listener(redis_client)
+
+		return self.subscribed
+
+	def start_listener(self, redis_client):
+		with self.lock:
+			if self.pid == os.getpid():
+				return
+
+			self.pid = os.getpid()
+			self.subscribed = False
+			self.data = {}
+			self.listener = threading.Thread(target=self.listen, args=(redis_client,),
+				name="frappe-cache-invalidation")
+			self.listener.daemon = True
+			self.listener.start()
+
+	def listen(self, redis_client):
+		while True:
+			try:
+				pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+				pubsub.subscribe(CHANNEL)
+				self.subscribed = True
+
+				for message in pubsub.listen():
+					if message.get("type") == "message":
+						self.handle_message(message["data"])
+
+			except Exception:
+				pass
+
+			# invalidations may have been missed while disconnected
+			self.subscribed = False
+			self.clear()
+			time.sleep(5)
+
+	def handle_message(self, data):
+		key, field = json.loads(frappe.safe_decode(data))
+		with self.lock:
+			self.generation += 1
+			if key.endswith("*"):
+				prefix = key[:-1]
+				for k in [k for k in self.data if k.startswith(prefix)]:
+					del self.data[k]
+			elif field is None:
+				self.data.pop(key, None)
+			elif key in self.data:
+				self.data[key].pop(field, None)
+
+	def clear(self):
+		with self.lock:
+			self.generation += 1
+			self.data = {}
+
+	def get(self, key, field=None):
+		"""Returns the encoded value of a key or hash field, or None"""
+		value = self.data.get(key)
+		if field is not None:
+			value = value.get(field) if value else None
+		return value
+
+	def set(self, key, data, generation, field=None):
+		"""Store the encoded value of a key or hash field read at `generation`"""
+		with self.lock:
+			if generation != self.generation:
+				# evicted while it was read
+				return
+
+			if field is None:
+				self.data[key] = data
+			else:
+				self.data.setdefault(key, {})[field] = data
+
+process_cache = ProcessCache()
+
+def is_process_cached(key):
+	"""Returns True if the prefixed `key` is the name of a process cached key or hash"""
+	name = frappe.safe_decode(key).split("|", 1)[-1]
+	return name in PROCESS_CACHED_KEYS
+
+def publish_invalidation(redis_client, key, field=None):
+	"""Tell all processes to evict a prefixed key (or hash field). A key ending with
+	`*` evicts all keys starting with it"""
+	message = json.dumps([frappe.safe_decode(key), field])
+	process_cache.handle_message(message)
+	try:
+		redis_client.publish(CHANNEL, message)
+	except redis.exceptions.ConnectionError:
+		pass
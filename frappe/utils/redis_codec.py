@@ -0,0 +1,77 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Serialization of values stored in the redis cache by `RedisWrapper`
+
+Values are pickled. If `redis_cache_compression` is set in site config (`zlib`, or
+`lz4` if it is installed), pickles larger than `COMPRESSION_THRESHOLD` bytes are
+compressed. Compression is off (`none`) by default.
+
+Compressed values start with a header of `MAGIC`, the format version and the codec id.
+Values without the header are plain pickles, as written by older versions. Only enable
+compression once all workers sharing the redis instance run a version that reads it,
+older workers can only read plain pickles.
+"""
+
+from __future__ import unicode_literals
+
+import zlib
+
+import frappe
+from six.moves import cPickle as pickle
+
+try:
+	import lz4.frame
+except ImportError:
+	lz4 = None
+
+# pickles never start with this byte
+MAGIC = b"\xfe"
+VERSION = 1
+HEADER_LENGTH = len(MAGIC) + 2
+
+# smaller values are not worth compressing
+COMPRESSION_THRESHOLD = 16 * 1024
+
+codecs = {}
+codec_ids = {}
+
+def register_codec(codec_id, name, compress, decompress):
+	"""Register a compression codec. `codec_id` (0-255) is stored in the header of
+	encoded values and must never be reused for another codec"""
+	codecs[codec_id] = frappe._dict(name=name, compress=compress, decompress=decompress)
+	codec_ids[name] = codec_id
+
+register_codec(0, "none", lambda data: data, lambda data: data)
+register_codec(1, "zlib", lambda data: zlib.compress(data, 1), zlib.decompress)
+if lz4:
+	register_codec(2, "lz4", lz4.frame.compress, lz4.frame.decompress)
+
+def get_codec_id():
+	conf = getattr(frappe.local, "conf", None) or {}
+	name = conf.get("redis_cache_compression") or "none"
+	return codec_ids.get(name, 0)
+
+def dumps(value):
+	"""Returns `value` pickled, compressed if it is large"""
+	data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+	codec_id = get_codec_id()
+	if not codec_id or len(data) < COMPRESSION_THRESHOLD:
+		# plain pickle, readable by older versions
+		return data
+
+	# bytes, redis-py cannot encode a bytearray on python 2
+	return bytes(MAGIC + bytearray([VERSION, codec_id]) + codecs[codec_id].compress(data))
+
+def loads(data):
+	"""Returns the value of data encoded with `dumps` or a plain pickle"""
+	if data[:1] != MAGIC:
+		return pickle.loads(data)
+
+	version, codec_id = bytearray(data[1:HEADER_LENGTH])
+	if version != VERSION or codec_id not in codecs:
+		# written by a newer version or with a codec that is not installed, treat as missing
+		return None
+
+	return pickle.loads(codecs[codec_id].decompress(data[HEADER_LENGTH:]))
@@ -3,10 +3,21 @@
 from __future__ import unicode_literals
 
 import redis, frappe, re
-from six.moves import cPickle as pickle
 from frappe.utils import cstr
+from frappe.utils.redis_codec import dumps, loads
+from frappe.utils.process_cache import process_cache, is_process_cached, publish_invalidation
 from six import iteritems
 
+# keys per SCAN call
+SCAN_COUNT = 1000
+
+# namespaces whose keys are tracked in a registry set, so that they can be listed
+# and deleted without walking the keyspace
+registered_namespaces = ("insert_queue_for_",)
+
+# member of registries that hold all keys of their namespace. Registries without it
+# (keys written by older versions, or an evicted registry) are populated with `SCAN`
+REGISTRY_SENTINEL = ""
 
 class RedisWrapper(redis.Redis):
 	"""Redis client that will automatically prefix conf.db_name"""
@@ -37,19 +48,25 @@ class RedisWrapper(redis.Redis):
 		:param expires_in_sec: Expire value of this key in X seconds
 		"""
 		key = self.make_key(key, user)
+		data = dumps(val)
 
 		if not expires_in_sec:
-			frappe.local.cache[key] = val
+			frappe.local.cache.set(key, val, len(data))
 
 		try:
+			pipe = self.pipeline(transaction=False)
 			if expires_in_sec:
-				self.setex(key, pickle.dumps(val), expires_in_sec)
+				pipe.setex(key, data, expires_in_sec)
 			else:
-				self.set(key, pickle.dumps(val))
+				pipe.set(key, data)
+			self.register_keys(pipe, [key])
+			pipe.execute()
 
 		except redis.exceptions.ConnectionError:
 			return None
 
+		self.invalidate(key)
+
 	def get_value(self, key, generator=None, user=None, expires=False):
 		"""Returns cache value. If not found and generator function is
 			given, it will call the generator.
@@ -62,17 +79,16 @@ class RedisWrapper(redis.Redis):
 		key = self.make_key(key, user)
 
 		if key in frappe.local.cache:
+			frappe.local.cache.record_hit()
 			val = frappe.local.cache[key]
 
 		else:
+			frappe.local.cache.record_miss()
 			val = None
-			try:
-				val = self.get(key)
-			except redis.exceptions.ConnectionError:
-				pass
+			data = self.get_encoded(key)
 
-			if val is not None:
-				val = pickle.loads(val)
+			if data is not None:
+				val = loads(data)
 
 			if not expires:
 				if val is None and generator:
@@ -80,34 +96,161 @@ class RedisWrapper(redis.Redis):
 					self.set_value(original_key, val, user=user)
 
 				else:
-					frappe.local.cache[key] = val
+					frappe.local.cache.set(key, val, len(data or ""))
 
 		return val
 
-	def get_all(self, key):
-		ret = {}
-		for k in self.get_keys(key):
-			ret[key] = self.get_value(k)
+	def get_values(self, keys, user=None, expires=False):
+		"""Returns a dict of cache values for `keys`. Values that are not in
+			`frappe.local.cache` are read with a single `MGET`. Missing keys are `None`.
+
+		:param keys: List of cache keys.
+		:param expires: If the keys are supposed to be with an expiry, don't store them in frappe.local
+		"""
+		out, missing = {}, []
+		for key in keys:
+			_key = self.make_key(key, user)
+			if _key in frappe.local.cache:
+				frappe.local.cache.record_hit()
+				out[key] = frappe.local.cache[_key]
+			else:
+				frappe.local.cache.record_miss()
+				missing.append(key)
+
+		if missing:
+			values = self.get_encoded_many([self.make_key(key, user) for key in missing])
+
+			for key, data in zip(missing, values):
+				val = loads(data) if data is not None else None
+
+				if not expires:
+					frappe.local.cache.set(self.make_key(key, user), val, len(data or ""))
+
+				out[key] = val
+
+		return out
+
+	def set_values(self, mapping, user=None, expires_in_sec=None):
+		"""Sets cache values of a dict of {key: value} with a single `MSET`,
+			or a pipeline of `SETEX` if they expire.
+
+		:param mapping: Dict of cache keys and values
+		:param user: Prepends keys with User
+		:param expires_in_sec: Expire values in X seconds
+		"""
+		mapping = {self.make_key(key, user): val for key, val in iteritems(mapping)}
+		if not mapping:
+			return
+
+		encoded = {key: dumps(val) for key, val in iteritems(mapping)}
+		if not expires_in_sec:
+			for key, val in iteritems(mapping):
+				frappe.local.cache.set(key, val, len(encoded[key]))
+
+		try:
+			pipe = self.pipeline(transaction=False)
+			if expires_in_sec:
+				for key, data in iteritems(encoded):
+					pipe.setex(key, data, expires_in_sec)
+			else:
+				pipe.mset(encoded)
+			self.register_keys(pipe, list(mapping))
+			pipe.execute()
 
-		return ret
+		except redis.exceptions.ConnectionError:
+			return None
+
+		for key in mapping:
+			self.invalidate(key)
+
+	def get_all(self, key):
+		"""Returns a dict of all cache values with keys starting with `key`"""
+		keys = [frappe.safe_decode(k).split("|", 1)[1] for k in self.get_keys(key)]
+		return self.get_values(keys)
 
 	def get_keys(self, key):
-		"""Return keys starting with `key`."""
+		"""Return keys starting with `key`.
+
+		Keys of registered namespaces (`user:[user]:*`, `insert_queue_for_*`) are read
+		from their registry, others are found with `SCAN`, which unlike `KEYS` does not
+		block redis for other sites while the keyspace is walked."""
 		try:
-			key = self.make_key(key + "*")
-			return self.keys(key)
+			registry = self.get_registry_key(key)
+			if registry:
+				if not super(RedisWrapper, self).sismember(registry, REGISTRY_SENTINEL):
+					self.populate_registry(registry, self.get_registry_scope(key))
+				return self.get_registered_keys(registry, self.make_key(key))
+
+			return list(self.scan_iter(match=self.make_key(key + "*"), count=SCAN_COUNT))
 
 		except redis.exceptions.ConnectionError:
+			key = self.make_key(key + "*")
 			regex = re.compile(cstr(key).replace("|", "\|").replace("*", "[\w]*"))
 			return [k for k in list(frappe.local.cache) if regex.match(k.decode())]
 
 	def delete_keys(self, key):
 		"""Delete keys with wildcard `*`."""
 		try:
-			self.delete_value(self.get_keys(key), make_keys=False)
+			keys = self.get_keys(key)
+			self.delete_value(keys, make_keys=False)
+
+			registry = self.get_registry_key(key)
+			if registry and keys:
+				super(RedisWrapper, self).srem(registry, *keys)
 		except redis.exceptions.ConnectionError:
 			pass
 
+	def get_registry_key(self, key):
+		"""Returns the (prefixed) name of the registry set of the namespace of `key`,
+		or None if the namespace is not registered. A key is passed without prefix"""
+		scope = self.get_registry_scope(key)
+		if scope:
+			return self.make_key("key_registry:" + scope.rstrip(":"))
+
+	def get_registry_scope(self, key):
+		"""Returns the prefix shared by all keys in the registry of `key`"""
+		key = frappe.safe_decode(key)
+		if key.startswith("user:"):
+			# user:[user]:[key], the registry is per user
+			user = key.split(":", 2)[1]
+			return "user:{0}:".format(user) if user else None
+
+		for namespace in registered_namespaces:
+			if key.startswith(namespace):
+				return namespace
+
+	def populate_registry(self, registry, scope):
+		"""Add the existing keys of `scope` to a registry, with `SCAN`"""
+		keys = list(self.scan_iter(match=self.make_key(scope + "*"), count=SCAN_COUNT))
+		super(RedisWrapper, self).sadd(registry, REGISTRY_SENTINEL, *keys)
+
+	def register_keys(self, pipe, keys):
+		"""Add prefixed `keys` of registered namespaces to their registry in `pipe`"""
+		for key in keys:
+			registry = self.get_registry_key(frappe.safe_decode(key).split("|", 1)[1])
+			if registry:
+				pipe.sadd(registry, key)
+
+	def get_registered_keys(self, registry, prefix):
+		"""Returns keys in `registry` starting with `prefix`. Keys that do not exist
+		anymore (expired, or lists that were emptied) are removed from the registry"""
+		prefix = frappe.safe_decode(prefix)
+		keys = [k for k in super(RedisWrapper, self).smembers(registry)
+			if frappe.safe_decode(k).startswith(prefix)]
+		if not keys:
+			return []
+
+		pipe = self.pipeline(transaction=False)
+		for k in keys:
+			pipe.exists(k)
+		exists = pipe.execute()
+
+		missing = [k for k, e in zip(keys, exists) if not e]
+		if missing:
+			super(RedisWrapper, self).srem(registry, *missing)
+
+		return [k for k, e in zip(keys, exists) if e]
+
 	def delete_key(self, *args, **kwargs):
 		self.delete_value(*args, **kwargs)
 
@@ -128,11 +271,83 @@ class RedisWrapper(redis.Redis):
 			except redis.exceptions.ConnectionError:
 				pass
 
+			self.invalidate(key)
+
+	def get_encoded(self, name, key=None):
+		"""Returns the encoded value of the prefixed key `name` (or of field `key` of hash
+		`name`) from the process cache if it is enabled for `name`, else from redis"""
+		use_process_cache = is_process_cached(name) and process_cache.is_active(self)
+		if use_process_cache:
+			data = process_cache.get(name, key)
+			if data is not None:
+				return data
+
+		generation = process_cache.generation
+		try:
+			if key is None:
+				data = self.get(name)
+			else:
+				data = super(RedisWrapper, self).hget(name, key)
+		except redis.exceptions.ConnectionError:
+			return None
+
+		if use_process_cache and data is not None:
+			process_cache.set(name, data, generation, key)
+
+		return data
+
+	def get_encoded_many(self, keys, name=None):
+		"""Returns a list of encoded values of the prefixed `keys` (or of fields `keys` of
+		hash `name`), read from the process cache where it is enabled and from redis with a
+		single `MGET` (or `HMGET`) for the rest"""
+		names = [name if name is not None else key for key in keys]
+		cached = [is_process_cached(n) for n in names]
+		use_process_cache = any(cached) and process_cache.is_active(self)
+
+		out, missing = [None] * len(keys), []
+		for i, key in enumerate(keys):
+			if use_process_cache and cached[i]:
+				out[i] = process_cache.get(names[i], None if name is None else key)
+			if out[i] is None:
+				missing.append(i)
+
+		if not missing:
+			return out
+
+		generation = process_cache.generation
+		try:
+			if name is None:
+				values = self.mget([keys[i] for i in missing])
+			else:
+				values = super(RedisWrapper, self).hmget(name, [keys[i] for i in missing])
+		except redis.exceptions.ConnectionError:
+			return out
+
+		for i, data in zip(missing, values):
+			out[i] = data
+			if use_process_cache and cached[i] and data is not None:
+				process_cache.set(names[i], data, generation, None if name is None else keys[i])
+
+		return out
+
+	def invalidate(self, name, key=None):
+		"""Evict the prefixed key `name` (or field `key` of hash `name`) from the process
+		cache of all workers, if it is a process cached key"""
+		if is_process_cached(name):
+			publish_invalidation(self, name, key)
+
 	def lpush(self, key, value):
-		super(RedisWrapper, self).lpush(self.make_key(key), value)
+		self.push("lpush", key, value)
 
 	def rpush(self, key, value):
-		super(RedisWrapper, self).rpush(self.make_key(key), value)
+		self.push("rpush", key, value)
+
+	def push(self, command, key, value):
+		key = self.make_key(key)
+		pipe = self.pipeline(transaction=False)
+		getattr(pipe, command)(key, value)
+		self.register_keys(pipe, [key])
+		pipe.execute()
 
 	def lpop(self, key):
 		return super(RedisWrapper, self).lpop(self.make_key(key))
@@ -140,23 +355,39 @@ class RedisWrapper(redis.Redis):
 	def llen(self, key):
 		return super(RedisWrapper, self).llen(self.make_key(key))
 
+	def rpop_many(self, key, count):
+		"""Remove and return up to `count` items from the end of the list,
+		in the order they were pushed with `lpush` (oldest first)"""
+		key = self.make_key(key)
+		pipe = self.pipeline()
+		pipe.lrange(key, -count, -1)
+		pipe.ltrim(key, 0, -count - 1)
+		items = pipe.execute()[0]
+		items.reverse()
+		return items
+
 	def hset(self, name, key, value, shared=False):
 		_name = self.make_key(name, shared=shared)
 
+		data = dumps(value)
+
 		# set in local
 		if not _name in frappe.local.cache:
 			frappe.local.cache[_name] = {}
 		frappe.local.cache[_name][key] = value
+		frappe.local.cache.set_field_size(_name, key, len(data))
 
 		# set in redis
 		try:
 			super(RedisWrapper, self).hset(_name,
-				key, pickle.dumps(value))
+				key, data)
 		except redis.exceptions.ConnectionError:
 			pass
 
+		self.invalidate(_name, key)
+
 	def hgetall(self, name):
-		return {key: pickle.loads(value) for key, value in
+		return {key: loads(value) for key, value in
 			iteritems(super(RedisWrapper, self).hgetall(self.make_key(name)))}
 
 	def hget(self, name, key, generator=None, shared=False):
@@ -165,17 +396,17 @@ class RedisWrapper(redis.Redis):
 			frappe.local.cache[_name] = {}
 
 		if key in frappe.local.cache[_name]:
+			frappe.local.cache.record_hit()
 			return frappe.local.cache[_name][key]
 
-		value = None
-		try:
-			value = super(RedisWrapper, self).hget(_name, key)
-		except redis.exceptions.ConnectionError:
-			pass
+		frappe.local.cache.record_miss()
+		value = self.get_encoded(_name, key)
 
 		if value:
-			value = pickle.loads(value)
+			size = len(value)
+			value = loads(value)
 			frappe.local.cache[_name][key] = value
+			frappe.local.cache.set_field_size(_name, key, size)
 		elif generator:
 			value = generator()
 			try:
@@ -184,21 +415,51 @@ class RedisWrapper(redis.Redis):
 				pass
 		return value
 
+	def hget_many(self, name, keys, shared=False):
+		"""Returns a dict of values of `keys` in hash `name`. Values that are not in
+		`frappe.local.cache` are read with a single `HMGET`. Missing keys are `None`"""
+		_name = self.make_key(name, shared=shared)
+		if not _name in frappe.local.cache:
+			frappe.local.cache[_name] = {}
+
+		local_cache = frappe.local.cache[_name]
+		out = {key: local_cache[key] for key in keys if key in local_cache}
+		missing = [key for key in keys if key not in out]
+
+		frappe.local.cache.record_hit(len(out))
+		frappe.local.cache.record_miss(len(missing))
+
+		if missing:
+			values = self.get_encoded_many(missing, name=_name)
+
+			for key, value in zip(missing, values):
+				if value:
+					size = len(value)
+					value = loads(value)
+					local_cache[key] = value
+					frappe.local.cache.set_field_size(_name, key, size)
+				out[key] = value
+
+		return out
+
 	def hdel(self, name, key, shared=False):
 		_name = self.make_key(name, shared=shared)
 
 		if _name in frappe.local.cache:
 			if key in frappe.local.cache[_name]:
 				del frappe.local.cache[_name][key]
+			frappe.local.cache.remove_field(_name, key)
 		try:
 			super(RedisWrapper, self).hdel(_name, key)
 		except redis.exceptions.ConnectionError:
 			pass
 
+		self.invalidate(_name, key)
+
 	def hdel_keys(self, name_starts_with, key):
 		"""Delete hash names with wildcard `*` and key"""
 		for name in frappe.cache().get_keys(name_starts_with):
-			name = name.split("|", 1)[1]
+			name = frappe.safe_decode(name).split("|", 1)[1]
 			self.hdel(name, key)
 
 	def hkeys(self, name):
@@ -231,3 +492,15 @@ class RedisWrapper(redis.Redis):
 		"""Return all members of the set"""
 		return super(RedisWrapper, self).smembers(self.make_key(name))
 
+	def zadd(self, name, value, score):
+		"""Add a member to a sorted set, or update its score"""
+		super(RedisWrapper, self).zadd(self.make_key(name), value, score)
+
+	def zrem(self, name, *values):
+		"""Remove a specific member/list of members from the sorted set"""
+		super(RedisWrapper, self).zrem(self.make_key(name), *values)
+
+	def zrangebyscore(self, name, min, max):
+		"""Returns members of the sorted set with a score between `min` and `max`"""
+		return super(RedisWrapper, self).zrangebyscore(self.make_key(name), min, max)
+
@@ -0,0 +1,265 @@
+# Copyright (c) 2026, libracore and Contributors
+# MIT License. See license.txt
+
+"""Backends for `frappe.utils.global_search.search`
+
+`__global_search` in the site database is always maintained and is the source of truth.
+If `global_search_backend` is set to `sqlite` in site config, entries are also written to a
+local SQLite FTS5 index (BM25 ranking, prefix queries) and desk search is served from it.
+Rebuild the index with `bench --site [site] rebuild-global-search` after enabling it.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import re
+import sqlite3
+import threading
+
+import frappe
+from frappe.utils import cint
+
+
+SQLITE_SCHEMA = '''
+	create table if not exists documents (
+		id integer primary key,
+		doctype text not null,
+		name text not null,
+		title text,
+		route text,
+		published integer not null default 0,
+		unique (doctype, name)
+	);
+	create virtual table if not exists documents_fts using fts5(
+		title, content, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+	);
+'''
+
+# SQLite connections of this process, {(pid, thread, path): connection}
+connections = {}
+
+def get_search_backend():
+	"""Returns the search backend configured for the current site"""
+	backend = frappe.local.conf.get('global_search_backend') or 'database'
+	if backend not in search_backends:
+		frappe.throw(frappe._('Invalid Global Search backend {0}').format(backend))
+
+	return search_backends[backend]()
+
+
+class DatabaseSearchBackend(object):
+	"""Full text search on `__global_search` in the site database, the default backend.
+
+	Other backends keep their own index of the entries, `values` are dicts of
+	{ doctype, name, content, published, title, route }. Entries of `__global_search`
+	are written by `frappe.utils.global_search` itself, so the methods that update the
+	index do nothing here"""
+	def index(self, values):
+		"""Insert or update the given entries"""
+		pass
+
+	def delete(self, doctype, name):
+		"""Delete the entry of a document"""
+		pass
+
+	def delete_doctype(self, doctype):
+		"""Delete all entries of a doctype"""
+		pass
+
+	def clear(self):
+		"""Delete all entries"""
+		pass
+
+	def prune(self, doctype):
+		"""Delete entries of a doctype that are not in `__global_search` anymore"""
+		pass
+
+	def search(self, text, start=0, limit=20, doctype=None, allowed_doctypes=None):
+		"""Returns entries matching `text` as a list of `frappe._dict(doctype, name, content, rank)`
+		with a positive rank, best match first"""
+		mariadb_conditions = ''
+		postgres_conditions = ''
+		offset = ''
+
+		if doctype:
+			mariadb_conditions = postgres_conditions = '`doctype` = {} AND '.format(frappe.db.escape(doctype))
+
+		mariadb_text = frappe.db.escape('+' + text + '*')
+
+		mariadb_fields = '`doctype`, `name`, `content`, MATCH (`content`) AGAINST ({} IN BOOLEAN MODE) AS rank'.format(mariadb_text)
+		postgres_fields = '`doctype`, `name`, `content`, TO_TSVECTOR("content") @@ PLAINTO_TSQUERY({}) AS rank'.format(frappe.db.escape(text))
+
+		if allowed_doctypes:
+			allowed_doctypes = ",".join(["'{0}'".format(dt) for dt in allowed_doctypes])
+			mariadb_conditions += '`doctype` IN ({})'.format(allowed_doctypes)
+			postgres_conditions += '`doctype` IN ({})'.format(allowed_doctypes)
+
+		if int(start) > 0:
+			offset = 'OFFSET {}'.format(start)
+
+		common_query = """
+				SELECT {fields}
+				FROM `__global_search`
+				WHERE {conditions}
+				ORDER BY rank DESC
+				LIMIT {limit}
+				{offset}
+			"""
+
+		result = frappe.db.multisql({
+				'mariadb': common_query.format(fields=mariadb_fields, conditions=mariadb_conditions, limit=limit, offset=offset),
+				'postgres': common_query.format(fields=postgres_fields, conditions=postgres_conditions, limit=limit, offset=offset)
+			}, as_dict=True)
+
+		return [r for r in result if r.rank > 0.0]
+
+
+class SQLiteSearchBackend(DatabaseSearchBackend):
+	"""Global search index in a per-site SQLite database using FTS5.
+
+	`documents` holds one row per document, `documents_fts` the full text index of
+	its title and content with the same rowid.
+
+	Changes are queued and written when the site database transaction is committed
+	(see `flush_search_index_writes`), so the index never has entries of a rolled back
+	transaction. The connection is opened once per process and thread."""
+	def __init__(self):
+		self.path = frappe.get_site_path('private', 'search', 'global_search.sqlite')
+
+	def get_connection(self):
+		key = (os.getpid(), threading.current_thread().ident, os.path.abspath(self.path))
+		if key not in connections:
+			if not os.path.exists(os.path.dirname(self.path)):
+				os.makedirs(os.path.dirname(self.path))
+
+			conn = sqlite3.connect(self.path, timeout=30)
+			# allow readers while the sync job writes
+			conn.execute('pragma journal_mode=wal')
+			conn.executescript(SQLITE_SCHEMA)
+			connections[key] = conn
+
+		return connections[key]
+
+	def index(self, values):
+		queue_write(self, 'write_index', values)
+
+	def delete(self, doctype, name):
+		queue_write(self, 'write_delete', doctype, name)
+
+	def delete_doctype(self, doctype):
+		queue_write(self, 'write_delete_doctype', doctype)
+
+	def clear(self):
+		queue_write(self, 'write_clear')
+
+	def write_index(self, conn, values):
+		for value in values:
+			row = conn.execute('select id from documents where doctype=? and name=?',
+				(value['doctype'], value['name'])).fetchone()
+			if row:
+				conn.execute('update documents set title=?, route=?, published=? where id=?',
+					(value.get('title'), value.get('route'), cint(value.get('published')), row[0]))
+				conn.execute('delete from documents_fts where rowid=?', (row[0],))
+				rowid = row[0]
+			else:
+				rowid = conn.execute('''insert into documents (doctype, name, title, route, published)
+					values (?, ?, ?, ?, ?)''', (value['doctype'], value['name'], value.get('title'),
+					value.get('route'), cint(value.get('published')))).lastrowid
+
+			conn.execute('insert into documents_fts (rowid, title, content) values (?, ?, ?)',
+				(rowid, value.get('title'), value.get('content')))
+
+	def write_delete(self, conn, doctype, name):
+		self.delete_rows(conn, conn.execute('select id from documents where doctype=? and name=?',
+			(doctype, name)).fetchall())
+
+	def write_delete_doctype(self, conn, doctype):
+		self.delete_rows(conn, conn.execute('select id from documents where doctype=?',
+			(doctype,)).fetchall())
+
+	def write_clear(self, conn):
+		conn.execute('delete from documents_fts')
+		conn.execute('delete from documents')
+
+	def delete_rows(self, conn, rows):
+		for row in rows:
+			conn.execute('delete from documents_fts where rowid=?', (row[0],))
+			conn.execute('delete from documents where id=?', (row[0],))
+
+	def prune(self, doctype):
+		conn = self.get_connection()
+		last_id = 0
+		while True:
+			rows = conn.execute('''select id, name from documents where doctype=? and id > ?
+				order by id limit 5000''', (doctype, last_id)).fetchall()
+			if not rows:
+				break
+
+			existing = set(frappe.db.sql_list('''select name from `__global_search`
+				where doctype=%s and name in %s''', (doctype, tuple(r[1] for r in rows))))
+			with conn:
+				self.delete_rows(conn, [r for r in rows if r[1] not in existing])
+
+			last_id = rows[-1][0]
+
+	def search(self, text, start=0, limit=20, doctype=None, allowed_doctypes=None):
+		query = get_fts_query(text)
+		if not query:
+			return []
+
+		conditions, values = ['documents_fts match ?'], [query]
+		if doctype:
+			conditions.append('d.doctype = ?')
+			values.append(doctype)
+		if allowed_doctypes:
+			conditions.append('d.doctype in ({0})'.format(', '.join(['?'] * len(allowed_doctypes))))
+			values.extend(allowed_doctypes)
+
+		values.extend([cint(limit), cint(start)])
+
+		# bm25() is lower for better matches, title matches weigh more than content
+		result = self.get_connection().execute('''
+			select d.doctype, d.name, f.content, -bm25(documents_fts, 2.0, 1.0) as rank
+			from documents_fts f
+				join documents d on d.id = f.rowid
+			where {0}
+			order by bm25(documents_fts, 2.0, 1.0)
+			limit ? offset ?'''.format(' and '.join(conditions)), values).fetchall()
+
+		return [frappe._dict(doctype=r[0], name=r[1], content=r[2], rank=r[3]) for r in result]
+
+
+def get_fts_query(text):
+	"""Returns an FTS5 query matching documents that contain all words of `text`,
+	the last word as a prefix"""
+	words = [w for w in re.split(r'\W+', text, flags=re.UNICODE) if w]
+	if not words:
+		return ''
+
+	terms = ['"{0}"'.format(w) for w in words]
+	terms[-1] += '*'
+	return ' '.join(terms)
+
+
+def queue_write(backend, method, *args):
+	"""Queue a change of a search index until the site database transaction is committed"""
+	if not getattr(frappe.local, 'search_index_writes', None):
+		frappe.local.search_index_writes = []
+	frappe.local.search_index_writes.append((backend, method, args))
+
+def flush_search_index_writes():
+	"""Write the changes queued by the committed transaction, called on commit"""
+	writes = getattr(frappe.local, 'search_index_writes', None)
+	if not writes:
+		return
+
+	frappe.local.search_index_writes = []
+	for backend, method, args in writes:
+		conn = backend.get_connection()
+		with conn:
+			getattr(backend, method)(conn, *args)
+
+search_backends = {
+	'database': DatabaseSearchBackend,
+	'sqlite': SQLiteSearchBackend
+}